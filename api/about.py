@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, File, UploadFile
+from fastapi import APIRouter, Depends, HTTPException, Query, File, UploadFile, Request
 from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from typing import List
@@ -7,6 +7,7 @@ import schemas
 import crud
 from database import get_db
 from auth import get_current_admin_user, security
+from materialized import MaterializedView, serve
 import uuid
 import os
 import shutil
@@ -21,21 +22,33 @@ def get_admin_user(
 
 router = APIRouter()
 
+# Read endpoints are served from memory and rebuilt after writes
+about_view = MaterializedView(
+    "about", [models.About], lambda db: db.query(models.About).first(),
+    response_model=schemas.About, not_found="About information not found",
+)
+ceos_view = MaterializedView(
+    "about.ceos", [models.CEO], crud.get_ceos, response_model=List[schemas.CEO], default_params=(0, 100),
+)
+supporters_view = MaterializedView(
+    "about.supporters", [models.Supporter], crud.get_supporters,
+    response_model=List[schemas.Supporter], default_params=(0, 100),
+)
+
 # ==================== ABOUT CONTENT ENDPOINTS ====================
 
 @router.get("/", response_model=schemas.About)
-async def get_about(db: Session = Depends(get_db)):
+async def get_about(request: Request):
     """Get about information"""
     try:
-        about = db.query(models.About).first()
-        if not about:
-            raise HTTPException(status_code=404, detail="About information not found")
-        return about
+        return await serve(about_view, request)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve about information: {str(e)}")
 
 @router.post("/", response_model=schemas.About)
-async def create_about(
+def create_about(
     about: schemas.AboutCreate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_admin_user)
@@ -55,7 +68,7 @@ async def create_about(
         raise HTTPException(status_code=500, detail=f"Failed to create about information: {str(e)}")
 
 @router.put("/", response_model=schemas.About)
-async def update_about(
+def update_about(
     about: schemas.AboutCreate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_admin_user)
@@ -72,7 +85,7 @@ async def update_about(
         raise HTTPException(status_code=500, detail=f"Failed to update about information: {str(e)}")
 
 @router.delete("/")
-async def delete_about(
+def delete_about(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_admin_user)
 ):
@@ -91,19 +104,18 @@ async def delete_about(
 
 @router.get("/ceos", response_model=List[schemas.CEO])
 async def get_ceos(
+    request: Request,
     skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db)
+    limit: int = Query(100, ge=1, le=1000)
 ):
     """Get all CEOs ordered by display_order"""
     try:
-        ceos = crud.get_ceos(db, skip=skip, limit=limit)
-        return ceos
+        return await serve(ceos_view, request, (skip, limit))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve CEOs: {str(e)}")
 
 @router.get("/ceos/{ceo_id}", response_model=schemas.CEO)
-async def get_ceo(
+def get_ceo(
     ceo_id: str,
     db: Session = Depends(get_db)
 ):
@@ -119,7 +131,7 @@ async def get_ceo(
         raise HTTPException(status_code=500, detail=f"Failed to retrieve CEO: {str(e)}")
 
 @router.post("/ceos", response_model=schemas.CEO)
-async def create_ceo(
+def create_ceo(
     ceo: schemas.CEOCreate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_admin_user)
@@ -132,7 +144,7 @@ async def create_ceo(
         raise HTTPException(status_code=500, detail=f"Failed to create CEO: {str(e)}")
 
 @router.put("/ceos/{ceo_id}", response_model=schemas.CEO)
-async def update_ceo(
+def update_ceo(
     ceo_id: str,
     ceo_update: schemas.CEOUpdate,
     db: Session = Depends(get_db),
@@ -152,7 +164,7 @@ async def update_ceo(
         raise HTTPException(status_code=500, detail=f"Failed to update CEO: {str(e)}")
 
 @router.delete("/ceos/{ceo_id}")
-async def delete_ceo(
+def delete_ceo(
     ceo_id: str,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_admin_user)
@@ -174,19 +186,18 @@ async def delete_ceo(
 
 @router.get("/supporters", response_model=List[schemas.Supporter])
 async def get_supporters(
+    request: Request,
     skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db)
+    limit: int = Query(100, ge=1, le=1000)
 ):
     """Get all supporters ordered by display_order"""
     try:
-        supporters = crud.get_supporters(db, skip=skip, limit=limit)
-        return supporters
+        return await serve(supporters_view, request, (skip, limit))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve supporters: {str(e)}")
 
 @router.get("/supporters/{supporter_id}", response_model=schemas.Supporter)
-async def get_supporter(
+def get_supporter(
     supporter_id: str,
     db: Session = Depends(get_db)
 ):
@@ -202,7 +213,7 @@ async def get_supporter(
         raise HTTPException(status_code=500, detail=f"Failed to retrieve supporter: {str(e)}")
 
 @router.post("/supporters", response_model=schemas.Supporter)
-async def create_supporter(
+def create_supporter(
     supporter: schemas.SupporterCreate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_admin_user)
@@ -215,7 +226,7 @@ async def create_supporter(
         raise HTTPException(status_code=500, detail=f"Failed to create supporter: {str(e)}")
 
 @router.put("/supporters/{supporter_id}", response_model=schemas.Supporter)
-async def update_supporter(
+def update_supporter(
     supporter_id: str,
     supporter_update: schemas.SupporterUpdate,
     db: Session = Depends(get_db),
@@ -235,7 +246,7 @@ async def update_supporter(
         raise HTTPException(status_code=500, detail=f"Failed to update supporter: {str(e)}")
 
 @router.delete("/supporters/{supporter_id}")
-async def delete_supporter(
+def delete_supporter(
     supporter_id: str,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_admin_user)
@@ -256,7 +267,7 @@ async def delete_supporter(
 # ==================== IMAGE UPLOAD ENDPOINT ====================
 
 @router.post("/upload-image")
-async def upload_profile_image(
+def upload_profile_image(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_admin_user)
@@ -0,0 +1,53 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from database import get_db, engine
+from auth import get_current_admin_user, security
+import loop_monitor
+import outbox
+import scheduler
+# Dependency function for admin authentication
+def get_admin_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+):
+    return get_current_admin_user(credentials, db)
+router = APIRouter()
+
+@router.get("/event-loop")
+async def get_event_loop_stats(
+    top: int = Query(20, ge=1, le=200),
+    current_user = Depends(get_admin_user)
+):
+    """Event-loop lag and the routes/call sites that blocked it longest (admin only)"""
+    return loop_monitor.snapshot(top)
+
+@router.delete("/event-loop")
+async def reset_event_loop_stats(current_user = Depends(get_admin_user)):
+    """Clear the collected lag and blocking statistics (admin only)"""
+    loop_monitor.reset()
+    return {"message": "Event loop statistics reset"}
+
+@router.get("/outbox")
+async def get_outbox_status(current_user = Depends(get_admin_user)):
+    """Push notification outbox: rows per delivery status and recent failures (admin only)"""
+    return await run_in_threadpool(outbox.status_counts, engine)
+
+@router.get("/jobs")
+async def get_jobs(
+    history: int = Query(10, ge=1, le=100),
+    current_user = Depends(get_admin_user)
+):
+    """Scheduled jobs with their next run and recent run history (admin only)"""
+    return await run_in_threadpool(scheduler.job_status, engine, history)
+
+@router.post("/jobs/{name}/run")
+async def run_job_now(name: str, current_user = Depends(get_admin_user)):
+    """Run a scheduled job immediately (admin only)"""
+    if name not in scheduler._jobs:
+        raise HTTPException(status_code=404, detail="Job not found")
+    status = await scheduler.trigger(engine, name)
+    if status is None:
+        raise HTTPException(status_code=409, detail="Job is already running")
+    return {"job": name, "status": status}
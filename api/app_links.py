@@ -1,13 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import models
 import schemas
 import crud
-from database import get_db
+from database import get_db, get_async_db
 from auth import get_current_admin_user, security
-from utils import create_paginated_response
+from utils import create_paginated_response, page_number, list_cursor
+from materialized import MaterializedView, serve
 import uuid
 # Dependency function for admin authentication
 def get_admin_user(
@@ -17,30 +19,42 @@ def get_admin_user(
     return get_current_admin_user(credentials, db)
 router = APIRouter()
 
+def _app_links_page(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[dict] = None):
+    links, total, next_cursor = crud.list_page(db.query(models.AppLink), models.AppLink, skip, limit, cursor)
+    return create_paginated_response(links, total, page_number(skip, limit, cursor), limit, next_cursor)
+
+# Offset pages are served from memory and rebuilt after writes
+links_view = MaterializedView(
+    "app_links", [models.AppLink], _app_links_page,
+    response_model=schemas.PaginatedResponse, default_params=(0, 100),
+)
+
 @router.get("/", response_model=schemas.PaginatedResponse)
 async def get_app_links(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
-    db: Session = Depends(get_db)
+    cursor: Optional[dict] = Depends(list_cursor(models.AppLink)),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all app links with pagination"""
     try:
-        links = crud.get_items(db, models.AppLink, skip, limit)
-        total = crud.count_items(db, models.AppLink)
-        return create_paginated_response(links, total, skip // limit + 1, limit)
+        if cursor is None:
+            return await serve(links_view, request, (skip, limit))
+        return await db.run_sync(_app_links_page, skip, limit, cursor)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve app links: {str(e)}")
 
 @router.get("/{link_title}", response_model=schemas.AppLink)
-async def get_app_link(link_title: str, db: Session = Depends(get_db)):
+async def get_app_link(link_title: str, db: AsyncSession = Depends(get_async_db)):
     """Get a specific app link by title"""
-    link = db.query(models.AppLink).filter(models.AppLink.title == link_title).first()
+    link = await crud.aget_by(db, models.AppLink, "title", link_title)
     if not link:
         raise HTTPException(status_code=404, detail="App link not found")
     return link
 
 @router.post("/", response_model=schemas.AppLink)
-async def create_app_link(
+def create_app_link(
     app_link: schemas.AppLinkCreate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_admin_user)
@@ -55,7 +69,7 @@ async def create_app_link(
         raise HTTPException(status_code=500, detail=f"Failed to create app link: {str(e)}")
 
 @router.put("/{link_title}", response_model=schemas.AppLink)
-async def update_app_link(
+def update_app_link(
     link_title: str,
     app_link: schemas.AppLinkCreate,
     db: Session = Depends(get_db),
@@ -73,7 +87,7 @@ async def update_app_link(
         raise HTTPException(status_code=500, detail=f"Failed to update app link: {str(e)}")
 
 @router.delete("/{link_title}")
-async def delete_app_link(
+def delete_app_link(
     link_title: str,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_admin_user)
@@ -8,15 +8,50 @@ import crud
 from database import get_db
 from auth import authenticate_user, create_access_token, get_current_user, get_password_hash
 from config import settings
-import google.auth.transport.requests
+from http_client import get_sync_client
+from fastapi.concurrency import run_in_threadpool
+import google.auth.exceptions
+import google.auth.transport
 import google.oauth2.id_token
+import httpx
 import uuid
 
 router = APIRouter()
 security = HTTPBearer()
 
+class _GoogleAuthResponse(google.auth.transport.Response):
+    def __init__(self, response: httpx.Response):
+        self._response = response
+
+    @property
+    def status(self):
+        return self._response.status_code
+
+    @property
+    def headers(self):
+        return self._response.headers
+
+    @property
+    def data(self):
+        return self._response.content
+
+class GoogleAuthRequest(google.auth.transport.Request):
+    """google-auth transport over the shared, pooled HTTP client (http_client.py)"""
+
+    def __call__(self, url, method="GET", body=None, headers=None, timeout=None, **kwargs):
+        try:
+            response = get_sync_client().request(
+                method, url, content=body, headers=headers,
+                timeout=timeout if timeout is not None else settings.HTTP_CLIENT_TIMEOUT
+            )
+        except httpx.HTTPError as e:
+            raise google.auth.exceptions.TransportError(e) from e
+        return _GoogleAuthResponse(response)
+
+google_request = GoogleAuthRequest()
+
 @router.post("/register", response_model=schemas.User)
-async def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
+def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
     """Register a new user"""
     try:
         # Check if user already exists
@@ -37,7 +72,7 @@ async def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Failed to register user: {str(e)}")
 
 @router.post("/login", response_model=schemas.Token)
-async def login(user_credentials: schemas.UserLogin, db: Session = Depends(get_db)):
+def login(user_credentials: schemas.UserLogin, db: Session = Depends(get_db)):
     """Authenticate user and return access and refresh tokens"""
     try:
         user = authenticate_user(db, user_credentials.username, user_credentials.password)
@@ -76,7 +111,7 @@ async def login(user_credentials: schemas.UserLogin, db: Session = Depends(get_d
         raise HTTPException(status_code=500, detail=f"Failed to login: {str(e)}")
 
 @router.get("/me", response_model=schemas.User)
-async def get_current_user_info(
+def get_current_user_info(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ):
@@ -94,7 +129,7 @@ async def get_current_user_info(
         raise HTTPException(status_code=500, detail=f"Failed to get user information: {str(e)}")
 
 @router.post("/refresh", response_model=schemas.Token)
-async def refresh_token_endpoint(
+def refresh_token_endpoint(
     refresh_request: schemas.RefreshTokenRequest,
     db: Session = Depends(get_db)
 ):
@@ -139,7 +174,7 @@ async def refresh_token_endpoint(
         raise HTTPException(status_code=500, detail=f"Failed to refresh token: {str(e)}")
 
 @router.post("/logout")
-async def logout(
+def logout(
     refresh_request: schemas.RefreshTokenRequest,
     db: Session = Depends(get_db)
 ):
@@ -153,6 +188,70 @@ async def logout(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to logout: {str(e)}")
 
+def _google_login_user(db: Session, google_user_id: str, email: str, photo_url: str):
+    """Find (or create) the user of a verified Google token, syncing google_id and photo_url"""
+    db_user = crud.get_user_by_email(db, email)
+
+    if not db_user:
+        # Create new user with Google authentication
+        username = email.split('@')[0] + '_' + str(uuid.uuid4())[:8]
+
+        # Google users don't use this password directly
+        random_password = str(uuid.uuid4())[:32]
+
+        user_data = schemas.UserCreate(
+            username=username,
+            email=email,
+            password=random_password,
+            google_id=google_user_id,
+            photo_url=photo_url
+        )
+
+        db_user = crud.create_user(db, user_data)
+    else:
+        # Update google_id and photo_url if changed
+        changed = False
+        if google_user_id and db_user.google_id != google_user_id:
+            db_user.google_id = google_user_id
+            changed = True
+        if photo_url and db_user.photo_url != photo_url:
+            db_user.photo_url = photo_url
+            changed = True
+        if changed:
+            db.commit()
+            db.refresh(db_user)
+    return db_user
+
+def _google_register_user(db: Session, google_user_id: str, email: str, photo_url: str):
+    """Create the user of a verified Google token; 400 if the email is taken"""
+    # Check if user already exists
+    db_user = crud.get_user_by_email(db, email)
+    if db_user:
+        raise HTTPException(status_code=400, detail="User already registered")
+
+    # Create username from email and add random suffix to ensure uniqueness
+    base_username = email.split('@')[0]
+    username = base_username
+    counter = 1
+
+    # Ensure username uniqueness
+    while crud.get_user_by_username(db, username):
+        username = f"{base_username}_{counter}"
+        counter += 1
+
+    # Google users don't use this password directly
+    random_password = str(uuid.uuid4())[:32]
+
+    user_data = schemas.UserCreate(
+        username=username,
+        email=email,
+        password=random_password,
+        google_id=google_user_id,
+        photo_url=photo_url
+    )
+
+    return crud.create_user(db, user_data)
+
 @router.post("/google-login", response_model=schemas.Token)
 async def google_login(request: Request, db: Session = Depends(get_db)):
     """Authenticate user with Google OAuth token"""
@@ -171,9 +270,11 @@ async def google_login(request: Request, db: Session = Depends(get_db)):
                     detail="Google OAuth is not configured on the server. Please contact the administrator."
                 )
             
-            idinfo = google.oauth2.id_token.verify_oauth2_token(
+            # Fetches Google's certificates (blocking): keep it off the event loop
+            idinfo = await run_in_threadpool(
+                google.oauth2.id_token.verify_oauth2_token,
                 google_token, 
-                google.auth.transport.requests.Request(),
+                google_request,
                 settings.GOOGLE_CLIENT_ID
             )
 
@@ -185,37 +286,8 @@ async def google_login(request: Request, db: Session = Depends(get_db)):
         except ValueError as e:
             raise HTTPException(status_code=401, detail=f"Invalid Google token: {str(e)}")
 
-        # Check if user exists
-        db_user = crud.get_user_by_email(db, email)
-
-        if not db_user:
-            # Create new user with Google authentication
-            username = email.split('@')[0] + '_' + str(uuid.uuid4())[:8]
-
-            # Google users don't use this password directly
-            random_password = str(uuid.uuid4())[:32]
-
-            user_data = schemas.UserCreate(
-                username=username,
-                email=email,
-                password=random_password,
-                google_id=google_user_id,
-                photo_url=photo_url
-            )
-
-            db_user = crud.create_user(db, user_data)
-        else:
-            # Update google_id and photo_url if changed
-            changed = False
-            if google_user_id and db_user.google_id != google_user_id:
-                db_user.google_id = google_user_id
-                changed = True
-            if photo_url and db_user.photo_url != photo_url:
-                db_user.photo_url = photo_url
-                changed = True
-            if changed:
-                db.commit()
-                db.refresh(db_user)
+        # Check if user exists (sync queries: keep them off the event loop)
+        db_user = await run_in_threadpool(_google_login_user, db, google_user_id, email, photo_url)
 
         if not db_user.is_active:
             raise HTTPException(
@@ -254,9 +326,11 @@ async def google_register(request: Request, db: Session = Depends(get_db)):
                     detail="Google OAuth is not configured on the server. Please contact the administrator."
                 )
             
-            idinfo = google.oauth2.id_token.verify_oauth2_token(
+            # Fetches Google's certificates (blocking): keep it off the event loop
+            idinfo = await run_in_threadpool(
+                google.oauth2.id_token.verify_oauth2_token,
                 google_token, 
-                google.auth.transport.requests.Request(),
+                google_request,
                 settings.GOOGLE_CLIENT_ID
             )
 
@@ -268,34 +342,7 @@ async def google_register(request: Request, db: Session = Depends(get_db)):
         except ValueError as e:
             raise HTTPException(status_code=401, detail=f"Invalid Google token: {str(e)}")
 
-        # Check if user already exists
-        db_user = crud.get_user_by_email(db, email)
-        if db_user:
-            raise HTTPException(status_code=400, detail="User already registered")
-
-        # Create username from email and add random suffix to ensure uniqueness
-        base_username = email.split('@')[0]
-        username = base_username
-        counter = 1
-
-        # Ensure username uniqueness
-        while crud.get_user_by_username(db, username):
-            username = f"{base_username}_{counter}"
-            counter += 1
-
-        # Google users don't use this password directly
-        random_password = str(uuid.uuid4())[:32]
-
-        user_data = schemas.UserCreate(
-            username=username,
-            email=email,
-            password=random_password,
-            google_id=google_user_id,
-            photo_url=photo_url
-        )
-
-        db_user = crud.create_user(db, user_data)
-        return db_user
+        return await run_in_threadpool(_google_register_user, db, google_user_id, email, photo_url)
 
     except HTTPException:
         raise
@@ -303,7 +350,7 @@ async def google_register(request: Request, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Failed to register with Google: {str(e)}")
 
 @router.delete("/delete-account")
-async def delete_account(
+def delete_account(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ):
@@ -326,14 +373,14 @@ async def update_points(
 ):
     """Update user points"""
     try:
-        current_user = get_current_user(credentials, db)
         body = await request.json()
+        current_user = await run_in_threadpool(get_current_user, credentials, db)
         points = body.get("points", 0)
         
         if not isinstance(points, int):
             raise HTTPException(status_code=400, detail="Points must be an integer")
         
-        updated_user = crud.update_user_points(db, current_user.id, points)
+        updated_user = await run_in_threadpool(crud.update_user_points, db, current_user.id, points)
         return {
             "message": f"Updated points by {points}",
             "total_points": updated_user.total_points,
@@ -352,14 +399,14 @@ async def add_points(
 ):
     """Add points to user"""
     try:
-        current_user = get_current_user(credentials, db)
         body = await request.json()
+        current_user = await run_in_threadpool(get_current_user, credentials, db)
         points = body.get("points", 0)
         
         if not isinstance(points, int) or points < 0:
             raise HTTPException(status_code=400, detail="Points must be a positive integer")
         
-        updated_user = crud.update_user_points(db, current_user.id, points)
+        updated_user = await run_in_threadpool(crud.update_user_points, db, current_user.id, points)
         return {
             "message": f"Added {points} points",
             "total_points": updated_user.total_points,
@@ -1,13 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, File, UploadFile, status
+from fastapi import APIRouter, Depends, HTTPException, Query, File, UploadFile, Request, status
 from fastapi.security import HTTPAuthorizationCredentials
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import models
 import schemas
 import crud
-from database import get_db
+from database import get_db, get_async_db
 from auth import get_current_user, get_current_admin_user, security
-from utils import save_file, create_paginated_response
+from utils import save_file, create_paginated_response, page_number, list_cursor
+from outbox import message
+from materialized import MaterializedView, serve
 import uuid
 
 # Dependency function for admin authentication
@@ -20,9 +24,10 @@ def get_admin_user(
 router = APIRouter()
 
 @router.get("/", response_model=schemas.PaginatedResponse)
-async def get_books(
+def get_books(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[dict] = Depends(list_cursor(models.Book)),
     category: Optional[str] = Query(None),
     search: Optional[str] = Query(None),
     db: Session = Depends(get_db)
@@ -30,37 +35,35 @@ async def get_books(
     """Get books with optional filtering and pagination"""
     try:
         if search:
-            books = crud.search_books(db, search, skip, limit)
-            total = crud.count_search_results(db, models.Book, search)
-        elif category:
-            books = crud.filter_books_by_category(db, category, skip, limit)
-            total = db.query(models.Book).filter(models.Book.category == category).count()
-        else:
-            books = crud.get_items(db, models.Book, skip, limit)
-            total = crud.count_items(db, models.Book)
+            offset = crud.cursor_offset(cursor, skip)
+            books, total = crud.search_page(db, models.Book, search, offset, limit)
+            next_cursor = crud.offset_cursor(offset, len(books), total)
+            return create_paginated_response(books, total, offset // limit + 1, limit, next_cursor)
+        criteria = [models.Book.category == category] if category else []
+        books, total, next_cursor = crud.list_page(db.query(models.Book).filter(*criteria), models.Book, skip, limit, cursor)
         
-        return create_paginated_response(books, total, skip // limit + 1, limit)
+        return create_paginated_response(books, total, page_number(skip, limit, cursor), limit, next_cursor)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve books: {str(e)}")
 
 @router.get("/by-title/{book_title}", response_model=schemas.Book)
-async def get_book_by_title(book_title: str, db: Session = Depends(get_db)):
+async def get_book_by_title(book_title: str, db: AsyncSession = Depends(get_async_db)):
     """Get a specific book by title"""
-    book = db.query(models.Book).filter(models.Book.title.ilike(f"%{book_title}%")).first()
+    book = await crud.afirst(db, models.Book, models.Book.title.ilike(f"%{book_title}%"))
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
     return book
 
 @router.get("/{book_title}", response_model=schemas.Book)
-async def get_book(book_title: str, db: Session = Depends(get_db)):
+async def get_book(book_title: str, db: AsyncSession = Depends(get_async_db)):
     """Get a specific book by title"""
-    book = db.query(models.Book).filter(models.Book.title == book_title).first()
+    book = await crud.aget_cached_by(db, models.Book, "title", book_title)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
     return book
 
 @router.post("/", response_model=schemas.Book)
-async def create_book(
+def create_book(
     book: schemas.BookCreate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_admin_user)
@@ -69,25 +72,26 @@ async def create_book(
     try:
         book_data = book.dict()
         book_data['id'] = str(uuid.uuid4())
-        db_book = crud.create_item(db, models.Book, book_data)
-        
-        # Send push notification for new book
-        from api.notifications import send_onesignal_notification
-        await send_onesignal_notification(
-            title="کتێبی نوێ",
-            content=f"کتێبی نوێ زیادکراوە: {db_book.title}",
-            custom_data={
-                "book_id": db_book.id,
-                "type": "new_book"
-            }
-        )
+        # Queued in the same commit, pushed by the outbox worker
+        db_book = crud.create_item(db, models.Book, book_data, notifications=[
+            message(
+                title="کتێبی نوێ",
+                content=f"کتێبی نوێ زیادکراوە: {book_data.get('title')}",
+                custom_data={
+                    "book_id": book_data['id'],
+                    "type": "new_book"
+                },
+                group="new_book",
+                digest="{count} کتێبی نوێ زیادکراون"
+            )
+        ])
         
         return db_book
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create book: {str(e)}")
 
 @router.put("/{book_title}", response_model=schemas.Book)
-async def update_book(
+def update_book(
     book_title: str,
     book: schemas.BookCreate,
     db: Session = Depends(get_db),
@@ -105,7 +109,7 @@ async def update_book(
         raise HTTPException(status_code=500, detail=f"Failed to update book: {str(e)}")
 
 @router.delete("/{book_title}")
-async def delete_book(
+def delete_book(
     book_title: str,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_admin_user)
@@ -129,23 +133,28 @@ async def upload_book_cover(
     current_user: models.User = Depends(get_admin_user)
 ):
     """Upload book cover image (admin only)"""
-    db_book = db.query(models.Book).filter(models.Book.title == book_title).first()
+    db_book = await run_in_threadpool(
+        lambda: db.query(models.Book).filter(models.Book.title == book_title).first()
+    )
     if not db_book:
         raise HTTPException(status_code=404, detail="Book not found")
     
     try:
         file_url = await save_file(file, "covers")
-        db_book.cover_url = file_url
-        db.commit()
+        await run_in_threadpool(crud.update_item, db, db_book, {"cover_url": file_url})
         return {"message": "Cover uploaded successfully", "cover_url": file_url}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to upload cover: {str(e)}")
 
+categories_view = MaterializedView(
+    "books.categories", [models.Book],
+    lambda db: {"categories": [cat[0] for cat in db.query(models.Book.category).distinct().all() if cat[0]]},
+)
+
 @router.get("/categories/list")
-async def get_categories(db: Session = Depends(get_db)):
+async def get_categories(request: Request):
     """Get all unique book categories"""
     try:
-        categories = db.query(models.Book.category).distinct().all()
-        return {"categories": [cat[0] for cat in categories if cat[0]]}
+        return await serve(categories_view, request)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get categories: {str(e)}")
@@ -1,13 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import models
 import schemas
 import crud
-from database import get_db
+from database import get_db, get_async_db
 from auth import get_current_user, get_current_admin_user, security
-from utils import create_paginated_response
+from search import apply_search
+from utils import create_paginated_response, page_number, list_cursor, content_notification
+from autocomplete import dictionary_index, refresh_dictionary_index
 import uuid
 # Dependency function for admin authentication
 def get_admin_user(
@@ -18,17 +21,28 @@ def get_admin_user(
 router = APIRouter()
 
 @router.get("/by-name/{word_name}", response_model=schemas.DictionaryWord)
-async def get_word_by_name(word_name: str, db: Session = Depends(get_db)):
-    """Get a specific dictionary word by name"""
-    word = db.query(models.DictionaryWord).filter(models.DictionaryWord.name.ilike(f"%{word_name}%")).first()
+def get_word_by_name(word_name: str, response: Response, db: Session = Depends(get_db)):
+    """Get the dictionary word whose name best matches (trigram similarity)"""
+    word, score = crud.fuzzy_lookup(db, models.DictionaryWord, word_name)
     if not word:
         raise HTTPException(status_code=404, detail="Dictionary word not found")
+    response.headers["X-Match-Score"] = f"{score:.3f}"
     return word
 
+@router.get("/suggest")
+async def suggest_words(
+    prefix: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50)
+):
+    """Autocomplete dictionary words by name, kurdish or arabic prefix (served from memory)"""
+    await refresh_dictionary_index()
+    return {"prefix": prefix, "suggestions": dictionary_index.suggest(prefix, limit)}
+
 @router.get("/", response_model=schemas.PaginatedResponse)
-async def get_dictionary_words(
+def get_dictionary_words(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[dict] = Depends(list_cursor(models.DictionaryWord)),
     search: Optional[str] = Query(None),
     favorites_only: bool = Query(False),
     saved_only: bool = Query(False),
@@ -36,39 +50,40 @@ async def get_dictionary_words(
 ):
     """Get dictionary words with optional filtering and pagination"""
     try:
-        query = db.query(models.DictionaryWord)
+        if search and not (favorites_only or saved_only):
+            offset = crud.cursor_offset(cursor, skip)
+            words, total = crud.search_page(db, models.DictionaryWord, search, offset, limit)
+            next_cursor = crud.offset_cursor(offset, len(words), total)
+            return create_paginated_response(words, total, offset // limit + 1, limit, next_cursor)
 
-        if search:
-            query = query.filter(
-                models.DictionaryWord.name.ilike(f"%{search}%") |
-                models.DictionaryWord.kurdish.ilike(f"%{search}%") |
-                models.DictionaryWord.arabic.ilike(f"%{search}%") |
-                models.DictionaryWord.description.ilike(f"%{search}%")
-            )
+        criteria = []
 
         if favorites_only:
-            query = query.filter(models.DictionaryWord.is_favorite == True)
+            criteria.append(models.DictionaryWord.is_favorite == True)
 
         if saved_only:
-            query = query.filter(models.DictionaryWord.is_saved == True)
+            criteria.append(models.DictionaryWord.is_saved == True)
 
-        total = query.count()
-        words = query.offset(skip).limit(limit).all()
+        if search:
+            query = apply_search(db.query(models.DictionaryWord), models.DictionaryWord, search).filter(*criteria)
+            words, total, next_cursor = crud.ranked_page(query, skip, limit, cursor)
+        else:
+            words, total, next_cursor = crud.list_page(db.query(models.DictionaryWord).filter(*criteria), models.DictionaryWord, skip, limit, cursor)
 
-        return create_paginated_response(words, total, skip // limit + 1, limit)
+        return create_paginated_response(words, total, page_number(skip, limit, cursor), limit, next_cursor)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve dictionary words: {str(e)}")
 
 @router.get("/{word_name}", response_model=schemas.DictionaryWord)
-async def get_dictionary_word(word_name: str, db: Session = Depends(get_db)):
+async def get_dictionary_word(word_name: str, db: AsyncSession = Depends(get_async_db)):
     """Get a specific dictionary word by name"""
-    word = db.query(models.DictionaryWord).filter(models.DictionaryWord.name == word_name).first()
+    word = await crud.aget_cached_by(db, models.DictionaryWord, "name", word_name)
     if not word:
         raise HTTPException(status_code=404, detail="Dictionary word not found")
     return word
 
 @router.post("/", response_model=schemas.DictionaryWord)
-async def create_dictionary_word(
+def create_dictionary_word(
     word: schemas.DictionaryWordCreate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_admin_user)
@@ -77,18 +92,17 @@ async def create_dictionary_word(
     try:
         word_data = word.dict()
         word_data['id'] = str(uuid.uuid4())
-        db_word = crud.create_item(db, models.DictionaryWord, word_data)
-        
-        # Send notification for new dictionary word
-        from utils import send_content_notification
-        await send_content_notification("word", word_data.get('name', 'Unknown'), word_data['id'])
+        # Queued in the same commit, pushed by the outbox worker
+        db_word = crud.create_item(db, models.DictionaryWord, word_data, notifications=[
+            content_notification("word", word_data.get('name', 'Unknown'), word_data['id'])
+        ])
         
         return db_word
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create dictionary word: {str(e)}")
 
 @router.put("/{word_name}", response_model=schemas.DictionaryWord)
-async def update_dictionary_word(
+def update_dictionary_word(
     word_name: str,
     word: schemas.DictionaryWordCreate,
     db: Session = Depends(get_db),
@@ -106,7 +120,7 @@ async def update_dictionary_word(
         raise HTTPException(status_code=500, detail=f"Failed to update dictionary word: {str(e)}")
 
 @router.delete("/{word_name}")
-async def delete_dictionary_word(
+def delete_dictionary_word(
     word_name: str,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_admin_user)
@@ -130,7 +144,7 @@ def get_authenticated_user(
     return get_current_user(credentials, db)
 
 @router.post("/{word_name}/favorite")
-async def toggle_favorite(
+def toggle_favorite(
     word_name: str,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_authenticated_user)
@@ -141,8 +155,7 @@ async def toggle_favorite(
         raise HTTPException(status_code=404, detail="Dictionary word not found")
 
     try:
-        word.is_favorite = not word.is_favorite
-        db.commit()
+        word = crud.update_item(db, word, {"is_favorite": not word.is_favorite})
 
         # Award points for favoriting
         if word.is_favorite:
@@ -153,7 +166,7 @@ async def toggle_favorite(
         raise HTTPException(status_code=500, detail=f"Failed to update favorite status: {str(e)}")
 
 @router.post("/{word_name}/save")
-async def toggle_save(
+def toggle_save(
     word_name: str,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_authenticated_user)
@@ -164,8 +177,7 @@ async def toggle_save(
         raise HTTPException(status_code=404, detail="Dictionary word not found")
 
     try:
-        word.is_saved = not word.is_saved
-        db.commit()
+        word = crud.update_item(db, word, {"is_saved": not word.is_saved})
 
         # Award points for saving
         if word.is_saved:
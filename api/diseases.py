@@ -1,13 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import models
 import schemas
 import crud
-from database import get_db
+from database import get_db, get_async_db
 from auth import get_current_admin_user, security
-from utils import create_paginated_response
+from utils import create_paginated_response, page_number, list_cursor
+from outbox import message
 import uuid
 # Dependency function for admin authentication
 def get_admin_user(
@@ -18,43 +20,45 @@ def get_admin_user(
 router = APIRouter()
 
 @router.get("/", response_model=schemas.PaginatedResponse)
-async def get_diseases(
+def get_diseases(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[dict] = Depends(list_cursor(models.Disease)),
     search: Optional[str] = Query(None),
     db: Session = Depends(get_db)
 ):
     """Get diseases with optional search and pagination"""
     try:
         if search:
-            diseases = crud.search_diseases(db, search, skip, limit)
-            total = crud.count_search_results(db, models.Disease, search)
-        else:
-            diseases = crud.get_items(db, models.Disease, skip, limit)
-            total = crud.count_items(db, models.Disease)
+            offset = crud.cursor_offset(cursor, skip)
+            diseases, total = crud.search_page(db, models.Disease, search, offset, limit)
+            next_cursor = crud.offset_cursor(offset, len(diseases), total)
+            return create_paginated_response(diseases, total, offset // limit + 1, limit, next_cursor)
+        diseases, total, next_cursor = crud.list_page(db.query(models.Disease), models.Disease, skip, limit, cursor)
         
-        return create_paginated_response(diseases, total, skip // limit + 1, limit)
+        return create_paginated_response(diseases, total, page_number(skip, limit, cursor), limit, next_cursor)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve diseases: {str(e)}")
 
 @router.get("/by-name/{disease_name}", response_model=schemas.Disease)
-async def get_disease_by_name(disease_name: str, db: Session = Depends(get_db)):
-    """Get a specific disease by name"""
-    disease = db.query(models.Disease).filter(models.Disease.name.ilike(f"%{disease_name}%")).first()
+def get_disease_by_name(disease_name: str, response: Response, db: Session = Depends(get_db)):
+    """Get the disease whose name best matches (trigram similarity)"""
+    disease, score = crud.fuzzy_lookup(db, models.Disease, disease_name)
     if not disease:
         raise HTTPException(status_code=404, detail="Disease not found")
+    response.headers["X-Match-Score"] = f"{score:.3f}"
     return disease
 
 @router.get("/{disease_name}", response_model=schemas.Disease)
-async def get_disease(disease_name: str, db: Session = Depends(get_db)):
+async def get_disease(disease_name: str, db: AsyncSession = Depends(get_async_db)):
     """Get a specific disease by name"""
-    disease = db.query(models.Disease).filter(models.Disease.name == disease_name).first()
+    disease = await crud.aget_cached_by(db, models.Disease, "name", disease_name)
     if not disease:
         raise HTTPException(status_code=404, detail="Disease not found")
     return disease
 
 @router.post("/", response_model=schemas.Disease)
-async def create_disease(
+def create_disease(
     disease: schemas.DiseaseCreate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_admin_user)
@@ -63,25 +67,26 @@ async def create_disease(
     try:
         disease_data = disease.dict()
         disease_data['id'] = str(uuid.uuid4())
-        db_disease = crud.create_item(db, models.Disease, disease_data)
-        
-        # Send push notification for new disease
-        from api.notifications import send_onesignal_notification
-        await send_onesignal_notification(
-            title="نەخۆشی نوێ",
-            content=f"نەخۆشی نوێ زیادکراوە: {db_disease.name}",
-            custom_data={
-                "disease_id": db_disease.id,
-                "type": "new_disease"
-            }
-        )
+        # Queued in the same commit, pushed by the outbox worker
+        db_disease = crud.create_item(db, models.Disease, disease_data, notifications=[
+            message(
+                title="نەخۆشی نوێ",
+                content=f"نەخۆشی نوێ زیادکراوە: {disease_data.get('name')}",
+                custom_data={
+                    "disease_id": disease_data['id'],
+                    "type": "new_disease"
+                },
+                group="new_disease",
+                digest="{count} نەخۆشی نوێ زیادکراون"
+            )
+        ])
         
         return db_disease
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create disease: {str(e)}")
 
 @router.put("/{disease_name}", response_model=schemas.Disease)
-async def update_disease(
+def update_disease(
     disease_name: str,
     disease: schemas.DiseaseCreate,
     db: Session = Depends(get_db),
@@ -99,7 +104,7 @@ async def update_disease(
         raise HTTPException(status_code=500, detail=f"Failed to update disease: {str(e)}")
 
 @router.delete("/{disease_name}")
-async def delete_disease(
+def delete_disease(
     disease_name: str,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_admin_user)
@@ -1,13 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import models
 import schemas
 import crud
-from database import get_db
+from database import get_db, get_async_db
 from auth import get_current_admin_user, security
-from utils import create_paginated_response
+from utils import create_paginated_response, page_number, list_cursor, content_notification
+from materialized import MaterializedView, serve
 import uuid
 # Dependency function for admin authentication
 def get_admin_user(
@@ -18,9 +20,10 @@ def get_admin_user(
 router = APIRouter()
 
 @router.get("/", response_model=schemas.PaginatedResponse)
-async def get_drugs(
+def get_drugs(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[dict] = Depends(list_cursor(models.Drug)),
     search: Optional[str] = Query(None),
     drug_class: Optional[str] = Query(None),
     db: Session = Depends(get_db)
@@ -28,37 +31,36 @@ async def get_drugs(
     """Get drugs with optional filtering and pagination"""
     try:
         if search:
-            drugs = crud.search_drugs(db, search, skip, limit)
-            total = crud.count_search_results(db, models.Drug, search)
-        elif drug_class:
-            drugs = crud.filter_drugs_by_class(db, drug_class, skip, limit)
-            total = db.query(models.Drug).filter(models.Drug.drug_class == drug_class).count()
-        else:
-            drugs = crud.get_items(db, models.Drug, skip, limit)
-            total = crud.count_items(db, models.Drug)
+            offset = crud.cursor_offset(cursor, skip)
+            drugs, total = crud.search_page(db, models.Drug, search, offset, limit)
+            next_cursor = crud.offset_cursor(offset, len(drugs), total)
+            return create_paginated_response(drugs, total, offset // limit + 1, limit, next_cursor)
+        criteria = [models.Drug.drug_class == drug_class] if drug_class else []
+        drugs, total, next_cursor = crud.list_page(db.query(models.Drug).filter(*criteria), models.Drug, skip, limit, cursor)
         
-        return create_paginated_response(drugs, total, skip // limit + 1, limit)
+        return create_paginated_response(drugs, total, page_number(skip, limit, cursor), limit, next_cursor)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve drugs: {str(e)}")
 
 @router.get("/by-name/{drug_name}", response_model=schemas.Drug)
-async def get_drug_by_name(drug_name: str, db: Session = Depends(get_db)):
-    """Get a specific drug by name"""
-    drug = db.query(models.Drug).filter(models.Drug.name.ilike(f"%{drug_name}%")).first()
+def get_drug_by_name(drug_name: str, response: Response, db: Session = Depends(get_db)):
+    """Get the drug whose name best matches (trigram similarity)"""
+    drug, score = crud.fuzzy_lookup(db, models.Drug, drug_name)
     if not drug:
         raise HTTPException(status_code=404, detail="Drug not found")
+    response.headers["X-Match-Score"] = f"{score:.3f}"
     return drug
 
 @router.get("/{drug_name}", response_model=schemas.Drug)
-async def get_drug(drug_name: str, db: Session = Depends(get_db)):
+async def get_drug(drug_name: str, db: AsyncSession = Depends(get_async_db)):
     """Get a specific drug by name"""
-    drug = db.query(models.Drug).filter(models.Drug.name == drug_name).first()
+    drug = await crud.aget_cached_by(db, models.Drug, "name", drug_name)
     if not drug:
         raise HTTPException(status_code=404, detail="Drug not found")
     return drug
 
 @router.post("/", response_model=schemas.Drug)
-async def create_drug(
+def create_drug(
     drug: schemas.DrugCreate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_admin_user)
@@ -67,18 +69,17 @@ async def create_drug(
     try:
         drug_data = drug.dict()
         drug_data['id'] = str(uuid.uuid4())
-        db_drug = crud.create_item(db, models.Drug, drug_data)
-        
-        # Send notification for new drug
-        from utils import send_content_notification
-        await send_content_notification("drug", drug_data.get('name', 'Unknown'), drug_data['id'])
+        # Queued in the same commit, pushed by the outbox worker
+        db_drug = crud.create_item(db, models.Drug, drug_data, notifications=[
+            content_notification("drug", drug_data.get('name', 'Unknown'), drug_data['id'])
+        ])
         
         return db_drug
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create drug: {str(e)}")
 
 @router.put("/{drug_name}", response_model=schemas.Drug)
-async def update_drug(
+def update_drug(
     drug_name: str,
     drug: schemas.DrugCreate,
     db: Session = Depends(get_db),
@@ -96,7 +97,7 @@ async def update_drug(
         raise HTTPException(status_code=500, detail=f"Failed to update drug: {str(e)}")
 
 @router.delete("/{drug_name}")
-async def delete_drug(
+def delete_drug(
     drug_name: str,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_admin_user)
@@ -112,11 +113,15 @@ async def delete_drug(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to delete drug: {str(e)}")
 
+classes_view = MaterializedView(
+    "drugs.classes", [models.Drug],
+    lambda db: {"classes": [cls[0] for cls in db.query(models.Drug.drug_class).distinct().all() if cls[0]]},
+)
+
 @router.get("/classes/list")
-async def get_drug_classes(db: Session = Depends(get_db)):
+async def get_drug_classes(request: Request):
     """Get all unique drug classes"""
     try:
-        classes = db.query(models.Drug.drug_class).distinct().all()
-        return {"classes": [cls[0] for cls in classes if cls[0]]}
+        return await serve(classes_view, request)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get drug classes: {str(e)}")
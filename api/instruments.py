@@ -1,13 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import models
 import schemas
 import crud
-from database import get_db
+from database import get_db, get_async_db
 from auth import get_current_admin_user, security
-from utils import create_paginated_response
+from search import apply_search
+from utils import create_paginated_response, page_number, list_cursor, content_notification
 import uuid
 # Dependency function for admin authentication
 def get_admin_user(
@@ -18,47 +20,38 @@ def get_admin_user(
 router = APIRouter()
 
 @router.get("/", response_model=schemas.PaginatedResponse)
-async def get_instruments(
+def get_instruments(
     search: Optional[str] = Query(None),
     category: Optional[str] = Query(None),
     offset: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[dict] = Depends(list_cursor(models.Instrument)),
     db: Session = Depends(get_db)
 ):
     """Get all instruments with optional search, category filter, and pagination"""
     try:
-        query = db.query(models.Instrument)
+        criteria = [models.Instrument.category == category] if category else []
         
         if search:
-            from sqlalchemy import or_
-            query = query.filter(
-                or_(
-                    models.Instrument.name.ilike(f"%{search}%"),
-                    models.Instrument.category.ilike(f"%{search}%"),
-                    models.Instrument.description.ilike(f"%{search}%")
-                )
-            )
+            query = apply_search(db.query(models.Instrument), models.Instrument, search).filter(*criteria).order_by(models.Instrument.created_at.desc())
+            instruments, total, next_cursor = crud.ranked_page(query, offset, limit, cursor)
+        else:
+            instruments, total, next_cursor = crud.list_page(db.query(models.Instrument).filter(*criteria), models.Instrument, offset, limit, cursor)
         
-        if category:
-            query = query.filter(models.Instrument.category == category)
-        
-        total = query.count()
-        instruments = query.order_by(models.Instrument.created_at.desc()).offset(offset).limit(limit).all()
-        
-        return create_paginated_response(instruments, total, offset // limit + 1, limit)
+        return create_paginated_response(instruments, total, page_number(offset, limit, cursor), limit, next_cursor)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve instruments: {str(e)}")
 
 @router.get("/{instrument_name}", response_model=schemas.Instrument)
-async def read_instrument(instrument_name: str, db: Session = Depends(get_db)):
+async def read_instrument(instrument_name: str, db: AsyncSession = Depends(get_async_db)):
     """Get a specific instrument by name"""
-    db_instrument = db.query(models.Instrument).filter(models.Instrument.name == instrument_name).first()
+    db_instrument = await crud.aget_by(db, models.Instrument, "name", instrument_name)
     if db_instrument is None:
         raise HTTPException(status_code=404, detail="Instrument not found")
     return db_instrument
 
 @router.post("/", response_model=schemas.Instrument)
-async def create_instrument(
+def create_instrument(
     instrument: schemas.InstrumentCreate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_admin_user)
@@ -67,18 +60,17 @@ async def create_instrument(
     try:
         instrument_data = instrument.dict()
         instrument_data['id'] = str(uuid.uuid4())
-        db_instrument = crud.create_item(db, models.Instrument, instrument_data)
-        
-        # Send notification for new instrument
-        from utils import send_content_notification
-        await send_content_notification("instrument", instrument_data.get('name', 'Unknown'), instrument_data['id'])
+        # Queued in the same commit, pushed by the outbox worker
+        db_instrument = crud.create_item(db, models.Instrument, instrument_data, notifications=[
+            content_notification("instrument", instrument_data.get('name', 'Unknown'), instrument_data['id'])
+        ])
         
         return db_instrument
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create instrument: {str(e)}")
 
 @router.put("/{instrument_name}", response_model=schemas.Instrument)
-async def update_instrument(instrument_name: str, instrument: schemas.InstrumentCreate, db: Session = Depends(get_db),
+def update_instrument(instrument_name: str, instrument: schemas.InstrumentCreate, db: Session = Depends(get_db),
     current_user: models.User = Depends(get_admin_user)):
     """Update an instrument (admin only)"""
     db_instrument = db.query(models.Instrument).filter(models.Instrument.name == instrument_name).first()
@@ -93,7 +85,7 @@ async def update_instrument(instrument_name: str, instrument: schemas.Instrument
         raise HTTPException(status_code=500, detail=f"Failed to update instrument: {str(e)}")
 
 @router.delete("/{instrument_name}")
-async def delete_instrument(instrument_name: str, db: Session = Depends(get_db),
+def delete_instrument(instrument_name: str, db: Session = Depends(get_db),
     current_user: models.User = Depends(get_admin_user)):
     """Delete an instrument (admin only)"""
     db_instrument = db.query(models.Instrument).filter(models.Instrument.name == instrument_name).first()
@@ -10,7 +10,7 @@ router = APIRouter()
 security = HTTPBearer(auto_error=False)
 
 @router.get("/")
-async def get_leaderboard(
+def get_leaderboard(
     limit: int = Query(50, ge=1, le=100),
     db: Session = Depends(get_db)
 ):
@@ -38,7 +38,7 @@ async def get_leaderboard(
 
 
 @router.get("/my-rank")
-async def get_my_rank(
+def get_my_rank(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ):
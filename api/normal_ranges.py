@@ -1,13 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import models
 import schemas
 import crud
-from database import get_db
+from database import get_db, get_async_db
 from auth import get_current_admin_user, security
-from utils import create_paginated_response
+from utils import create_paginated_response, page_number, list_cursor
+from materialized import MaterializedView, serve
 import uuid
 # Dependency function for admin authentication
 def get_admin_user(
@@ -18,47 +20,46 @@ def get_admin_user(
 router = APIRouter()
 
 @router.get("/by-name/{range_name}", response_model=schemas.NormalRange)
-async def get_range_by_name(range_name: str, db: Session = Depends(get_db)):
-    """Get a specific normal range by name"""
-    range_data = db.query(models.NormalRange).filter(models.NormalRange.name.ilike(f"%{range_name}%")).first()
+def get_range_by_name(range_name: str, response: Response, db: Session = Depends(get_db)):
+    """Get the normal range whose name best matches (trigram similarity)"""
+    range_data, score = crud.fuzzy_lookup(db, models.NormalRange, range_name)
     if not range_data:
         raise HTTPException(status_code=404, detail="Normal range not found")
+    response.headers["X-Match-Score"] = f"{score:.3f}"
     return range_data
 
 @router.get("/", response_model=schemas.PaginatedResponse)
-async def get_normal_ranges(
+def get_normal_ranges(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[dict] = Depends(list_cursor(models.NormalRange)),
     species: Optional[str] = Query(None),
     category: Optional[str] = Query(None),
     db: Session = Depends(get_db)
 ):
     """Get normal ranges with optional filtering and pagination"""
     try:
+        criteria = []
         if species:
-            ranges = crud.filter_normal_ranges_by_species(db, species, skip, limit)
-            total = db.query(models.NormalRange).filter(models.NormalRange.species == species).count()
+            criteria.append(models.NormalRange.species == species)
         elif category:
-            ranges = crud.filter_normal_ranges_by_category(db, category, skip, limit)
-            total = db.query(models.NormalRange).filter(models.NormalRange.category == category).count()
-        else:
-            ranges = crud.get_items(db, models.NormalRange, skip, limit)
-            total = crud.count_items(db, models.NormalRange)
+            criteria.append(models.NormalRange.category == category)
+        ranges, total, next_cursor = crud.list_page(db.query(models.NormalRange).filter(*criteria), models.NormalRange, skip, limit, cursor)
         
-        return create_paginated_response(ranges, total, skip // limit + 1, limit)
+        return create_paginated_response(ranges, total, page_number(skip, limit, cursor), limit, next_cursor)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve normal ranges: {str(e)}")
 
 @router.get("/{range_name}", response_model=schemas.NormalRange)
-async def get_normal_range(range_name: str, db: Session = Depends(get_db)):
+async def get_normal_range(range_name: str, db: AsyncSession = Depends(get_async_db)):
     """Get a specific normal range by name"""
-    range_item = db.query(models.NormalRange).filter(models.NormalRange.name == range_name).first()
+    range_item = await crud.aget_by(db, models.NormalRange, "name", range_name)
     if not range_item:
         raise HTTPException(status_code=404, detail="Normal range not found")
     return range_item
 
 @router.post("/", response_model=schemas.NormalRange)
-async def create_normal_range(
+def create_normal_range(
     normal_range: schemas.NormalRangeCreate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_admin_user)
@@ -73,7 +74,7 @@ async def create_normal_range(
         raise HTTPException(status_code=500, detail=f"Failed to create normal range: {str(e)}")
 
 @router.put("/{range_name}", response_model=schemas.NormalRange)
-async def update_normal_range(
+def update_normal_range(
     range_name: str,
     normal_range: schemas.NormalRangeCreate,
     db: Session = Depends(get_db),
@@ -91,7 +92,7 @@ async def update_normal_range(
         raise HTTPException(status_code=500, detail=f"Failed to update normal range: {str(e)}")
 
 @router.delete("/{range_name}")
-async def delete_normal_range(
+def delete_normal_range(
     range_name: str,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_admin_user)
@@ -107,20 +108,27 @@ async def delete_normal_range(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to delete normal range: {str(e)}")
 
+species_view = MaterializedView(
+    "normal_ranges.species", [models.NormalRange],
+    lambda db: {"species": [sp[0] for sp in db.query(models.NormalRange.species).distinct().all() if sp[0]]},
+)
+categories_view = MaterializedView(
+    "normal_ranges.categories", [models.NormalRange],
+    lambda db: {"categories": [cat[0] for cat in db.query(models.NormalRange.category).distinct().all() if cat[0]]},
+)
+
 @router.get("/species/list")
-async def get_species_list(db: Session = Depends(get_db)):
+async def get_species_list(request: Request):
     """Get all unique species"""
     try:
-        species = db.query(models.NormalRange.species).distinct().all()
-        return {"species": [sp[0] for sp in species if sp[0]]}
+        return await serve(species_view, request)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get species list: {str(e)}")
 
 @router.get("/categories/list")
-async def get_categories_list(db: Session = Depends(get_db)):
+async def get_categories_list(request: Request):
     """Get all unique categories"""
     try:
-        categories = db.query(models.NormalRange.category).distinct().all()
-        return {"categories": [cat[0] for cat in categories if cat[0]]}
+        return await serve(categories_view, request)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get categories list: {str(e)}")
@@ -1,14 +1,15 @@
 # Updating API endpoints to use 'name' instead of 'id' for note lookups, updates, and deletes.
 from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import models
 import schemas
 import crud
-from database import get_db
+from database import get_db, get_async_db
 from auth import get_current_admin_user, security
-from utils import create_paginated_response
+from utils import create_paginated_response, page_number, list_cursor, content_notification
 import uuid
 # Dependency function for admin authentication
 def get_admin_user(
@@ -19,29 +20,29 @@ def get_admin_user(
 router = APIRouter()
 
 @router.get("/", response_model=schemas.PaginatedResponse)
-async def get_notes(
+def get_notes(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[dict] = Depends(list_cursor(models.Note)),
     db: Session = Depends(get_db)
 ):
     """Get all notes with pagination"""
     try:
-        notes = db.query(models.Note).order_by(models.Note.created_at.desc()).offset(skip).limit(limit).all()
-        total = crud.count_items(db, models.Note)
-        return create_paginated_response(notes, total, skip // limit + 1, limit)
+        notes, total, next_cursor = crud.list_page(db.query(models.Note), models.Note, skip, limit, cursor)
+        return create_paginated_response(notes, total, page_number(skip, limit, cursor), limit, next_cursor)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve notes: {str(e)}")
 
 @router.get("/{note_name}", response_model=schemas.Note)
-async def get_note(note_name: str, db: Session = Depends(get_db)):
+async def get_note(note_name: str, db: AsyncSession = Depends(get_async_db)):
     """Get a specific note by name"""
-    note = db.query(models.Note).filter(models.Note.name == note_name).first()
+    note = await crud.aget_by(db, models.Note, "name", note_name)
     if not note:
         raise HTTPException(status_code=404, detail="Note not found")
     return note
 
 @router.post("/", response_model=schemas.Note)
-async def create_note(
+def create_note(
     note: schemas.NoteCreate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_admin_user)
@@ -50,18 +51,17 @@ async def create_note(
     try:
         note_data = note.dict()
         note_data['id'] = str(uuid.uuid4())
-        db_note = crud.create_item(db, models.Note, note_data)
-        
-        # Send notification for new note
-        from utils import send_content_notification
-        await send_content_notification("note", note_data.get('name', 'Unknown'), note_data['id'])
+        # Queued in the same commit, pushed by the outbox worker
+        db_note = crud.create_item(db, models.Note, note_data, notifications=[
+            content_notification("note", note_data.get('name', 'Unknown'), note_data['id'])
+        ])
         
         return db_note
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create note: {str(e)}")
 
 @router.put("/{note_name}", response_model=schemas.Note)
-async def update_note(
+def update_note(
     note_name: str,
     note: schemas.NoteCreate,
     db: Session = Depends(get_db),
@@ -79,7 +79,7 @@ async def update_note(
         raise HTTPException(status_code=500, detail=f"Failed to update note: {str(e)}")
 
 @router.delete("/{note_name}")
-async def delete_note(
+def delete_note(
     note_name: str,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_admin_user)
@@ -7,11 +7,11 @@ import schemas
 import crud
 from database import get_db
 from auth import get_current_admin_user, security
-from utils import create_paginated_response
+from utils import create_paginated_response, page_number, list_cursor
 import uuid
-import httpx
+from http_client import get_async_client
 import os
-from logger import app_logger
+from outbox import message
 # Dependency function for admin authentication
 def get_admin_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
@@ -19,69 +19,63 @@ def get_admin_user(
 ):
     return get_current_admin_user(credentials, db)
 
-async def send_onesignal_notification(title: str, content: str, custom_data: dict = None):
-    """Send push notification via OneSignal"""
-    try:
-        # Get OneSignal credentials from environment variables
-        onesignal_app_id = os.getenv("ONESIGNAL_APP_ID")
-        onesignal_rest_api_key = os.getenv("ONESIGNAL_REST_API_KEY")
-        
-        if not onesignal_app_id or not onesignal_rest_api_key:
-            app_logger.warning("OneSignal credentials not configured")
-            return False
-        
-        # OneSignal API endpoint
-        url = "https://onesignal.com/api/v1/notifications"
-        
-        # Headers
-        headers = {
-            "Authorization": f"Basic {onesignal_rest_api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        # Notification payload
-        payload = {
-            "app_id": onesignal_app_id,
-            "included_segments": ["All"],  # Send to all users
-            "headings": {"en": title},
-            "contents": {"en": content}
-        }
-        
-        # Add custom data if provided
-        if custom_data:
-            payload["data"] = custom_data
-        
-        # Send the notification using async httpx
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, json=payload, headers=headers, timeout=10)
-        
-        if response.status_code == 200:
-            return True
-        else:
-            app_logger.warning(f"OneSignal notification failed: {response.status_code}")
-            return False
-            
-    except Exception as e:
-        app_logger.error(f"Error sending OneSignal notification: {str(e)}")
-        return False
+def onesignal_configured() -> bool:
+    """Whether the OneSignal credentials are set (the outbox waits until they are)"""
+    return bool(os.getenv("ONESIGNAL_APP_ID") and os.getenv("ONESIGNAL_REST_API_KEY"))
+
+async def post_onesignal_notification(title: str, content: str, custom_data: dict = None):
+    """Send push notification via OneSignal; raises if it was not accepted"""
+    if not onesignal_configured():
+        raise RuntimeError("OneSignal credentials not configured")
+    # Get OneSignal credentials from environment variables
+    onesignal_app_id = os.getenv("ONESIGNAL_APP_ID")
+    onesignal_rest_api_key = os.getenv("ONESIGNAL_REST_API_KEY")
+    
+    # OneSignal API endpoint
+    url = "https://onesignal.com/api/v1/notifications"
+    
+    # Headers
+    headers = {
+        "Authorization": f"Basic {onesignal_rest_api_key}",
+        "Content-Type": "application/json"
+    }
+    
+    # Notification payload
+    payload = {
+        "app_id": onesignal_app_id,
+        "included_segments": ["All"],  # Send to all users
+        "headings": {"en": title},
+        "contents": {"en": content}
+    }
+    
+    # Add custom data if provided
+    if custom_data:
+        payload["data"] = custom_data
+    
+    # Send the notification on the shared keep-alive client
+    response = await get_async_client().post(url, json=payload, headers=headers)
+    
+    if response.status_code != 200:
+        raise RuntimeError(f"OneSignal notification failed: {response.status_code}")
+
 router = APIRouter()
 
 @router.get("/", response_model=schemas.PaginatedResponse)
-async def get_notifications(
+def get_notifications(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[dict] = Depends(list_cursor(models.Notification)),
     db: Session = Depends(get_db)
 ):
     """Get all notifications with pagination"""
     try:
-        notifications = db.query(models.Notification).order_by(models.Notification.timestamp.desc()).offset(skip).limit(limit).all()
-        total = crud.count_items(db, models.Notification)
-        return create_paginated_response(notifications, total, skip // limit + 1, limit)
+        notifications, total, next_cursor = crud.list_page(db.query(models.Notification), models.Notification, skip, limit, cursor)
+        return create_paginated_response(notifications, total, page_number(skip, limit, cursor), limit, next_cursor)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve notifications: {str(e)}")
 
 @router.get("/{notification_title}", response_model=schemas.Notification)
-async def get_notification(notification_title: str, db: Session = Depends(get_db)):
+def get_notification(notification_title: str, db: Session = Depends(get_db)):
     """Get a specific notification by title"""
     notification = db.query(models.Notification).filter(models.Notification.title == notification_title).first()
     if not notification:
@@ -89,7 +83,7 @@ async def get_notification(notification_title: str, db: Session = Depends(get_db
     return notification
 
 @router.post("/", response_model=schemas.Notification)
-async def create_notification(
+def create_notification(
     notification: schemas.NotificationCreate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_admin_user)
@@ -98,25 +92,25 @@ async def create_notification(
     try:
         notification_data = notification.dict()
         notification_data['id'] = str(uuid.uuid4())
-        db_notification = crud.create_item(db, models.Notification, notification_data)
-        
-        # Send push notification via OneSignal
+        # Push notification queued in the same commit, sent by the outbox worker
         custom_data = {
-            "notification_id": db_notification.id,
+            "notification_id": notification_data['id'],
             "type": "notification"
         }
-        await send_onesignal_notification(
-            title=db_notification.title,
-            content=db_notification.body,
-            custom_data=custom_data
-        )
+        db_notification = crud.create_item(db, models.Notification, notification_data, notifications=[
+            message(
+                title=notification_data.get('title') or "",
+                content=notification_data.get('body') or "",
+                custom_data=custom_data
+            )
+        ])
         
         return db_notification
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create notification: {str(e)}")
 
 @router.put("/{notification_title}", response_model=schemas.Notification)
-async def update_notification(
+def update_notification(
     notification_title: str,
     notification: schemas.NotificationCreate,
     db: Session = Depends(get_db),
@@ -134,7 +128,7 @@ async def update_notification(
         raise HTTPException(status_code=500, detail=f"Failed to update notification: {str(e)}")
 
 @router.delete("/{notification_title}")
-async def delete_notification(
+def delete_notification(
     notification_title: str,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_admin_user)
@@ -151,7 +145,7 @@ async def delete_notification(
         raise HTTPException(status_code=500, detail=f"Failed to delete notification: {str(e)}")
 
 @router.get("/recent/latest")
-async def get_recent_notifications(
+def get_recent_notifications(
     limit: int = Query(5, ge=1, le=20),
     db: Session = Depends(get_db)
 ):
@@ -163,7 +157,7 @@ async def get_recent_notifications(
         raise HTTPException(status_code=500, detail=f"Failed to retrieve recent notifications: {str(e)}")
 
 @router.put("/{notification_id}/read")
-async def mark_notification_read(
+def mark_notification_read(
     notification_id: str,
     db: Session = Depends(get_db)
 ):
@@ -188,7 +182,7 @@ async def mark_notification_read(
         raise HTTPException(status_code=500, detail=f"Failed to mark notification as read: {str(e)}")
 
 @router.put("/mark-all-read")
-async def mark_all_notifications_read(
+def mark_all_notifications_read(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db),
 ):
@@ -1,14 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import models
 import schemas
 import crud
-from database import get_db
+from database import get_db, get_async_db
 from auth import get_current_admin_user, security
-from utils import create_paginated_response
-from api.notifications import send_onesignal_notification
+from utils import create_paginated_response, page_number, list_cursor
+from outbox import message
 import uuid
 
 # Dependency function for admin authentication
@@ -20,39 +21,33 @@ def get_admin_user(
 router = APIRouter()
 
 @router.get("/", response_model=schemas.PaginatedResponse)
-async def get_other_slides(
+def get_other_slides(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[dict] = Depends(list_cursor(models.OtherSlide)),
     species: Optional[str] = Query(None),
     db: Session = Depends(get_db)
 ):
     """Get all other slides with pagination and optional species filter"""
     try:
-        query = db.query(models.OtherSlide)
-        if species:
-            query = query.filter(models.OtherSlide.species.ilike(f"%{species}%"))
+        criteria = [models.OtherSlide.species.ilike(f"%{species}%")] if species else []
 
-        slides = query.order_by(models.OtherSlide.created_at.desc()).offset(skip).limit(limit).all()
+        slides, total, next_cursor = crud.list_page(db.query(models.OtherSlide).filter(*criteria), models.OtherSlide, skip, limit, cursor)
 
-        if species:
-            total = query.count()
-        else:
-            total = crud.count_items(db, models.OtherSlide)
-
-        return create_paginated_response(slides, total, skip // limit + 1, limit)
+        return create_paginated_response(slides, total, page_number(skip, limit, cursor), limit, next_cursor)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve other slides: {str(e)}")
 
 @router.get("/{slide_name}", response_model=schemas.OtherSlide)
-async def get_other_slide(slide_name: str, db: Session = Depends(get_db)):
+async def get_other_slide(slide_name: str, db: AsyncSession = Depends(get_async_db)):
     """Get a specific other slide by name"""
-    db_slide = db.query(models.OtherSlide).filter(models.OtherSlide.name == slide_name).first()
+    db_slide = await crud.aget_cached_by(db, models.OtherSlide, "name", slide_name)
     if not db_slide:
         raise HTTPException(status_code=404, detail="Other slide not found")
     return db_slide
 
 @router.post("/", response_model=schemas.OtherSlide)
-async def create_other_slide(
+def create_other_slide(
     slide: schemas.OtherSlideCreate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_admin_user)
@@ -61,25 +56,27 @@ async def create_other_slide(
     try:
         slide_data = slide.dict()
         slide_data['id'] = str(uuid.uuid4())
-        db_slide = crud.create_item(db, models.OtherSlide, slide_data)
-        
-        # Send notification for new other slide
-        await send_onesignal_notification(
-            title="New Slide Added",
-            content=f"A new slide '{db_slide.name}' for {db_slide.species} has been added",
-            custom_data={
-                "slide_id": db_slide.id,
-                "type": "other_slide",
-                "species": db_slide.species
-            }
-        )
+        # Queued in the same commit, pushed by the outbox worker
+        db_slide = crud.create_item(db, models.OtherSlide, slide_data, notifications=[
+            message(
+                title="New Slide Added",
+                content=f"A new slide '{slide_data.get('name')}' for {slide_data.get('species')} has been added",
+                custom_data={
+                    "slide_id": slide_data['id'],
+                    "type": "other_slide",
+                    "species": slide_data.get('species')
+                },
+                group="other_slide",
+                digest="{count} new slides have been added"
+            )
+        ])
         
         return db_slide
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create other slide: {str(e)}")
 
 @router.put("/{slide_name}", response_model=schemas.OtherSlide)
-async def update_other_slide(
+def update_other_slide(
     slide_name: str,
     slide: schemas.OtherSlideCreate,
     db: Session = Depends(get_db),
@@ -97,7 +94,7 @@ async def update_other_slide(
         raise HTTPException(status_code=500, detail=f"Failed to update other slide: {str(e)}")
 
 @router.delete("/{slide_name}")
-async def delete_other_slide(
+def delete_other_slide(
     slide_name: str,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_admin_user)
@@ -0,0 +1,123 @@
+import asyncio
+import time
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from sqlalchemy import text
+
+import models
+import crud
+from config import settings
+from database import AsyncSessionLocal, async_engine
+from logger import app_logger
+from search import trigram_similarity
+
+router = APIRouter()
+
+# Result type -> (model, title column); the same sources the app's global
+# search box used to query one by one
+SEARCH_SOURCES = {
+    "book": (models.Book, "title"),
+    "drug": (models.Drug, "name"),
+    "disease": (models.Disease, "name"),
+    "dictionary": (models.DictionaryWord, "name"),
+    "instrument": (models.Instrument, "name"),
+    "haematology_test": (models.HaematologyTest, "name"),
+    "serology_test": (models.SerologyTest, "name"),
+    "biochemistry_test": (models.BiochemistryTest, "name"),
+    "bacteriology_test": (models.BacteriologyTest, "name"),
+    "other_test": (models.OtherTest, "name"),
+}
+
+# SQLite VM instructions between deadline checks of a source query
+SQLITE_PROGRESS_STEPS = 1000
+
+# Source queries running at once across all requests of this worker, so
+# concurrent searches cannot check out more pooled connections than this
+_slots = asyncio.Semaphore(max(1, settings.SEARCH_MAX_CONCURRENCY))
+
+
+async def _search_source(model, q: str, limit: int, timeout: float):
+    """
+    Run one entity search on its own session/connection. The deadline starts
+    once the connection is checked out, and the database aborts the query
+    at the deadline, so a timed-out source does not keep its pooled
+    connection busy.
+    """
+    async with AsyncSessionLocal() as db:
+        connection = await db.connection()
+        if async_engine.dialect.name == "postgresql":
+            await db.execute(text(f"SET LOCAL statement_timeout = {int(timeout * 1000)}"))
+            return await asyncio.wait_for(crud.asearch_page(db, model, q, 0, limit), timeout)
+        # SQLite has no statement timeout: interrupt the query from its progress handler
+        raw = (await connection.get_raw_connection()).driver_connection
+        deadline = time.monotonic() + timeout
+        await raw.set_progress_handler(lambda: time.monotonic() > deadline, SQLITE_PROGRESS_STEPS)
+        try:
+            return await asyncio.wait_for(crud.asearch_page(db, model, q, 0, limit), timeout)
+        finally:
+            await raw.set_progress_handler(None, 0)
+
+
+async def _run_source(kind: str, q: str, limit: int, timeout: float):
+    model, _ = SEARCH_SOURCES[kind]
+    # Waiting for a slot or a pooled connection does not count towards the timeout
+    async with _slots:
+        return await _search_source(model, q, limit, timeout)
+
+
+def _score(q: str, title: Optional[str], position: int) -> float:
+    """Blend the source's own relevance order with how well the title matches"""
+    return round(0.5 / (position + 1) + 0.5 * trigram_similarity(q, title or ""), 4)
+
+
+@router.get("/")
+async def unified_search(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(5, ge=1, le=20, description="Results per type"),
+    types: Optional[str] = Query(None, description="Comma-separated subset of result types"),
+):
+    """Search every content type concurrently and merge the results"""
+    kinds = list(SEARCH_SOURCES)
+    if types:
+        kinds = [kind.strip() for kind in types.split(",") if kind.strip()]
+        unknown = [kind for kind in kinds if kind not in SEARCH_SOURCES]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown search types: {', '.join(unknown)}")
+
+    timeout = settings.SEARCH_SOURCE_TIMEOUT
+    outcomes = await asyncio.gather(
+        *[_run_source(kind, q, limit, timeout) for kind in kinds],
+        return_exceptions=True,
+    )
+
+    groups, counts, failed = [], {}, []
+    for kind, outcome in zip(kinds, outcomes):
+        if isinstance(outcome, BaseException):
+            reason = "timed out" if isinstance(outcome, asyncio.TimeoutError) else str(outcome)
+            app_logger.warning(f"Unified search source '{kind}' failed: {reason}")
+            failed.append(kind)
+            continue
+        items, total = outcome
+        counts[kind] = total
+        if not items:
+            continue
+        title_column = SEARCH_SOURCES[kind][1]
+        for position, item in enumerate(items):
+            item["type"] = kind
+            item["score"] = _score(q, item.get(title_column), position)
+        groups.append({"type": kind, "count": total, "items": items})
+
+    # Groups ordered by their best hit, items inside each group by score
+    for group in groups:
+        group["items"].sort(key=lambda item: item["score"], reverse=True)
+    groups.sort(key=lambda group: group["items"][0]["score"], reverse=True)
+
+    return {
+        "query": q,
+        "total": sum(counts.values()),
+        "counts": counts,
+        "groups": groups,
+        "partial": bool(failed),
+        "failed_types": failed,
+    }
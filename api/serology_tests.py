@@ -1,15 +1,16 @@
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
 from typing import List, Optional
 import models
 import schemas
 import crud
-from database import get_db
+from database import get_db, get_async_db
 from auth import get_current_admin_user, security
-from utils import create_paginated_response
+from search import apply_search
+from utils import create_paginated_response, page_number, list_cursor, content_notification
 import uuid
 
 def get_admin_user(
@@ -21,41 +22,35 @@ def get_admin_user(
 router = APIRouter()
 
 @router.get("/", response_model=schemas.PaginatedResponse)
-async def get_serology_tests(
+def get_serology_tests(
     search: Optional[str] = Query(None),
     limit: int = Query(100, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: Optional[dict] = Depends(list_cursor(models.SerologyTest)),
     db: Session = Depends(get_db)
 ):
     """Get all serology tests with optional search and pagination"""
     try:
-        query = db.query(models.SerologyTest)
-        
         if search:
-            query = query.filter(
-                or_(
-                    models.SerologyTest.name.ilike(f"%{search}%"),
-                    models.SerologyTest.description.ilike(f"%{search}%")
-                )
-            )
-        
-        total = query.count()
-        tests = query.order_by(models.SerologyTest.created_at.desc()).offset(offset).limit(limit).all()
+            query = apply_search(db.query(models.SerologyTest), models.SerologyTest, search).order_by(models.SerologyTest.created_at.desc())
+            tests, total, next_cursor = crud.ranked_page(query, offset, limit, cursor)
+        else:
+            tests, total, next_cursor = crud.list_page(db.query(models.SerologyTest), models.SerologyTest, offset, limit, cursor)
         
-        return create_paginated_response(tests, total, offset // limit + 1, limit)
+        return create_paginated_response(tests, total, page_number(offset, limit, cursor), limit, next_cursor)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve serology tests: {str(e)}")
 
 @router.get("/by-name/{test_name}", response_model=schemas.SerologyTest)
-async def get_serology_test_by_name(test_name: str, db: Session = Depends(get_db)):
+async def get_serology_test_by_name(test_name: str, db: AsyncSession = Depends(get_async_db)):
     """Get a specific serology test by name"""
-    test = db.query(models.SerologyTest).filter(models.SerologyTest.name == test_name).first()
+    test = await crud.aget_cached_by(db, models.SerologyTest, "name", test_name)
     if not test:
         raise HTTPException(status_code=404, detail="Serology test not found")
     return test
 
 @router.post("/", response_model=schemas.SerologyTest, status_code=status.HTTP_201_CREATED)
-async def create_serology_test(
+def create_serology_test(
     test: schemas.SerologyTestCreate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_admin_user)
@@ -68,18 +63,17 @@ async def create_serology_test(
     try:
         test_data = test.dict()
         test_data['id'] = str(uuid.uuid4())
-        db_test = crud.create_item(db, models.SerologyTest, test_data)
-        
-        # Send notification for new serology test
-        from utils import send_content_notification
-        await send_content_notification("serology_test", test_data.get('name', 'Unknown'), test_data['id'])
+        # Queued in the same commit, pushed by the outbox worker
+        db_test = crud.create_item(db, models.SerologyTest, test_data, notifications=[
+            content_notification("serology_test", test_data.get('name', 'Unknown'), test_data['id'])
+        ])
         
         return db_test
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create serology test: {str(e)}")
 
 @router.put("/{test_name}", response_model=schemas.SerologyTest)
-async def update_serology_test(
+def update_serology_test(
     test_name: str,
     test: schemas.SerologyTestCreate,
     db: Session = Depends(get_db),
@@ -102,7 +96,7 @@ async def update_serology_test(
         raise HTTPException(status_code=500, detail=f"Failed to update serology test: {str(e)}")
 
 @router.delete("/{test_name}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_serology_test(
+def delete_serology_test(
     test_name: str,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_admin_user)
@@ -0,0 +1,74 @@
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+
+from bundle import bundle_path, read_meta
+from changes import ResyncRequired, get_changes
+from database import get_db
+
+router = APIRouter()
+
+
+class BundleFileResponse(FileResponse):
+    """FileResponse whose If-Range also accepts the bundle's content ETag"""
+
+    def _should_use_range(self, http_if_range, stat_result) -> bool:
+        return http_if_range == self.headers.get("etag") or super()._should_use_range(http_if_range, stat_result)
+
+
+@router.get("/bundle")
+async def get_content_bundle(request: Request):
+    """
+    Download the offline content bundle: a gzip-compressed SQLite database
+    with every public reference table and FTS5 indexes. Supports ETag /
+    If-None-Match and Range requests.
+    """
+    meta = read_meta()
+    if meta is None or not os.path.exists(bundle_path(meta)):
+        raise HTTPException(status_code=503, detail="Content bundle is being built", headers={"Retry-After": "30"})
+
+    headers = {
+        "ETag": meta["etag"],
+        "Cache-Control": "no-cache",
+        "X-Bundle-Schema-Version": str(meta["schema_version"]),
+        "X-Bundle-Built-At": meta["built_at"],
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and meta["etag"] in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    return BundleFileResponse(
+        bundle_path(meta),
+        media_type="application/gzip",
+        filename="content.sqlite.gz",
+        headers=headers,
+    )
+
+
+@router.get("/bundle/info")
+async def get_content_bundle_info():
+    """Metadata of the current bundle (ETag, size, build time, change_seq for /changes)"""
+    meta = read_meta()
+    if meta is None:
+        raise HTTPException(status_code=503, detail="Content bundle is being built", headers={"Retry-After": "30"})
+    return {key: value for key, value in meta.items() if key != "file"}
+
+
+@router.get("/changes")
+def get_content_changes(
+    since: int = Query(0, ge=0, description="The version returned by the previous sync (or the bundle's change_seq)"),
+    limit: int = Query(1000, ge=1, le=5000),
+    db: Session = Depends(get_db)
+):
+    """
+    Rows created, updated or deleted since version ``since`` across all
+    synced content tables. Keep calling with the returned ``version`` while
+    ``has_more`` is true. 410 means ``since`` is older than the retained
+    deletions: download the bundle again and continue from its change_seq.
+    """
+    try:
+        return get_changes(db, since, limit)
+    except ResyncRequired as e:
+        raise HTTPException(status_code=410, detail=f"Full resync required: {e}")
@@ -1,14 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import models
 import schemas
 import crud
-from database import get_db
+from database import get_db, get_async_db
 from auth import get_current_admin_user, security
-from utils import create_paginated_response
-from api.notifications import send_onesignal_notification
+from utils import create_paginated_response, page_number, list_cursor
+from outbox import message
 import uuid
 
 # Dependency function for admin authentication
@@ -20,39 +21,33 @@ def get_admin_user(
 router = APIRouter()
 
 @router.get("/", response_model=schemas.PaginatedResponse)
-async def get_urine_slides(
+def get_urine_slides(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[dict] = Depends(list_cursor(models.UrineSlide)),
     species: Optional[str] = Query(None),
     db: Session = Depends(get_db)
 ):
     """Get all urine slides with pagination and optional species filter"""
     try:
-        query = db.query(models.UrineSlide)
-        if species:
-            query = query.filter(models.UrineSlide.species.ilike(f"%{species}%"))
+        criteria = [models.UrineSlide.species.ilike(f"%{species}%")] if species else []
 
-        slides = query.order_by(models.UrineSlide.created_at.desc()).offset(skip).limit(limit).all()
+        slides, total, next_cursor = crud.list_page(db.query(models.UrineSlide).filter(*criteria), models.UrineSlide, skip, limit, cursor)
 
-        if species:
-            total = query.count()
-        else:
-            total = crud.count_items(db, models.UrineSlide)
-
-        return create_paginated_response(slides, total, skip // limit + 1, limit)
+        return create_paginated_response(slides, total, page_number(skip, limit, cursor), limit, next_cursor)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve urine slides: {str(e)}")
 
 @router.get("/{slide_name}", response_model=schemas.UrineSlide)
-async def read_urine_slide(slide_name: str, db: Session = Depends(get_db)):
+async def read_urine_slide(slide_name: str, db: AsyncSession = Depends(get_async_db)):
     """Get a specific urine slide by name"""
-    db_slide = db.query(models.UrineSlide).filter(models.UrineSlide.name == slide_name).first()
+    db_slide = await crud.aget_cached_by(db, models.UrineSlide, "name", slide_name)
     if db_slide is None:
         raise HTTPException(status_code=404, detail="Urine slide not found")
     return db_slide
 
 @router.post("/", response_model=schemas.UrineSlide)
-async def create_urine_slide(
+def create_urine_slide(
     slide: schemas.UrineSlideCreate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_admin_user)
@@ -61,25 +56,27 @@ async def create_urine_slide(
     try:
         slide_data = slide.dict()
         slide_data['id'] = str(uuid.uuid4())
-        db_slide = crud.create_item(db, models.UrineSlide, slide_data)
-        
-        # Send notification for new urine slide
-        await send_onesignal_notification(
-            title="New Urine Slide Added",
-            content=f"A new urine slide '{db_slide.name}' for {db_slide.species} has been added",
-            custom_data={
-                "slide_id": db_slide.id,
-                "type": "urine_slide",
-                "species": db_slide.species
-            }
-        )
+        # Queued in the same commit, pushed by the outbox worker
+        db_slide = crud.create_item(db, models.UrineSlide, slide_data, notifications=[
+            message(
+                title="New Urine Slide Added",
+                content=f"A new urine slide '{slide_data.get('name')}' for {slide_data.get('species')} has been added",
+                custom_data={
+                    "slide_id": slide_data['id'],
+                    "type": "urine_slide",
+                    "species": slide_data.get('species')
+                },
+                group="urine_slide",
+                digest="{count} new urine slides have been added"
+            )
+        ])
         
         return db_slide
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create urine slide: {str(e)}")
 
 @router.put("/{slide_name}", response_model=schemas.UrineSlide)
-async def update_urine_slide(
+def update_urine_slide(
     slide_name: str,
     slide: schemas.UrineSlideCreate,
     db: Session = Depends(get_db),
@@ -97,7 +94,7 @@ async def update_urine_slide(
         raise HTTPException(status_code=500, detail=f"Failed to update urine slide: {str(e)}")
 
 @router.delete("/{slide_name}")
-async def delete_urine_slide(
+def delete_urine_slide(
     slide_name: str,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_admin_user)
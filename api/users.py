@@ -8,7 +8,7 @@ import crud
 from database import get_db
 from auth import get_current_user, get_password_hash, get_current_admin_user, security
 import uuid
-from utils import create_paginated_response
+from utils import create_paginated_response, page_number, list_cursor
 # Dependency function for admin authentication
 def get_admin_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
@@ -18,7 +18,7 @@ def get_admin_user(
 router = APIRouter()
 
 @router.get("/me", response_model=schemas.User)
-async def get_current_user_info(
+def get_current_user_info(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ):
@@ -27,7 +27,7 @@ async def get_current_user_info(
     return current_user
 
 @router.delete("/me")
-async def delete_my_account(
+def delete_my_account(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ):
@@ -43,22 +43,22 @@ async def delete_my_account(
         raise HTTPException(status_code=500, detail=f"Failed to delete account: {str(e)}")
 
 @router.get("/", response_model=schemas.PaginatedResponse)
-async def get_users(
+def get_users(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[dict] = Depends(list_cursor(models.User)),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_admin_user)
 ):
     """Get all users (admin only)"""
     try:
-        users = crud.get_items(db, models.User, skip, limit)
-        total = crud.count_items(db, models.User)
-        return create_paginated_response(users, total, skip // limit + 1, limit)
+        users, total, next_cursor = crud.list_page(db.query(models.User), models.User, skip, limit, cursor)
+        return create_paginated_response(users, total, page_number(skip, limit, cursor), limit, next_cursor)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve users: {str(e)}")
 
 @router.get("/{username}", response_model=schemas.User)
-async def get_user(
+def get_user(
     username: str,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_admin_user)
@@ -70,7 +70,7 @@ async def get_user(
     return user
 
 @router.put("/{username}", response_model=schemas.User)
-async def update_user(
+def update_user(
     username: str,
     user_update: schemas.UserBase,
     db: Session = Depends(get_db),
@@ -88,7 +88,7 @@ async def update_user(
         raise HTTPException(status_code=500, detail=f"Failed to update user: {str(e)}")
 
 @router.delete("/{username}")
-async def delete_user(
+def delete_user(
     username: str,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_admin_user)
@@ -105,7 +105,7 @@ async def delete_user(
         raise HTTPException(status_code=500, detail=f"Failed to delete user: {str(e)}")
 
 @router.post("/{username}/points")
-async def add_user_points(
+def add_user_points(
     username: str,
     body: schemas.PointsUpdate,
     db: Session = Depends(get_db),
@@ -122,7 +122,7 @@ async def add_user_points(
         raise HTTPException(status_code=500, detail=f"Failed to add points: {str(e)}")
 
 @router.get("/leaderboard/top")
-async def get_leaderboard(
+def get_leaderboard(
     limit: int = Query(10, ge=1, le=50),
     db: Session = Depends(get_db)
 ):
@@ -144,20 +144,19 @@ async def get_leaderboard(
         raise HTTPException(status_code=500, detail=f"Failed to get leaderboard: {str(e)}")
 
 @router.post("/reset-daily-points")
-async def reset_daily_points(
+def reset_daily_points(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_admin_user)
 ):
     """Reset daily points for all users (admin only)"""
     try:
-        db.query(models.User).update({models.User.today_points: 0})
-        db.commit()
+        crud.reset_daily_points(db)
         return {"message": "Daily points reset for all users"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to reset daily points: {str(e)}")
 
 @router.patch("/{username}/admin-status", response_model=schemas.User)
-async def update_admin_status(
+def update_admin_status(
     username: str,
     update: schemas.UserAdminUpdate,
     db: Session = Depends(get_db),
@@ -177,7 +176,7 @@ async def update_admin_status(
         raise HTTPException(status_code=500, detail=f"Failed to update user status: {str(e)}")
 
 @router.patch("/{username}/password")
-async def set_user_password(
+def set_user_password(
     username: str,
     body: schemas.PasswordChange,
     db: Session = Depends(get_db),
@@ -198,7 +197,7 @@ async def set_user_password(
         raise HTTPException(status_code=500, detail=f"Failed to update password: {str(e)}")
 
 @router.post("/create", response_model=schemas.User)
-async def create_user_admin(
+def create_user_admin(
     user_data: schemas.UserCreateAdmin,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_admin_user)
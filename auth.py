@@ -4,11 +4,13 @@ from fastapi import HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from sqlalchemy import bindparam, delete, inspect, select, text, update
 from sqlalchemy.orm import Session
 from config import settings
 import models
 import uuid
 import secrets
+import hashlib
 from logger import auth_logger, log_security_event
 
 # Password hashing
@@ -56,6 +58,10 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     auth_logger.debug(f"Created access token for user: {data.get('sub')}")
     return encoded_jwt
 
+def hash_refresh_token(token: str) -> str:
+    """SHA-256 hex digest stored in place of the refresh token"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
 def create_refresh_token(db: Session, user_id: str) -> str:
     """
     Create and store refresh token
@@ -73,11 +79,11 @@ def create_refresh_token(db: Session, user_id: str) -> str:
     # Calculate expiration
     expires_at = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
     
-    # Store in database
+    # Store only the digest, so a leaked table yields no usable tokens
     refresh_token = models.RefreshToken(
         id=str(uuid.uuid4()),
         user_id=user_id,
-        token=token,
+        token_hash=hash_refresh_token(token),
         expires_at=expires_at
     )
     
@@ -99,7 +105,7 @@ def verify_refresh_token(db: Session, token: str) -> Optional[models.User]:
         User object if valid, None otherwise
     """
     refresh_token = db.query(models.RefreshToken).filter(
-        models.RefreshToken.token == token,
+        models.RefreshToken.token_hash == hash_refresh_token(token),
         models.RefreshToken.revoked == False
     ).first()
     
@@ -123,7 +129,7 @@ def verify_refresh_token(db: Session, token: str) -> Optional[models.User]:
 def revoke_refresh_token(db: Session, token: str):
     """Revoke a refresh token"""
     refresh_token = db.query(models.RefreshToken).filter(
-        models.RefreshToken.token == token
+        models.RefreshToken.token_hash == hash_refresh_token(token)
     ).first()
     
     if refresh_token:
@@ -140,6 +146,59 @@ def revoke_all_user_tokens(db: Session, user_id: str):
     db.commit()
     auth_logger.info(f"Revoked all tokens for user: {user_id}")
 
+def purge_refresh_tokens(db: Session, batch_size: int = 1000) -> int:
+    """
+    Delete revoked and expired refresh tokens, ``batch_size`` rows per
+    transaction so no lock is held for long; returns how many were deleted
+    """
+    table = models.RefreshToken.__table__
+    deleted = 0
+    # One pass per partial index: revoked rows, then live rows past expiry
+    for dead in (table.c.revoked == True, (table.c.revoked == False) & (table.c.expires_at < datetime.utcnow())):
+        while True:
+            ids = db.execute(select(table.c.id).where(dead).limit(batch_size)).scalars().all()
+            if not ids:
+                break
+            deleted += db.execute(delete(table).where(table.c.id.in_(ids))).rowcount
+            db.commit()
+            if len(ids) < batch_size:
+                break
+    auth_logger.info(f"Purged {deleted} revoked/expired refresh tokens")
+    return deleted
+
+def migrate_refresh_tokens(engine, batch_size: int = 1000) -> int:
+    """
+    Hash the raw tokens stored in the ``token`` column by older releases
+    into ``token_hash`` and clear them, then drop their index. Existing
+    sessions keep working; returns how many rows were migrated.
+    """
+    if "token" not in {column["name"] for column in inspect(engine).get_columns("refresh_tokens")}:
+        return 0
+    table = models.RefreshToken.__table__
+    migrated = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(text(
+                "SELECT id, token FROM refresh_tokens WHERE token IS NOT NULL LIMIT :limit"
+            ), {"limit": batch_size}).all()
+            for row_id, token in rows:
+                conn.execute(update(table).where(table.c.id == row_id).values(token_hash=hash_refresh_token(token)))
+            if rows:
+                conn.execute(
+                    text("UPDATE refresh_tokens SET token = NULL WHERE id IN :ids").bindparams(
+                        bindparam("ids", expanding=True)
+                    ),
+                    {"ids": [row_id for row_id, _ in rows]},
+                )
+        migrated += len(rows)
+        if len(rows) < batch_size:
+            break
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX IF EXISTS ix_refresh_tokens_token"))
+    if migrated:
+        auth_logger.info(f"Hashed {migrated} stored refresh tokens")
+    return migrated
+
 def verify_token(credentials: HTTPAuthorizationCredentials, db: Session):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
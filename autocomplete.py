@@ -0,0 +1,204 @@
+"""
+In-process prefix index for dictionary search-as-you-type.
+
+Keys are kept in one sorted array so a lookup is a binary search followed by a
+short forward scan; no database round trip is needed once the index is built.
+After a reset (e.g. another worker wrote dictionary words) the index is
+rebuilt in a worker thread while the old contents keep serving.
+"""
+import asyncio
+import threading
+from bisect import bisect_left, insort
+from typing import List, Optional
+
+import models
+from normalization import normalize_text
+from logger import app_logger
+
+# DictionaryWord columns that can be completed
+SUGGEST_FIELDS = ("name", "kurdish", "arabic")
+
+
+class PrefixIndex:
+    """
+    Sorted-array prefix index mapping normalized keys to dictionary words.
+
+    ``rebuild`` builds a fresh copy off to the side while the current one
+    keeps serving; writes made meanwhile are applied to both (the new copy
+    gets them replayed just before it is swapped in), so none are lost.
+    """
+
+    def __init__(self, fields=SUGGEST_FIELDS):
+        self.fields = fields
+        self._keys = []       # sorted [(key, item_id), ...]
+        self._entries = {}    # item_id -> public fields
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()   # one rebuild at a time
+        self._pending = None  # [(item_id, values or None)] written during a rebuild
+        self.ready = False    # loaded at least once
+        self.stale = True     # contents may be out of date, rebuild wanted
+
+    @property
+    def building(self) -> bool:
+        return self._build_lock.locked()
+
+    def _item_keys(self, item_id: str, entry: dict) -> List[tuple]:
+        keys = set()
+        for field in self.fields:
+            if entry.get(field):
+                keys.add((normalize_text(entry[field]), item_id))
+        return sorted(keys)
+
+    def _entry(self, item_id: str, values: dict) -> dict:
+        return {"id": item_id, **{field: values.get(field) for field in self.fields}}
+
+    def _apply(self, entries: dict, keys: list, item_id: str, values: Optional[dict]):
+        """Apply one write to ``entries``/``keys`` (``values=None`` removes the word)"""
+        entry = entries.pop(item_id, None)
+        if entry is not None:
+            for key in self._item_keys(item_id, entry):
+                pos = bisect_left(keys, key)
+                if pos < len(keys) and keys[pos] == key:
+                    del keys[pos]
+        if values is not None:
+            entry = self._entry(item_id, values)
+            entries[item_id] = entry
+            for key in self._item_keys(item_id, entry):
+                insort(keys, key)
+
+    def rebuild(self, load_rows, only_if_stale: bool = False) -> bool:
+        """
+        Replace the contents with ``load_rows()`` rows of (id, name, kurdish,
+        arabic). Returns False when ``only_if_stale`` and another caller
+        already rebuilt it.
+        """
+        with self._build_lock:
+            with self._lock:
+                if only_if_stale and not self.stale:
+                    return False
+                self.stale = False
+                # Record writes from here on: the snapshot may or may not include them
+                self._pending = []
+            try:
+                entries, keys = {}, []
+                for row in load_rows():
+                    entry = self._entry(row[0], dict(zip(self.fields, row[1:])))
+                    entries[row[0]] = entry
+                    keys.extend(self._item_keys(row[0], entry))
+                keys.sort()
+            except BaseException:
+                with self._lock:
+                    self._pending = None
+                    self.stale = True
+                raise
+            with self._lock:
+                for item_id, values in self._pending:
+                    self._apply(entries, keys, item_id, values)
+                self._entries, self._keys = entries, keys
+                self._pending = None
+                self.ready = True
+            return True
+
+    def load(self, rows):
+        """Replace the index contents with ``rows`` of (id, name, kurdish, arabic)"""
+        self.rebuild(lambda: rows)
+
+    def add(self, item_id: str, values: dict):
+        with self._lock:
+            self._apply(self._entries, self._keys, item_id, values)
+            if self._pending is not None:
+                self._pending.append((item_id, values))
+
+    def remove(self, item_id: str):
+        with self._lock:
+            self._apply(self._entries, self._keys, item_id, None)
+            if self._pending is not None:
+                self._pending.append((item_id, None))
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[dict]:
+        prefix = normalize_text(prefix)
+        if not prefix:
+            return []
+        results, seen = [], set()
+        with self._lock:
+            pos = bisect_left(self._keys, (prefix,))
+            while pos < len(self._keys) and len(results) < limit:
+                key, item_id = self._keys[pos]
+                if not key.startswith(prefix):
+                    break
+                if item_id not in seen:
+                    seen.add(item_id)
+                    results.append(dict(self._entries[item_id]))
+                pos += 1
+        return results
+
+    def __len__(self):
+        return len(self._entries)
+
+
+dictionary_index = PrefixIndex()
+# Background rebuilds in flight (referenced so they are not garbage collected)
+_rebuilds = set()
+
+
+def _dictionary_rows(db):
+    return db.query(
+        models.DictionaryWord.id,
+        models.DictionaryWord.name,
+        models.DictionaryWord.kurdish,
+        models.DictionaryWord.arabic,
+    ).all()
+
+
+def build_dictionary_index(db, only_if_stale: bool = False):
+    """Load every dictionary word into the prefix index"""
+    if dictionary_index.rebuild(lambda: _dictionary_rows(db), only_if_stale):
+        app_logger.info(f"Dictionary prefix index built with {len(dictionary_index)} words")
+
+
+def _rebuild_stale_index():
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        build_dictionary_index(db, only_if_stale=True)
+    finally:
+        db.close()
+
+
+async def refresh_dictionary_index():
+    """
+    Bring a stale prefix index up to date without blocking the event loop.
+    The very first build is awaited; later rebuilds run in the background
+    while the previous contents keep serving.
+    """
+    if not dictionary_index.stale:
+        return
+    if not dictionary_index.ready:
+        await asyncio.to_thread(_rebuild_stale_index)
+    elif not dictionary_index.building and not _rebuilds:
+        task = asyncio.create_task(asyncio.to_thread(_rebuild_stale_index))
+        _rebuilds.add(task)
+        task.add_done_callback(_rebuild_done)
+
+
+def _rebuild_done(task):
+    _rebuilds.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        app_logger.error(f"Rebuilding the dictionary prefix index failed: {task.exception()}")
+
+
+def on_item_written(model, item_id: str, values: Optional[dict]):
+    """Apply crud writes on dictionary words to the prefix index"""
+    if model is not models.DictionaryWord:
+        return
+    if values is None:
+        dictionary_index.remove(item_id)
+    else:
+        dictionary_index.add(item_id, values)
+
+
+def reset_index(model):
+    """Mark the prefix index stale; the next suggest request starts a rebuild"""
+    if model is models.DictionaryWord:
+        dictionary_index.stale = True
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Benchmark: one list endpoint served three ways:
+
+- /blocking/words: ``async def`` on the sync Session (queries block the loop)
+- /thread/words:   ``def`` on the sync Session, run in the threadpool (what
+                   the list, search and fuzzy routes use)
+- /async/words:    ``async def`` on an AsyncSession, the same list_page
+                   through ``run_sync`` (ORM work stays on the loop thread)
+
+Fires ``concurrency`` requests at once and measures throughput, plus the
+latency of a trivial /ping endpoint polled meanwhile, which shows how long
+the event loop was blocked.
+
+Usage:
+    python benchmarks/bench_async.py [rows] [requests] [concurrency]
+
+Runs against a throwaway SQLite database; DATABASE_URL is overridden.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+DB_FILE = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_FILE}"
+os.environ.setdefault("ENVIRONMENT", "benchmark")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import statistics
+import uuid
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, async_engine, engine, get_async_db, get_db
+from models import Base, DictionaryWord
+import crud
+
+WORDS = ["abdomen", "abscess", "acid", "antibiotic", "bacteria", "blood", "cell",
+         "dose", "enzyme", "fever", "gland", "infection", "liver", "muscle", "virus"]
+
+app = FastAPI()
+
+
+@app.get("/ping")
+async def ping():
+    return {"ok": True}
+
+
+# Unindexed LIKE: a query slow enough for blocking to show
+def words_page(db: Session):
+    query = db.query(DictionaryWord).filter(DictionaryWord.description.like("%fever liver%"))
+    items, total, _ = crud.list_page(query, DictionaryWord, 0, 20)
+    return {"total": total, "items": len(items)}
+
+
+@app.get("/blocking/words")
+async def blocking_words(db: Session = Depends(get_db)):
+    return words_page(db)
+
+
+@app.get("/thread/words")
+def thread_words(db: Session = Depends(get_db)):
+    return words_page(db)
+
+
+@app.get("/async/words")
+async def async_words(db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(words_page)
+
+
+def seed(rows: int):
+    db = SessionLocal()
+    try:
+        db.bulk_insert_mappings(DictionaryWord, [
+            {
+                "id": str(uuid.uuid4()),
+                "name": f"{WORDS[i % len(WORDS)]} {i}",
+                "description": " ".join(WORDS[(i + k) % len(WORDS)] for k in range(12)),
+            }
+            for i in range(rows)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+async def run(client: httpx.AsyncClient, path: str, requests: int, concurrency: int):
+    slots = asyncio.Semaphore(concurrency)
+    pings = []
+    errors = []
+    done = asyncio.Event()
+
+    async def one():
+        # The sync route can exhaust the pool (QueuePool timeout): count it
+        async with slots:
+            try:
+                response = await client.get(path)
+                response.raise_for_status()
+            except Exception as e:
+                errors.append(type(e).__name__)
+
+    async def pinger():
+        while not done.is_set():
+            start = time.perf_counter()
+            await client.get("/ping")
+            pings.append((time.perf_counter() - start) * 1000)
+            await asyncio.sleep(0.005)
+
+    ping_task = asyncio.create_task(pinger())
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*[one() for _ in range(requests)])
+    finally:
+        elapsed = time.perf_counter() - start
+        done.set()
+        await ping_task
+    return requests / elapsed, statistics.median(pings), max(pings), len(pings), len(errors)
+
+
+async def bench(requests: int, concurrency: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for path in ("/blocking/words", "/thread/words", "/async/words"):
+            await client.get(path)  # warm the pools
+            throughput, ping_median, ping_max, ping_count, errors = await run(client, path, requests, concurrency)
+            print(f"{path:15} {throughput:8.1f} req/s   /ping median {ping_median:7.2f} ms   "
+                  f"max {ping_max:7.2f} ms   ({ping_count} pings, {errors} errors)")
+    await async_engine.dispose()
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    Base.metadata.create_all(bind=engine)
+    try:
+        seed(rows)
+        print(f"rows={rows} requests={requests} concurrency={concurrency}")
+        asyncio.run(bench(requests, concurrency))
+    finally:
+        engine.dispose()
+        os.remove(DB_FILE)
+
+
+if __name__ == "__main__":
+    main()
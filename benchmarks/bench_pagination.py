@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark: a page plus a separate COUNT query vs. a single COUNT(*) OVER()
+round trip (crud.paginate), for relevance-ranked search and for an
+index-ordered filtered listing. The window only pays off for search; the
+listing is why crud.list_page counts separately.
+
+Usage:
+    python benchmarks/bench_pagination.py [rows] [iterations]
+
+Runs against a throwaway SQLite database; DATABASE_URL is overridden.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+DB_FILE = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_FILE}"
+os.environ.setdefault("ENVIRONMENT", "benchmark")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uuid
+from database import SessionLocal, engine
+from models import Base, DictionaryWord
+from search import setup_search_indexes
+import crud
+
+WORDS = ["abdomen", "abscess", "acid", "antibiotic", "bacteria", "blood", "cell",
+         "dose", "enzyme", "fever", "gland", "infection", "liver", "muscle", "virus"]
+
+
+def seed(db, rows: int):
+    db.bulk_insert_mappings(DictionaryWord, [
+        {
+            "id": str(uuid.uuid4()),
+            "name": f"{WORDS[i % len(WORDS)]} {i}",
+            "kurdish": f"وشە {i}",
+            "description": " ".join(WORDS[(i + k) % len(WORDS)] for k in range(12)),
+        }
+        for i in range(rows)
+    ])
+    db.commit()
+
+
+def timed(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        seed(db, rows)
+        setup_search_indexes(engine)
+
+        for term in ("fever", "liver 1"):
+            def two_queries():
+                crud.search_query(db, DictionaryWord, term).offset(0).limit(20).all()
+                crud.count_search_results(db, DictionaryWord, term)
+
+            def single_pass():
+                crud.paginate(crud.search_query(db, DictionaryWord, term), 0, 20)
+
+            before = timed(two_queries, iterations)
+            after = timed(single_pass, iterations)
+            print(f"search={term!r:10} rows={rows}  page+count: {before:7.2f} ms   "
+                  f"single pass: {after:7.2f} ms   ({before / after:.2f}x)")
+
+        # Filtered listing in LIST_ORDER (name, id): the page is an index range
+        for label, criteria in (("is_favorite", DictionaryWord.is_favorite == False),
+                                ("name prefix", DictionaryWord.name.like("fever%"))):
+            listing = db.query(DictionaryWord).filter(criteria).order_by(DictionaryWord.name, DictionaryWord.id)
+
+            def two_queries():
+                listing.offset(0).limit(20).all()
+                listing.order_by(None).count()
+
+            def single_pass():
+                crud.paginate(listing, 0, 20)
+
+            before = timed(two_queries, iterations)
+            after = timed(single_pass, iterations)
+            print(f"list={label!r:12} rows={rows}  page+count: {before:7.2f} ms   "
+                  f"single pass: {after:7.2f} ms   ({before / after:.2f}x)")
+    finally:
+        db.close()
+        os.remove(DB_FILE)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+Offline content bundle for the mobile app.
+
+All public reference content is written to a standalone SQLite database with
+FTS5 indexes, gzip-compressed and served from ``/api/sync/bundle``. The bundle
+records the ``table_versions`` it was built from; a background task rebuilds
+it once those versions change and then stay quiet for the debounce interval,
+so a burst of admin edits causes one rebuild. Workers share the bundle
+directory and take a file lock, so only one of them builds.
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import Boolean, DateTime, Float, Integer, JSON, select
+
+import models
+from cache_bus import read_versions
+from changes import current_sequence
+from config import settings
+from logger import app_logger
+from search import SEARCH_FIELDS
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development only
+    fcntl = None
+
+BUNDLE_SCHEMA_VERSION = 2
+BUNDLE_PREFIX = "content-"
+BUNDLE_SUFFIX = ".sqlite.gz"
+META_FILE = "content.json"
+LOCK_FILE = ".build.lock"
+BATCH_SIZE = 1000
+
+BUNDLE_MODELS = (
+    models.DictionaryWord,
+    models.Drug,
+    models.Disease,
+    models.NormalRange,
+    models.HaematologyTest,
+    models.SerologyTest,
+    models.BiochemistryTest,
+    models.BacteriologyTest,
+    models.OtherTest,
+    models.Instrument,
+    models.Note,
+)
+BUNDLE_TABLES = [model.__tablename__ for model in BUNDLE_MODELS]
+
+
+def _public_columns(model):
+    return [column for column in model.__table__.columns if not column.info.get("internal")]
+
+
+def _sqlite_type(column) -> str:
+    if isinstance(column.type, (Integer, Boolean)):
+        return "INTEGER"
+    if isinstance(column.type, Float):
+        return "REAL"
+    return "TEXT"
+
+
+def _to_sqlite(value, column):
+    if value is None:
+        return None
+    if isinstance(column.type, DateTime):
+        return value.isoformat()
+    if isinstance(column.type, JSON):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(column.type, Boolean):
+        return int(value)
+    return value
+
+
+def _fts_columns(model):
+    """Bundle FTS columns: the server's search columns, raw text instead of *_norm"""
+    columns = []
+    for weight in ("A", "B", "C"):
+        for name in SEARCH_FIELDS.get(model, {}).get(weight, []):
+            name = name[:-len("_norm")] if name.endswith("_norm") else name
+            if name not in columns:
+                columns.append(name)
+    return columns
+
+
+def _write_bundle(engine, path: str, versions: dict, change_seq: int):
+    out = sqlite3.connect(path)
+    try:
+        out.execute("PRAGMA journal_mode = OFF")
+        out.execute("PRAGMA synchronous = OFF")
+        out.execute("CREATE TABLE bundle_meta (key TEXT PRIMARY KEY, value TEXT)")
+        out.executemany("INSERT INTO bundle_meta VALUES (?, ?)", [
+            ("schema_version", str(BUNDLE_SCHEMA_VERSION)),
+            ("built_at", datetime.utcnow().isoformat()),
+            ("table_versions", json.dumps(versions)),
+            ("change_seq", str(change_seq)),
+        ])
+        with engine.connect() as conn:
+            for model in BUNDLE_MODELS:
+                table = model.__tablename__
+                columns = _public_columns(model)
+                names = [column.name for column in columns]
+                out.execute(
+                    f"CREATE TABLE {table} ("
+                    + ", ".join(f"{c.name} {_sqlite_type(c)}{' PRIMARY KEY' if c.primary_key else ''}" for c in columns)
+                    + ")"
+                )
+                insert = f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})"
+                result = conn.execution_options(yield_per=BATCH_SIZE).execute(select(*columns))
+                for rows in result.partitions():
+                    out.executemany(insert, [
+                        [_to_sqlite(value, column) for value, column in zip(row, columns)] for row in rows
+                    ])
+
+                fts_columns = _fts_columns(model)
+                if fts_columns:
+                    out.execute(
+                        f"CREATE VIRTUAL TABLE {table}_fts USING fts5({', '.join(fts_columns)}, "
+                        f"content='{table}', tokenize='unicode61 remove_diacritics 2')"
+                    )
+                    out.execute(f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')")
+                    out.execute(f"INSERT INTO {table}_fts({table}_fts) VALUES ('optimize')")
+        out.commit()
+        out.execute("VACUUM")
+    finally:
+        out.close()
+
+
+def read_meta(bundle_dir: Optional[str] = None) -> Optional[dict]:
+    """Metadata of the current bundle, or None if none was built yet"""
+    path = os.path.join(bundle_dir or settings.BUNDLE_DIR, META_FILE)
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def bundle_path(meta: dict, bundle_dir: Optional[str] = None) -> str:
+    """Path of the (immutable) bundle file described by ``meta``"""
+    return os.path.join(bundle_dir or settings.BUNDLE_DIR, meta["file"])
+
+
+def _remove_old_bundles(bundle_dir: str, keep: set):
+    for name in os.listdir(bundle_dir):
+        if name.startswith(BUNDLE_PREFIX) and name.endswith(BUNDLE_SUFFIX) and name not in keep:
+            try:
+                os.remove(os.path.join(bundle_dir, name))
+            except OSError:
+                pass
+
+
+def current_versions(engine) -> dict:
+    return {
+        table: version
+        for table, (version, _) in zip(BUNDLE_TABLES, read_versions(engine, BUNDLE_TABLES))
+    }
+
+
+def build_bundle(engine, bundle_dir: Optional[str] = None, force: bool = False) -> Optional[dict]:
+    """
+    Build the bundle unless it is already up to date. Returns the new
+    metadata, or None when nothing was built.
+    """
+    bundle_dir = bundle_dir or settings.BUNDLE_DIR
+    os.makedirs(bundle_dir, exist_ok=True)
+    with open(os.path.join(bundle_dir, LOCK_FILE), "w") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        # Re-check under the lock: another worker may have just built it
+        versions = current_versions(engine)
+        meta = read_meta(bundle_dir)
+        if not force and meta and meta.get("table_versions") == versions \
+                and meta.get("schema_version") == BUNDLE_SCHEMA_VERSION:
+            return None
+
+        started = datetime.utcnow()
+        # Read before exporting: rows changed meanwhile are in the bundle
+        # and in the next delta sync, and re-applying them is harmless
+        with engine.connect() as conn:
+            change_seq = current_sequence(conn)
+        with tempfile.TemporaryDirectory(dir=bundle_dir) as tmp:
+            raw_path = os.path.join(tmp, "content.sqlite")
+            _write_bundle(engine, raw_path, versions, change_seq)
+            gz_path = os.path.join(tmp, "content.sqlite.gz")
+            digest = hashlib.sha256()
+            with open(raw_path, "rb") as src, gzip.open(gz_path, "wb", compresslevel=9) as dst:
+                shutil.copyfileobj(src, dst)
+            with open(gz_path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+            name = f"{BUNDLE_PREFIX}{digest.hexdigest()[:32]}{BUNDLE_SUFFIX}"
+            previous = meta.get("file") if meta else None
+            meta = {
+                "schema_version": BUNDLE_SCHEMA_VERSION,
+                "file": name,
+                "etag": f'"{digest.hexdigest()[:32]}"',
+                "size": os.path.getsize(gz_path),
+                "uncompressed_size": os.path.getsize(raw_path),
+                "built_at": started.isoformat(),
+                "table_versions": versions,
+                "change_seq": change_seq,
+            }
+            # Every build gets its own file name, so a download in progress
+            # (or resumed with Range) keeps reading the bundle it started on;
+            # the metadata is switched over atomically afterwards.
+            os.replace(gz_path, os.path.join(bundle_dir, name))
+            meta_tmp = os.path.join(tmp, META_FILE)
+            with open(meta_tmp, "w") as f:
+                json.dump(meta, f)
+            os.replace(meta_tmp, os.path.join(bundle_dir, META_FILE))
+        _remove_old_bundles(bundle_dir, {name, previous})
+
+    elapsed = (datetime.utcnow() - started).total_seconds()
+    app_logger.info(f"Content bundle built: {meta['size']} bytes in {elapsed:.1f}s")
+    return meta
+
+
+async def run_bundle_builder(engine, debounce: float):
+    """
+    Lifespan task: build the bundle if missing or stale, then rebuild after
+    content writes once the table versions have been quiet for ``debounce``
+    seconds.
+    """
+    last_seen = None
+    while True:
+        try:
+            versions = await asyncio.to_thread(current_versions, engine)
+            meta = read_meta()
+            stale = not meta or meta.get("table_versions") != versions \
+                or meta.get("schema_version") != BUNDLE_SCHEMA_VERSION
+            # Missing bundles are built at once, stale ones after a quiet period
+            if stale and (not meta or versions == last_seen):
+                await asyncio.to_thread(build_bundle, engine)
+            last_seen = versions
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            app_logger.error(f"Content bundle build failed: {e}")
+        await asyncio.sleep(debounce)
@@ -0,0 +1,339 @@
+"""
+In-process caches for read-heavy endpoints.
+
+``TTLCache`` is a thread-safe LRU with a per-entry time to live. Entries are
+tagged with the table they were read from so a write to that table can drop
+exactly the affected entries (see ``on_item_written``).
+
+``TTLCache.get_or_load`` adds stale-while-revalidate and single-flight
+loading on top: an entry that expired less than ``stale_ttl`` seconds ago is
+still served while one background thread reloads it, and concurrent misses
+for the same key wait for a single load instead of each querying the
+database. Writes still drop entries at once; only expiry serves stale data.
+``aget_or_load`` is the same for callers holding an ``AsyncSession``.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Hashable, Optional
+
+from config import settings
+from logger import app_logger
+
+_MISSING = object()
+
+# How long a request waits for another request's load of the same key
+# before loading it itself
+SINGLE_FLIGHT_WAIT = 30
+
+# Background refreshes of stale entries; bounded so they hold at most this
+# many pooled connections
+_refresher = ThreadPoolExecutor(max_workers=settings.CACHE_REFRESH_WORKERS, thread_name_prefix="cache-refresh")
+
+
+class _Flight:
+    """One in-progress load that concurrent misses wait on"""
+
+    def __init__(self, generation: int):
+        self.generation = generation
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class _AsyncFlight:
+    """One in-progress load that concurrent async misses await"""
+
+    def __init__(self, generation: int):
+        self.generation = generation
+        self.future = asyncio.get_running_loop().create_future()
+
+
+class TTLCache:
+    """Size-bounded LRU cache whose entries expire after ``ttl`` seconds"""
+
+    def __init__(self, name: str, maxsize: int, ttl: float, stale_ttl: float = 0):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._data = OrderedDict()   # key -> (expires_at, tag, value, stale_until)
+        self._tags = {}              # tag -> set of keys
+        self._generations = {}       # tag -> invalidation counter
+        self._inflight = {}          # key -> _Flight of the load in progress
+        self._async_inflight = {}    # key -> _AsyncFlight (AsyncSession callers)
+        self._refreshing = set()     # keys with a background refresh queued
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale_hits = 0
+        self.coalesced = 0
+        self.refreshes = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            if entry[0] <= time.monotonic():
+                self._pop_locked(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def generation(self, tag: str) -> int:
+        """Invalidation counter for ``tag``; read it before computing a value"""
+        with self._lock:
+            return self._generations.get(tag, 0)
+
+    def set(self, key: Hashable, value: Any, tag: Optional[str] = None, generation: Optional[int] = None,
+            ttl: Optional[float] = None, stale_ttl: Optional[float] = None):
+        """
+        Store ``value`` for ``ttl`` seconds (default: the cache TTL), then
+        keep it ``stale_ttl`` more seconds for ``get_or_load``. When
+        ``generation`` is given and ``tag`` was invalidated since it was read,
+        the value may be stale and is not stored.
+        """
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if generation is not None and self._generations.get(tag, 0) != generation:
+                return
+            self._pop_locked(key)
+            expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+            stale_until = expires_at + (self.stale_ttl if stale_ttl is None else stale_ttl)
+            self._data[key] = (expires_at, tag, value, stale_until)
+            if tag is not None:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._data) > self.maxsize:
+                self._pop_locked(next(iter(self._data)))
+                self.evictions += 1
+
+    def _lookup(self, key: Hashable, tag: Optional[str], flights: dict, new_flight: Callable):
+        """
+        Shared first step of get_or_load/aget_or_load. Returns one of
+        ("hit", value), ("stale", value) or ("miss", flight, leader, generation).
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, _, value, stale_until = entry
+                if expires_at > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return "hit", value
+                if stale_until > now:
+                    self._data.move_to_end(key)
+                    self.stale_hits += 1
+                    if key in self._refreshing:
+                        return "hit", value
+                    self._refreshing.add(key)
+                    return "stale", value, self._generations.get(tag, 0)
+                self._pop_locked(key)
+                self.expirations += 1
+            self.misses += 1
+            generation = self._generations.get(tag, 0)
+            flight = flights.get(key)
+            # A load that started before the latest write can't be shared
+            leader = flight is None or flight.generation != generation
+            if leader:
+                flight = flights[key] = new_flight(generation)
+            else:
+                self.coalesced += 1
+            return "miss", flight, leader, generation
+
+    def _schedule_refresh(self, key, load, tag, ttl, negative_ttl, generation):
+        try:
+            _refresher.submit(self._refresh, key, load, tag, ttl, negative_ttl, generation)
+        except RuntimeError:
+            # Interpreter shutting down
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def get_or_load(self, key: Hashable, load: Callable, db, tag: Optional[str] = None,
+                    ttl: Optional[float] = None, negative_ttl: Optional[float] = None) -> Any:
+        """
+        Cached value for ``key``, calling ``load(db)`` on a miss. Concurrent
+        misses share one call. A value expired less than ``stale_ttl`` ago
+        is returned as is while ``load`` runs once more in the background
+        with its own session. ``NOT_FOUND`` results are kept for
+        ``negative_ttl`` seconds and never served stale.
+        """
+        result = self._lookup(key, tag, self._inflight, _Flight)
+        if result[0] == "hit":
+            return result[1]
+        if result[0] == "stale":
+            self._schedule_refresh(key, load, tag, ttl, negative_ttl, result[2])
+            return result[1]
+
+        _, flight, leader, generation = result
+        if not leader:
+            if flight.done.wait(SINGLE_FLIGHT_WAIT):
+                if flight.error is not None:
+                    raise flight.error
+                return flight.value
+            return load(db)
+
+        try:
+            flight.value = load(db)
+            self._store(key, flight.value, tag, generation, ttl, negative_ttl)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]
+            flight.done.set()
+
+    async def aget_or_load(self, key: Hashable, load: Callable, db, tag: Optional[str] = None,
+                           ttl: Optional[float] = None, negative_ttl: Optional[float] = None) -> Any:
+        """
+        ``get_or_load`` for an ``AsyncSession``: ``load`` is the same sync
+        function, run with ``db.run_sync``. Concurrent misses await one
+        load without blocking the event loop.
+        """
+        result = self._lookup(key, tag, self._async_inflight, _AsyncFlight)
+        if result[0] == "hit":
+            return result[1]
+        if result[0] == "stale":
+            self._schedule_refresh(key, load, tag, ttl, negative_ttl, result[2])
+            return result[1]
+
+        _, flight, leader, generation = result
+        if not leader:
+            # asyncio.wait never cancels the leader's future
+            await asyncio.wait([flight.future], timeout=SINGLE_FLIGHT_WAIT)
+            if flight.future.done() and not flight.future.cancelled():
+                return flight.future.result()
+            return await db.run_sync(load)
+
+        try:
+            value = await db.run_sync(load)
+            self._store(key, value, tag, generation, ttl, negative_ttl)
+            flight.future.set_result(value)
+            return value
+        except BaseException as e:
+            if isinstance(e, Exception):
+                flight.future.set_exception(e)
+                # Followers re-raise it; don't report it as never retrieved
+                flight.future.exception()
+            else:
+                flight.future.cancel()
+            raise
+        finally:
+            with self._lock:
+                if self._async_inflight.get(key) is flight:
+                    del self._async_inflight[key]
+
+    def _store(self, key, value, tag, generation, ttl, negative_ttl):
+        if value is NOT_FOUND:
+            self.set(key, value, tag=tag, generation=generation,
+                     ttl=self.ttl if negative_ttl is None else negative_ttl, stale_ttl=0)
+        else:
+            self.set(key, value, tag=tag, generation=generation, ttl=ttl)
+
+    def _refresh(self, key, load, tag, ttl, negative_ttl, generation):
+        from database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            self._store(key, load(db), tag, generation, ttl, negative_ttl)
+            with self._lock:
+                self.refreshes += 1
+        except Exception as e:
+            app_logger.warning(f"Background refresh of {self.name} cache entry failed: {e}")
+        finally:
+            db.close()
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def invalidate_tag(self, tag: str) -> int:
+        """Drop every entry stored under ``tag``; returns how many were dropped"""
+        with self._lock:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+            keys = self._tags.pop(tag, ())
+            for key in keys:
+                self._data.pop(key, None)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._tags.clear()
+
+    def _pop_locked(self, key: Hashable):
+        entry = self._data.pop(key, None)
+        if entry is not None and entry[1] is not None:
+            keys = self._tags.get(entry[1])
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[entry[1]]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "stale_hits": self.stale_hits,
+                "coalesced": self.coalesced,
+                "refreshes": self.refreshes,
+                "refreshing": len(self._refreshing),
+            }
+
+    def __len__(self):
+        return len(self._data)
+
+
+# Marker stored for lookups that found nothing (negative caching)
+NOT_FOUND = object()
+
+# Search results: (table, query, skip, limit) -> (items, total)
+search_cache = TTLCache("search", settings.SEARCH_CACHE_SIZE, settings.SEARCH_CACHE_TTL,
+                        stale_ttl=settings.SEARCH_CACHE_STALE_TTL)
+
+# Detail lookups: (table, column, value) -> read-only row snapshot or NOT_FOUND
+detail_cache = TTLCache("detail", settings.DETAIL_CACHE_SIZE, settings.DETAIL_CACHE_TTL,
+                        stale_ttl=settings.DETAIL_CACHE_STALE_TTL)
+
+# Compressed response bodies: (body digest, encoding) -> compressed bytes
+compressed_cache = TTLCache("compressed", settings.COMPRESSED_CACHE_SIZE, settings.COMPRESSED_CACHE_TTL)
+
+_caches = (search_cache, detail_cache, compressed_cache)
+
+
+def cache_stats() -> dict:
+    return {cache.name: cache.stats() for cache in _caches}
+
+
+def on_item_written(model, item_id: str, values: Optional[dict]):
+    """Drop cached entries read from the table that was written to"""
+    reset_table(model)
+
+
+def reset_table(model):
+    for cache in _caches:
+        dropped = cache.invalidate_tag(model.__tablename__)
+        if dropped:
+            app_logger.debug(f"Invalidated {dropped} {cache.name} cache entries for {model.__tablename__}")
@@ -0,0 +1,352 @@
+"""
+Cross-worker cache invalidation.
+
+Every ORM flush that touches a tracked table, and every bulk ORM
+update/delete of one, bumps that table's row in ``table_versions`` inside the
+same transaction. On PostgreSQL it also queues a
+``pg_notify`` per changed row, delivered to the other workers on commit; each
+worker LISTENs from an async task, reloads the row and replays the crud write
+listeners so its caches and in-process indexes follow the write. On other
+databases workers poll ``table_versions`` and reset any table that was changed
+by someone else.
+
+Versions seen by a worker (its own commits and applied events) are tracked
+per table; a version it never saw means an event was missed, and the table is
+reset wholesale. A version only counts as seen once this worker's caches
+have dropped what it changed, so ``applied_versions`` (the conditional GET
+validators) never runs ahead of what the caches serve.
+"""
+import asyncio
+import json
+import threading
+import uuid
+from datetime import datetime
+from typing import Dict, Set
+
+from sqlalchemy import event, func, insert, select, update
+from sqlalchemy.orm import Session
+
+import models
+from config import settings
+from counters import COUNTED_MODELS
+from logger import db_logger
+
+WORKER_ID = uuid.uuid4().hex[:12]
+
+# Same tables as the row counters (the public content served by list/detail
+# endpoints, not users), plus the about page tables behind materialized views
+TRACKED_MODELS = COUNTED_MODELS + (models.About, models.CEO, models.Supporter)
+_MODELS_BY_TABLE = {model.__tablename__: model for model in TRACKED_MODELS}
+
+# More changed rows than this in one flush are published as one table event
+MAX_KEYS_PER_EVENT = 50
+# PostgreSQL: how often the version check runs as a safety net next to LISTEN
+RESYNC_INTERVAL = 60
+RECONNECT_DELAY = 5
+
+_versions = models.TableVersion.__table__
+_state_lock = threading.Lock()
+_known: Dict[str, int] = {}          # table -> highest contiguous version seen
+_pending: Dict[str, Set[int]] = {}   # table -> versions seen past a gap
+_updated: Dict[str, datetime] = {}   # table -> when the seen version was written (or later)
+
+
+# ---------------------------------------------------------------------------
+# Publishing (runs inside the writer's transaction)
+# ---------------------------------------------------------------------------
+
+@event.listens_for(Session, "after_flush")
+def _publish_changes(session, flush_context):
+    changes: Dict[str, Set[str]] = {}
+    for objects, check in ((session.new, False), (session.dirty, True), (session.deleted, False)):
+        for obj in objects:
+            table = getattr(obj, "__tablename__", None)
+            if table not in _MODELS_BY_TABLE:
+                continue
+            if check and not session.is_modified(obj, include_collections=False):
+                continue
+            changes.setdefault(table, set()).add(obj.id)
+    for table, keys in changes.items():
+        _bump_version(session, table, keys)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _publish_bulk_changes(orm_execute_state):
+    """
+    Bulk ``Query.update()``/``delete()`` statements never flush, so they are
+    published here as table-wide changes: the affected rows are unknown, and
+    every worker, this one included (on commit), resets the table.
+    """
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    table = mapper.local_table.name if mapper is not None else None
+    if table not in _MODELS_BY_TABLE:
+        return
+    session = orm_execute_state.session
+    _bump_version(session, table, None)
+    session.info.setdefault("cache_bus_resets", set()).add(table)
+
+
+def _bump_version(session, table: str, keys):
+    """Bump ``table``'s version in the session's transaction; ``keys=None`` means any row"""
+    conn = session.connection()
+    version = conn.execute(
+        update(_versions)
+        .where(_versions.c.table_name == table)
+        .values(version=_versions.c.version + 1, updated_at=datetime.utcnow())
+        .returning(_versions.c.version)
+    ).scalar()
+    if version is None:
+        # Not seeded yet (seed_versions runs at startup)
+        return
+    session.info.setdefault("cache_bus_versions", []).append((table, version))
+    if conn.dialect.name == "postgresql":
+        table_wide = keys is None or len(keys) > MAX_KEYS_PER_EVENT
+        for key in ([None] if table_wide else sorted(keys)):
+            payload = json.dumps({"w": WORKER_ID, "t": table, "k": key, "v": version})
+            conn.execute(select(func.pg_notify(settings.CACHE_BUS_CHANNEL, payload)))
+
+
+@event.listens_for(Session, "after_commit")
+def _own_versions_committed(session):
+    versions = session.info.pop("cache_bus_versions", ())
+    resets = session.info.pop("cache_bus_resets", ())
+    if not versions:
+        return
+    import cache
+    import crud
+    # Drop cached reads before the versions are marked seen; the crud write
+    # listeners only run after the caller's refresh
+    for table in {table for table, _ in versions}:
+        cache.reset_table(_MODELS_BY_TABLE[table])
+    for table in resets:
+        crud.reset_table(_MODELS_BY_TABLE[table])
+    committed = datetime.utcnow()
+    for table, version in versions:
+        _mark_seen(table, version, committed)
+
+
+@event.listens_for(Session, "after_rollback")
+def _own_versions_rolled_back(session):
+    session.info.pop("cache_bus_versions", None)
+    session.info.pop("cache_bus_resets", None)
+
+
+# ---------------------------------------------------------------------------
+# Version bookkeeping
+# ---------------------------------------------------------------------------
+
+def seed_versions(engine):
+    """Create the table_versions rows for tracked tables that lack one"""
+    with engine.begin() as conn:
+        existing = set(conn.execute(select(_versions.c.table_name)).scalars())
+        missing = [table for table in _MODELS_BY_TABLE if table not in existing]
+        if missing:
+            conn.execute(insert(_versions), [
+                {"table_name": table, "version": 0, "updated_at": datetime.utcnow()} for table in missing
+            ])
+
+
+def read_versions(engine, tables):
+    """
+    Current (version, updated_at) of each of ``tables``, in order; tables
+    without a version row report (0, None).
+    """
+    with engine.connect() as conn:
+        rows = dict(
+            (row.table_name, (row.version, row.updated_at))
+            for row in conn.execute(
+                select(_versions.c.table_name, _versions.c.version, _versions.c.updated_at)
+                .where(_versions.c.table_name.in_(tables))
+            )
+        )
+    return [rows.get(table, (0, None)) for table in tables]
+
+
+def applied_versions(tables):
+    """
+    (version, updated_at) of each of ``tables`` as applied by this worker, in
+    order, without a database round trip; None until the first sync.
+    """
+    with _state_lock:
+        if any(table not in _known for table in tables):
+            return None
+        return [(_known[table], _updated.get(table)) for table in tables]
+
+
+def _mark_seen(table: str, version: int, updated_at: datetime = None):
+    with _state_lock:
+        known = _known.get(table)
+        if known is None or version <= known:
+            return
+        pending = _pending.setdefault(table, set())
+        pending.add(version)
+        advanced = known
+        while advanced + 1 in pending:
+            advanced += 1
+            pending.remove(advanced)
+        if advanced > known:
+            _known[table] = advanced
+            _advance_updated(table, updated_at or datetime.utcnow())
+
+
+def _advance_updated(table: str, updated_at):
+    # Never moves back: an IMS request must not get 304 for a later write
+    if updated_at is not None and (table not in _updated or updated_at > _updated[table]):
+        _updated[table] = updated_at
+
+
+def sync_versions(engine):
+    """
+    Compare table_versions with the versions this worker has seen and reset
+    every table that changed behind its back. The first call only records
+    the current versions.
+    """
+    with engine.connect() as conn:
+        current = {
+            row.table_name: (row.version, row.updated_at)
+            for row in conn.execute(select(_versions.c.table_name, _versions.c.version, _versions.c.updated_at))
+        }
+    with _state_lock:
+        stale = [table for table, (version, _) in current.items()
+                 if table in _known and version > _known[table]]
+    if stale:
+        import crud
+        for table in stale:
+            if table in _MODELS_BY_TABLE:
+                db_logger.info(f"Cache bus: {table} changed in another worker, resetting")
+                crud.reset_table(_MODELS_BY_TABLE[table])
+    # Advanced only after the reset, so the validators never get ahead of the caches
+    with _state_lock:
+        for table, (version, updated_at) in current.items():
+            known = _known.get(table)
+            if known is None or version > known:
+                _known[table] = version
+                _pending[table] = {v for v in _pending.get(table, ()) if v > version}
+                _advance_updated(table, updated_at)
+
+
+# ---------------------------------------------------------------------------
+# Consuming
+# ---------------------------------------------------------------------------
+
+def _apply_events(payloads):
+    """Apply NOTIFY payloads from other workers (runs in a worker thread)"""
+    import crud
+    from database import SessionLocal
+
+    events = []
+    for payload in payloads:
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            continue
+        if data.get("w") != WORKER_ID and data.get("t") in _MODELS_BY_TABLE:
+            events.append(data)
+    if not events:
+        return
+
+    db = SessionLocal()
+    try:
+        for data in events:
+            model = _MODELS_BY_TABLE[data["t"]]
+            if data.get("k") is None:
+                crud.reset_table(model)
+            else:
+                crud.replay_write(db, model, data["k"])
+                db.expire_all()
+            if isinstance(data.get("v"), int):
+                _mark_seen(data["t"], data["v"])
+    finally:
+        db.close()
+
+
+_DISCONNECTED = object()
+
+
+def _open_listen_connection(engine):
+    """Dedicated autocommit psycopg2 connection LISTENing on the bus channel"""
+    connection = engine.raw_connection()
+    # Keep it out of the pool: it lives as long as the listener
+    connection.detach()
+    dbapi_connection = connection.driver_connection
+    dbapi_connection.autocommit = True
+    with dbapi_connection.cursor() as cursor:
+        cursor.execute(f'LISTEN "{settings.CACHE_BUS_CHANNEL}"')
+    return connection
+
+
+async def _listen_postgres(engine):
+    loop = asyncio.get_running_loop()
+    while True:
+        connection = None
+        try:
+            connection = await asyncio.to_thread(_open_listen_connection, engine)
+            dbapi_connection = connection.driver_connection
+            db_logger.info(f"Cache bus listening on '{settings.CACHE_BUS_CHANNEL}' (worker {WORKER_ID})")
+            # Catch up on anything missed while (re)connecting
+            await asyncio.to_thread(sync_versions, engine)
+
+            queue: asyncio.Queue = asyncio.Queue()
+
+            def drain():
+                try:
+                    dbapi_connection.poll()
+                except Exception:
+                    queue.put_nowait(_DISCONNECTED)
+                    return
+                while dbapi_connection.notifies:
+                    queue.put_nowait(dbapi_connection.notifies.pop(0).payload)
+
+            fd = dbapi_connection.fileno()
+            loop.add_reader(fd, drain)
+            try:
+                while True:
+                    try:
+                        payload = await asyncio.wait_for(queue.get(), RESYNC_INTERVAL)
+                    except asyncio.TimeoutError:
+                        await asyncio.to_thread(sync_versions, engine)
+                        continue
+                    batch = [payload]
+                    while not queue.empty():
+                        batch.append(queue.get_nowait())
+                    if _DISCONNECTED in batch:
+                        raise ConnectionError("cache bus connection lost")
+                    await asyncio.to_thread(_apply_events, batch)
+            finally:
+                loop.remove_reader(fd)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            db_logger.warning(f"Cache bus listener error, reconnecting in {RECONNECT_DELAY}s: {e}")
+            await asyncio.sleep(RECONNECT_DELAY)
+        finally:
+            if connection is not None:
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+
+
+async def _poll_versions(engine, interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(sync_versions, engine)
+        except Exception as e:
+            db_logger.warning(f"Cache bus version poll failed: {e}")
+
+
+async def run_cache_bus(engine):
+    """Lifespan task: LISTEN on PostgreSQL (psycopg2), version polling elsewhere"""
+    try:
+        await asyncio.to_thread(seed_versions, engine)
+        await asyncio.to_thread(sync_versions, engine)
+    except Exception as e:
+        db_logger.warning(f"Cache bus setup failed: {e}")
+    if engine.dialect.name == "postgresql" and engine.dialect.driver == "psycopg2":
+        await _listen_postgres(engine)
+    else:
+        db_logger.info(f"Cache bus polling table versions every {settings.CACHE_BUS_POLL_INTERVAL}s")
+        await _poll_versions(engine, settings.CACHE_BUS_POLL_INTERVAL)
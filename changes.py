@@ -0,0 +1,237 @@
+"""
+Change feed for delta sync.
+
+Every ORM flush stamps the synced rows it inserts or updates with
+``updated_at`` and a value from the global ``change_sequence``, and records a
+tombstone for each synced row it deletes. Clients that hold a copy of the
+content ask for everything with a sequence above the last one they saw.
+
+Readers only ever see a sequence value once no transaction can still commit
+a row at or below it. On SQLite the single ``change_sequence`` row is updated
+inside the writer's transaction (SQLite runs one writer at a time anyway). On
+PostgreSQL writers draw values from ``change_sequence_seq`` while holding a
+shared advisory lock until they commit; ``current_sequence`` takes the same
+lock exclusively for an instant, which waits out the writers that already
+drew values, so writers never queue behind each other.
+
+Tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS are pruned by the
+scheduler; a client whose ``since`` predates the pruned range gets
+``ResyncRequired`` and must start over from the bundle.
+"""
+import hashlib
+from datetime import datetime
+
+from sqlalchemy import bindparam, delete, event, func, insert, select, text, update
+from sqlalchemy.orm import Session
+
+import models
+from logger import db_logger
+from utils import serialize_item
+
+SYNC_MODELS = (
+    models.DictionaryWord,
+    models.Drug,
+    models.Disease,
+    models.NormalRange,
+    models.HaematologyTest,
+    models.SerologyTest,
+    models.BiochemistryTest,
+    models.BacteriologyTest,
+    models.OtherTest,
+    models.Instrument,
+    models.Note,
+    models.Book,
+    models.UrineSlide,
+    models.StoolSlide,
+    models.OtherSlide,
+    models.AppLink,
+)
+SYNC_TABLES = tuple(model.__tablename__ for model in SYNC_MODELS)
+_SYNCED = set(SYNC_TABLES)
+
+_sequence = models.ChangeSequence.__table__
+_tombstones = models.SyncTombstone.__table__
+SEQUENCE_ID = 1
+SEQUENCE_NAME = models.change_sequence_seq.name
+# Signed 64-bit key for the PostgreSQL writers lock
+_WRITERS_LOCK = int.from_bytes(hashlib.sha1(b"changes:writers").digest()[:8], "big", signed=True)
+
+
+class ResyncRequired(Exception):
+    """``since`` is older than the retained tombstones"""
+
+    def __init__(self, pruned_through: int):
+        super().__init__(f"Deletions up to version {pruned_through} are no longer retained")
+        self.pruned_through = pruned_through
+
+
+def is_synced(obj) -> bool:
+    return getattr(obj, "__tablename__", None) in _SYNCED
+
+
+def _allocate(conn, count: int) -> list:
+    """Reserve ``count`` sequence values; returns them in ascending order"""
+    if conn.dialect.name == "postgresql":
+        # Held until commit, see current_sequence
+        conn.execute(select(func.pg_advisory_xact_lock_shared(_WRITERS_LOCK)))
+        return sorted(conn.execute(
+            select(func.nextval(SEQUENCE_NAME)).select_from(func.generate_series(1, count))
+        ).scalars())
+    last = conn.execute(
+        update(_sequence)
+        .where(_sequence.c.id == SEQUENCE_ID)
+        .values(value=_sequence.c.value + count)
+        .returning(_sequence.c.value)
+    ).scalar()
+    if last is None:
+        # Not seeded yet (setup_change_tracking runs at startup)
+        conn.execute(insert(_sequence).values(id=SEQUENCE_ID, value=count))
+        last = count
+    return list(range(last - count + 1, last + 1))
+
+
+@event.listens_for(Session, "before_flush")
+def _stamp_changes(session, flush_context, instances):
+    written = [obj for obj in session.new if is_synced(obj)]
+    written += [
+        obj for obj in session.dirty
+        if is_synced(obj) and session.is_modified(obj, include_collections=False)
+    ]
+    deleted = [obj for obj in session.deleted if is_synced(obj)]
+    if not written and not deleted:
+        return
+
+    # One value per row, so clients can page through the feed by sequence
+    seqs = iter(_allocate(session.connection(), len(written) + len(deleted)))
+    now = datetime.utcnow()
+    for obj in written:
+        obj.change_seq = next(seqs)
+        obj.updated_at = now
+    for obj in deleted:
+        session.add(models.SyncTombstone(
+            table_name=obj.__tablename__, item_id=obj.id, change_seq=next(seqs), deleted_at=now
+        ))
+
+
+def current_sequence(conn) -> int:
+    """Highest change sequence value below which every writer has committed"""
+    if conn.dialect.name == "postgresql":
+        # Waits for the writers holding the lock shared; writers arriving
+        # after the unlock draw higher values than the one read here
+        conn.execute(select(func.pg_advisory_lock(_WRITERS_LOCK)))
+        try:
+            last_value, is_called = conn.execute(text(f"SELECT last_value, is_called FROM {SEQUENCE_NAME}")).one()
+        finally:
+            conn.execute(select(func.pg_advisory_unlock(_WRITERS_LOCK)))
+        return last_value if is_called else 0
+    return conn.execute(select(_sequence.c.value).where(_sequence.c.id == SEQUENCE_ID)).scalar() or 0
+
+
+def pruned_through(conn) -> int:
+    """Highest sequence value whose tombstone may have been pruned"""
+    return conn.execute(select(_sequence.c.pruned_through).where(_sequence.c.id == SEQUENCE_ID)).scalar() or 0
+
+
+def prune_tombstones(db: Session, before: datetime) -> int:
+    """
+    Delete the tombstones of rows deleted before ``before`` and raise the
+    pruned horizon in the same transaction; returns how many were deleted
+    """
+    horizon = db.execute(
+        select(func.max(_tombstones.c.change_seq)).where(_tombstones.c.deleted_at < before)
+    ).scalar()
+    if horizon is None:
+        return 0
+    db.execute(
+        update(_sequence)
+        .where((_sequence.c.id == SEQUENCE_ID) & (func.coalesce(_sequence.c.pruned_through, 0) < horizon))
+        .values(pruned_through=horizon)
+    )
+    return db.execute(delete(_tombstones).where(_tombstones.c.change_seq <= horizon)).rowcount
+
+
+def setup_change_tracking(engine):
+    """Seed the sequence and number rows written before change tracking existed"""
+    with engine.begin() as conn:
+        if conn.execute(select(_sequence.c.id).where(_sequence.c.id == SEQUENCE_ID)).first() is None:
+            conn.execute(insert(_sequence).values(id=SEQUENCE_ID, value=0))
+        if conn.dialect.name == "postgresql":
+            # Continue from the row counter used before the sequence existed
+            last = conn.execute(select(_sequence.c.value).where(_sequence.c.id == SEQUENCE_ID)).scalar() or 0
+            if last > 0:
+                conn.execute(
+                    text(f"SELECT setval('{SEQUENCE_NAME}', :last) FROM {SEQUENCE_NAME} "
+                         "WHERE NOT is_called OR last_value < :last"),
+                    {"last": last},
+                )
+    for model in SYNC_MODELS:
+        table = model.__table__
+        try:
+            with engine.begin() as conn:
+                ids = conn.execute(
+                    select(table.c.id).where(table.c.change_seq.is_(None)).order_by(table.c.id)
+                ).scalars().all()
+                if not ids:
+                    continue
+                seqs = _allocate(conn, len(ids))
+                conn.execute(
+                    update(table).where(table.c.id == bindparam("b_id")).values(change_seq=bindparam("b_seq")),
+                    [{"b_id": item_id, "b_seq": seq} for item_id, seq in zip(ids, seqs)],
+                )
+            db_logger.info(f"Change tracking: numbered {len(ids)} existing rows in {table.name}")
+        except Exception as e:
+            db_logger.warning(f"Change tracking backfill failed for {table.name}: {e}")
+
+
+def get_changes(db: Session, since: int, limit: int) -> dict:
+    """
+    Rows written and deleted after sequence ``since``, at most ``limit`` of
+    them, oldest first. ``version`` is the sequence to pass as ``since`` next
+    time; ``has_more`` means the feed was cut off at ``limit``. Raises
+    ResyncRequired when deletions after ``since`` may have been pruned.
+    """
+    conn = db.connection()
+    horizon = pruned_through(conn)
+    # since=0 is a full download, which needs no deletions
+    if since and since < horizon:
+        raise ResyncRequired(horizon)
+    upper = current_sequence(conn)
+
+    # Find where the page ends from the sequence indexes alone, then load
+    # only the rows up to that point
+    seqs = []
+    for column in [model.change_seq for model in SYNC_MODELS] + [_tombstones.c.change_seq]:
+        seqs += db.execute(
+            select(column).where(column > since, column <= upper).order_by(column).limit(limit + 1)
+        ).scalars().all()
+    seqs.sort()
+    has_more = len(seqs) > limit
+    version = seqs[limit - 1] if has_more else upper
+
+    changes, deleted = {}, {}
+    if seqs and seqs[0] <= version:
+        for model in SYNC_MODELS:
+            rows = db.query(model).filter(
+                model.change_seq > since, model.change_seq <= version
+            ).order_by(model.change_seq).all()
+            if rows:
+                changes[model.__tablename__] = [serialize_item(row) for row in rows]
+        tombstones = db.execute(
+            select(_tombstones.c.table_name, _tombstones.c.item_id)
+            .where(_tombstones.c.change_seq > since, _tombstones.c.change_seq <= version)
+            .order_by(_tombstones.c.change_seq)
+        ).all()
+        written = {table_name: {row["id"] for row in rows} for table_name, rows in changes.items()}
+        for table_name, item_id in tombstones:
+            # A row deleted and then re-created under the same id is not gone
+            if item_id in written.get(table_name, ()):
+                continue
+            deleted.setdefault(table_name, []).append(item_id)
+
+    return {
+        "since": since,
+        "version": version,
+        "has_more": has_more,
+        "changes": changes,
+        "deleted": deleted,
+    }
@@ -0,0 +1,87 @@
+"""
+Response compression.
+
+``negotiate`` picks brotli or gzip from the request's Accept-Encoding
+(brotli only when the optional ``brotli`` package is installed).
+``compress_cached`` keeps compressed bodies in ``cache.compressed_cache``
+keyed by a digest of the uncompressed bytes, so a hot response served again
+from one of the caches is compressed once rather than per request.
+Compressed responses carry a weak ETag, as they are a different
+representation of the same content.
+"""
+import gzip
+import hashlib
+from typing import Optional
+
+from cache import compressed_cache
+from config import settings
+
+try:
+    import brotli
+except ImportError:  # optional dependency: gzip only
+    brotli = None
+
+# Preference order when the client accepts several with the same q-value
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/",
+)
+
+# Larger bodies are compressed per request rather than cached
+MAX_CACHED_BODY = 4 * 1024 * 1024
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """Best supported encoding allowed by an Accept-Encoding header, or None"""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for encoding in ENCODINGS:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    return bool(content_type) and content_type.lower().startswith(COMPRESSIBLE_TYPES)
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+def compress_cached(body: bytes, encoding: str) -> bytes:
+    """``compress`` with the result cached by content"""
+    if len(body) > MAX_CACHED_BODY:
+        return compress(body, encoding)
+    key = (hashlib.sha1(body).digest(), encoding)
+    compressed = compressed_cache.get(key)
+    if compressed is None:
+        compressed = compress(body, encoding)
+        compressed_cache.set(key, compressed)
+    return compressed
+
+
+def weak_etag(etag: Optional[str]) -> Optional[str]:
+    if not etag or etag.startswith("W/"):
+        return etag
+    return f"W/{etag}"
@@ -69,6 +69,81 @@ class Settings:
         self.DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '30'))
         self.DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '3600'))
         
+        # Unified search (/api/search)
+        self.SEARCH_SOURCE_TIMEOUT = float(os.getenv('SEARCH_SOURCE_TIMEOUT', '2.0'))  # seconds
+        self.SEARCH_MAX_CONCURRENCY = int(os.getenv('SEARCH_MAX_CONCURRENCY', str(self.DB_POOL_SIZE)))  # source queries at once, per worker
+        
+        # Search result cache
+        self.SEARCH_CACHE_SIZE = int(os.getenv('SEARCH_CACHE_SIZE', '2000'))  # entries
+        self.SEARCH_CACHE_TTL = float(os.getenv('SEARCH_CACHE_TTL', '300'))  # seconds
+        self.SEARCH_CACHE_STALE_TTL = float(os.getenv('SEARCH_CACHE_STALE_TTL', '120'))  # seconds served stale while refreshing
+        
+        # Detail lookup cache
+        self.DETAIL_CACHE_SIZE = int(os.getenv('DETAIL_CACHE_SIZE', '5000'))  # entries
+        self.DETAIL_CACHE_TTL = float(os.getenv('DETAIL_CACHE_TTL', '600'))  # seconds
+        self.DETAIL_CACHE_NEGATIVE_TTL = float(os.getenv('DETAIL_CACHE_NEGATIVE_TTL', '30'))  # seconds, for 404s
+        self.DETAIL_CACHE_STALE_TTL = float(os.getenv('DETAIL_CACHE_STALE_TTL', '300'))  # seconds served stale while refreshing
+        # Threads refreshing stale cache entries in the background
+        self.CACHE_REFRESH_WORKERS = int(os.getenv('CACHE_REFRESH_WORKERS', '2'))
+        
+        # Response compression (gzip, plus brotli when the package is installed)
+        self.COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))  # bytes
+        self.COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', '6'))
+        self.COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', '5'))
+        self.COMPRESSED_CACHE_SIZE = int(os.getenv('COMPRESSED_CACHE_SIZE', '500'))  # entries
+        self.COMPRESSED_CACHE_TTL = float(os.getenv('COMPRESSED_CACHE_TTL', '600'))  # seconds
+        
+        # Startup cache warming from recorded lookups (warmup.py)
+        self.WARMUP_TOP_N = int(os.getenv('WARMUP_TOP_N', '500'))  # lookups, 0 = disabled
+        self.WARMUP_BUDGET_SECONDS = float(os.getenv('WARMUP_BUDGET_SECONDS', '15'))
+        self.WARMUP_WINDOW_DAYS = int(os.getenv('WARMUP_WINDOW_DAYS', '7'))
+        self.WARMUP_STATS_FLUSH_INTERVAL = float(os.getenv('WARMUP_STATS_FLUSH_INTERVAL', '60'))  # seconds
+        
+        # Cross-worker cache invalidation
+        self.CACHE_BUS_CHANNEL = os.getenv('CACHE_BUS_CHANNEL', 'cache_invalidation')
+        self.CACHE_BUS_POLL_INTERVAL = float(os.getenv('CACHE_BUS_POLL_INTERVAL', '2'))  # seconds, SQLite
+        
+        # Offline content bundle (/api/sync/bundle)
+        self.BUNDLE_DIR = os.getenv('BUNDLE_DIR', 'bundles')
+        self.BUNDLE_DEBOUNCE_SECONDS = float(os.getenv('BUNDLE_DEBOUNCE_SECONDS', '30'))
+        
+        # Push notification outbox (outbox.py)
+        self.OUTBOX_POLL_INTERVAL = float(os.getenv('OUTBOX_POLL_INTERVAL', '10'))  # seconds, between scans for retries
+        self.OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', '20'))  # rows claimed per scan
+        self.OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '8'))
+        self.OUTBOX_RETRY_BASE_DELAY = float(os.getenv('OUTBOX_RETRY_BASE_DELAY', '5'))  # seconds, doubled per attempt
+        self.OUTBOX_RETRY_MAX_DELAY = float(os.getenv('OUTBOX_RETRY_MAX_DELAY', '3600'))  # seconds
+        self.OUTBOX_COALESCE_WINDOW = float(os.getenv('OUTBOX_COALESCE_WINDOW', '60'))  # seconds a new-content push waits to be merged into a digest
+        self.OUTBOX_LEASE_SECONDS = float(os.getenv('OUTBOX_LEASE_SECONDS', '60'))  # a claimed row is retried after this if never marked
+        
+        # Shared outbound HTTP clients (http_client.py)
+        self.HTTP_CLIENT_TIMEOUT = float(os.getenv('HTTP_CLIENT_TIMEOUT', '10'))  # seconds
+        self.HTTP_CLIENT_MAX_CONNECTIONS = int(os.getenv('HTTP_CLIENT_MAX_CONNECTIONS', '20'))
+        self.HTTP_CLIENT_MAX_KEEPALIVE = int(os.getenv('HTTP_CLIENT_MAX_KEEPALIVE', '10'))
+        self.HTTP_CLIENT_KEEPALIVE_EXPIRY = float(os.getenv('HTTP_CLIENT_KEEPALIVE_EXPIRY', '60'))  # seconds
+        
+        # Event-loop lag monitor (loop_monitor.py, /api/admin/event-loop)
+        self.LOOP_MONITOR_INTERVAL = float(os.getenv('LOOP_MONITOR_INTERVAL', '0.05'))  # seconds, 0 = disabled
+        self.LOOP_BLOCK_THRESHOLD = float(os.getenv('LOOP_BLOCK_THRESHOLD', '0.1'))  # seconds before a stack is captured
+        
+        # Scheduled jobs (scheduler.py, /api/admin/jobs); cron expressions are UTC, empty = job disabled
+        self.SCHEDULER_ENABLED = os.getenv('SCHEDULER_ENABLED', 'true').lower() == 'true'
+        self.SCHEDULER_JITTER_SECONDS = float(os.getenv('SCHEDULER_JITTER_SECONDS', '30'))  # random delay added to each run
+        self.SCHEDULER_LOCK_DIR = os.getenv('SCHEDULER_LOCK_DIR', '')  # SQLite lock files (jobs, search index setup), default: system temp dir
+        self.SCHEDULER_HISTORY_DAYS = int(os.getenv('SCHEDULER_HISTORY_DAYS', '30'))  # job run history kept
+        self.DAILY_POINTS_RESET_CRON = os.getenv('DAILY_POINTS_RESET_CRON', '0 0 * * *')
+        self.PRUNE_HISTORY_CRON = os.getenv('PRUNE_HISTORY_CRON', '30 3 * * *')
+        self.OUTBOX_RETENTION_DAYS = int(os.getenv('OUTBOX_RETENTION_DAYS', '30'))  # delivered/failed notifications kept
+        self.SYNC_TOMBSTONE_RETENTION_DAYS = int(os.getenv('SYNC_TOMBSTONE_RETENTION_DAYS', '90'))  # delta sync deletions kept; older clients resync
+        self.REFRESH_TOKEN_PURGE_CRON = os.getenv('REFRESH_TOKEN_PURGE_CRON', '15 * * * *')
+        self.REFRESH_TOKEN_PURGE_BATCH = int(os.getenv('REFRESH_TOKEN_PURGE_BATCH', '1000'))  # rows deleted per transaction
+
+        # Table row counters
+        self.COUNTER_RECONCILE_INTERVAL = int(os.getenv('COUNTER_RECONCILE_INTERVAL', '3600'))  # seconds
+        # PostgreSQL only: tables with at least this many rows report the
+        # pg_class.reltuples estimate instead of the counter (0 = disabled)
+        self.COUNT_ESTIMATE_MIN_ROWS = int(os.getenv('COUNT_ESTIMATE_MIN_ROWS', '0'))
+        
         # Logging
         self.LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
         
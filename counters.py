@@ -0,0 +1,152 @@
+"""
+Maintained per-table row counts.
+
+Inserts and deletes flushed through any ORM session adjust the matching
+``table_counters`` row in the same transaction, so an unfiltered total is a
+primary-key read instead of ``SELECT COUNT(*)``. Writes that bypass the ORM
+(bulk deletes, manual SQL) are corrected by ``reconcile_counters``, which runs
+at startup and then periodically.
+"""
+import asyncio
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import event, func, insert, select, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import models
+from config import settings
+from logger import db_logger
+
+# Public content tables. Users are left out: their points, login and
+# registration writes would otherwise bump counters and cache versions (and
+# reach every worker through the cache bus) without changing any content.
+COUNTED_MODELS = (
+    models.Book,
+    models.Disease,
+    models.Drug,
+    models.DictionaryWord,
+    models.Notification,
+    models.Instrument,
+    models.Note,
+    models.UrineSlide,
+    models.StoolSlide,
+    models.OtherSlide,
+    models.NormalRange,
+    models.AppLink,
+    models.HaematologyTest,
+    models.SerologyTest,
+    models.BiochemistryTest,
+    models.BacteriologyTest,
+    models.OtherTest,
+)
+
+_COUNTED_TABLES = {model.__tablename__ for model in COUNTED_MODELS}
+_counters = models.TableCounter.__table__
+
+
+def is_counted(model) -> bool:
+    return getattr(model, "__tablename__", None) in _COUNTED_TABLES
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_flush_deltas(session, flush_context):
+    """Adjust counters for the rows this flush inserted or deleted"""
+    deltas = Counter()
+    for obj in session.new:
+        if is_counted(obj):
+            deltas[obj.__tablename__] += 1
+    for obj in session.deleted:
+        if is_counted(obj):
+            deltas[obj.__tablename__] -= 1
+    if not deltas:
+        return
+    conn = session.connection()
+    for table_name, delta in deltas.items():
+        if delta:
+            conn.execute(
+                update(_counters)
+                .where(_counters.c.table_name == table_name)
+                .values(row_count=_counters.c.row_count + delta)
+            )
+
+
+def _estimate(db: Session, table_name: str) -> Optional[int]:
+    """Planner row estimate for ``table_name`` (PostgreSQL only)"""
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+    estimate = db.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:t)"), {"t": table_name}
+    ).scalar()
+    return estimate if estimate is not None and estimate >= 0 else None
+
+
+def get_count(db: Session, model) -> int:
+    """Row count of ``model``'s table without scanning it"""
+    table_name = model.__tablename__
+    if settings.COUNT_ESTIMATE_MIN_ROWS > 0:
+        estimate = _estimate(db, table_name)
+        if estimate is not None and estimate >= settings.COUNT_ESTIMATE_MIN_ROWS:
+            return estimate
+    count = db.execute(
+        select(_counters.c.row_count).where(_counters.c.table_name == table_name)
+    ).scalar()
+    if count is None:
+        # First use of this table: seed its counter
+        count, _ = reconcile_table(db.get_bind(), model)
+    return count
+
+
+def reconcile_table(engine, model):
+    """
+    Reset the counter of ``model`` to its exact row count.
+    Returns (row count, drift that was corrected).
+    """
+    table_name = model.__tablename__
+    with engine.begin() as conn:
+        # Lock the counter row first: writers that commit before us are
+        # included in the count, writers after us apply their delta on top
+        current = conn.execute(
+            select(_counters.c.row_count).where(_counters.c.table_name == table_name).with_for_update()
+        ).scalar()
+        exact = conn.execute(select(func.count()).select_from(model.__table__)).scalar()
+        if current is None:
+            try:
+                with conn.begin_nested():
+                    conn.execute(insert(_counters).values(
+                        table_name=table_name, row_count=exact, reconciled_at=datetime.utcnow()
+                    ))
+            except IntegrityError:
+                # Seeded concurrently by another worker
+                pass
+            return exact, 0
+        conn.execute(
+            update(_counters)
+            .where(_counters.c.table_name == table_name)
+            .values(row_count=exact, reconciled_at=datetime.utcnow())
+        )
+    return exact, exact - current
+
+
+def reconcile_counters(engine):
+    """Reconcile every counted table, logging any drift"""
+    for model in COUNTED_MODELS:
+        try:
+            count, drift = reconcile_table(engine, model)
+        except Exception as e:
+            db_logger.warning(f"Counter reconciliation failed for {model.__tablename__}: {e}")
+            continue
+        if drift:
+            db_logger.warning(f"Counter for {model.__tablename__} drifted by {drift}; reset to {count}")
+
+
+async def run_reconciler(engine, interval: int):
+    """Background task: reconcile all counters every ``interval`` seconds"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(reconcile_counters, engine)
+        except Exception as e:
+            db_logger.error(f"Counter reconciliation run failed: {e}")
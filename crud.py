@@ -1,11 +1,76 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, func, literal, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
+from functools import partial
 import models
 import schemas
 from datetime import datetime
+from types import MappingProxyType
 import uuid
 from auth import verify_password, get_password_hash
+from search import apply_search, is_searchable, find_best_match, on_item_written, reset_trigram_index
+import autocomplete
+import cache
+import counters
+import cache_bus  # registers the table version/NOTIFY flush hooks
+import changes  # registers the delta sync change sequence flush hook
+import materialized
+import outbox
+import warmup
+from normalization import fill_normalized
+from utils import serialize_item
+from config import settings
+from logger import db_logger
+
+# Write listeners: called as listener(model, item_id, values) after every
+# commit made through the generic CRUD helpers. ``values`` is a dict of the
+# row's column values, or None when the row was deleted.
+_write_listeners = []
+
+def add_write_listener(listener):
+    _write_listeners.append(listener)
+    return listener
+
+def _row_values(db_item) -> dict:
+    return {column.key: getattr(db_item, column.key) for column in db_item.__table__.columns}
+
+def _notify_write(model, item_id: str, values: Optional[dict]):
+    for listener in _write_listeners:
+        try:
+            listener(model, item_id, values)
+        except Exception as e:
+            db_logger.error(f"Write listener {listener.__name__} failed for {model.__tablename__}: {str(e)}")
+
+# Reset listeners: called as listener(model) when a table may have changed in
+# ways the write listeners did not see (e.g. written by another worker), so
+# anything derived from it must be dropped or rebuilt.
+_reset_listeners = []
+
+def add_reset_listener(listener):
+    _reset_listeners.append(listener)
+    return listener
+
+def reset_table(model):
+    for listener in _reset_listeners:
+        try:
+            listener(model)
+        except Exception as e:
+            db_logger.error(f"Reset listener {listener.__name__} failed for {model.__tablename__}: {str(e)}")
+
+def replay_write(db: Session, model, item_id: str):
+    """Run the write listeners for a row that was written by another process"""
+    db_item = get_item(db, model, item_id)
+    _notify_write(model, item_id, _row_values(db_item) if db_item is not None else None)
+
+add_write_listener(on_item_written)
+add_write_listener(autocomplete.on_item_written)
+add_write_listener(cache.on_item_written)
+add_write_listener(materialized.on_item_written)
+add_reset_listener(reset_trigram_index)
+add_reset_listener(autocomplete.reset_index)
+add_reset_listener(cache.reset_table)
+add_reset_listener(materialized.reset_table)
 
 # Generic CRUD operations
 def get_item(db: Session, model, item_id: str):
@@ -14,25 +79,199 @@ def get_item(db: Session, model, item_id: str):
 def get_items(db: Session, model, skip: int = 0, limit: int = 100):
     return db.query(model).offset(skip).limit(limit).all()
 
-def create_item(db: Session, model, item_data: dict):
+def create_item(db: Session, model, item_data: dict, notifications: Optional[list] = None):
+    """
+    Insert a ``model`` row. ``notifications`` (see ``outbox.message``) are
+    queued in the same commit and pushed by the outbox worker.
+    """
     if 'id' not in item_data:
         item_data['id'] = str(uuid.uuid4())
+    fill_normalized(model, item_data)
     db_item = model(**item_data)
     db.add(db_item)
+    if notifications:
+        outbox.enqueue(db, notifications)
     db.commit()
     db.refresh(db_item)
+    _notify_write(model, db_item.id, _row_values(db_item))
+    if notifications:
+        outbox.wake()
     return db_item
 
 def update_item(db: Session, db_item, item_data: dict):
+    fill_normalized(type(db_item), item_data)
     for key, value in item_data.items():
         setattr(db_item, key, value)
     db.commit()
     db.refresh(db_item)
+    _notify_write(type(db_item), db_item.id, _row_values(db_item))
     return db_item
 
+def paginate(query, skip: int = 0, limit: int = 100, total: Optional[int] = None):
+    """
+    Fetch one page of a relevance-ordered ``query`` together with the total
+    row count in a single round trip, using a COUNT(*) OVER() window instead
+    of a second COUNT query. Ranking already visits every match, so the
+    window is nearly free there (1.1-1.3x faster than page + COUNT in
+    benchmarks/bench_pagination.py); index-ordered listings must not use it,
+    see list_page. When the caller already knows ``total`` only the page is
+    fetched. Returns (items, total).
+    """
+    if total is not None:
+        return query.offset(skip).limit(limit).all(), total
+    rows = query.add_columns(func.count().over().label("total_count")).offset(skip).limit(limit).all()
+    if rows:
+        return [row[0] for row in rows], rows[0].total_count
+    # Past the last page there is no row to carry the window total
+    return [], query.order_by(None).count() if skip else 0
+
+# Stable list order per model: (sort column, descending). Ties are broken by
+# id, and each (sort column, id) pair has a composite index (see models.py)
+# so cursor pages are index range scans.
+LIST_ORDER = {
+    models.Book: (models.Book.added_at, True),
+    models.Disease: (models.Disease.created_at, True),
+    models.Drug: (models.Drug.created_at, True),
+    models.DictionaryWord: (models.DictionaryWord.name, False),
+    models.Notification: (models.Notification.timestamp, True),
+    models.Instrument: (models.Instrument.created_at, True),
+    models.Note: (models.Note.created_at, True),
+    models.UrineSlide: (models.UrineSlide.created_at, True),
+    models.StoolSlide: (models.StoolSlide.created_at, True),
+    models.OtherSlide: (models.OtherSlide.created_at, True),
+    models.NormalRange: (models.NormalRange.created_at, True),
+    models.User: (models.User.created_at, True),
+    models.HaematologyTest: (models.HaematologyTest.created_at, True),
+    models.SerologyTest: (models.SerologyTest.created_at, True),
+    models.BiochemistryTest: (models.BiochemistryTest.created_at, True),
+    models.BacteriologyTest: (models.BacteriologyTest.created_at, True),
+    models.OtherTest: (models.OtherTest.created_at, True),
+}
+
+def cursor_offset(cursor: Optional[dict], skip: int) -> int:
+    """Offset encoded in an offset-style cursor, else ``skip``"""
+    return cursor["o"] if cursor and "o" in cursor else skip
+
+def _list_columns(model):
+    """(columns, descending) of the model's LIST_ORDER, id last"""
+    column, descending = LIST_ORDER.get(model, (model.id, False))
+    return ([column, model.id] if column is not model.id else [model.id]), descending
+
+def check_cursor(model, position: dict) -> dict:
+    """
+    Validate the key of a keyset cursor against ``model``'s sort columns,
+    coercing ISO strings for datetime columns; raises ValueError
+    """
+    if "k" not in position:
+        return position
+    columns, _ = _list_columns(model)
+    if len(position["k"]) != len(columns):
+        raise ValueError("Cursor does not match this listing")
+    key = []
+    for column, value in zip(columns, position["k"]):
+        if value is None:
+            # A NULL sort value is valid, a NULL id is not
+            if column is model.id or not column.nullable:
+                raise ValueError("Invalid cursor key")
+            key.append(None)
+            continue
+        expected = column.type.python_type
+        if expected is datetime and isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        if not isinstance(value, expected) or isinstance(value, bool):
+            raise ValueError("Invalid cursor key")
+        key.append(value)
+    return {**position, "k": key}
+
+def list_page(query, model, skip: int = 0, limit: int = 100, cursor: Optional[dict] = None):
+    """
+    One page of ``query`` in the model's stable LIST_ORDER. Without a keyset
+    cursor the page is fetched by offset; with one, rows after the cursor
+    position are fetched by index range, so every page costs the same (a
+    filtered listing is counted on its first page and the total carried in
+    the cursor). Returns (items, total, next cursor position or None).
+    """
+    columns, descending = _list_columns(model)
+    # Unfiltered listings read the maintained counter instead of counting
+    statement = query.statement
+    froms = statement.get_final_froms()
+    known_total = None
+    if statement.whereclause is None and len(froms) == 1 and froms[0] is model.__table__ and counters.is_counted(model):
+        known_total = counters.get_count(query.session, model)
+    ordered = query.order_by(*[col.desc() if descending else col.asc() for col in columns])
+
+    if cursor and "k" in cursor and len(cursor["k"]) == len(columns):
+        rows = []
+        for segment in _keyset_segments(query.session, columns, descending, cursor["k"]):
+            rows += ordered.filter(segment).limit(limit + 1 - len(rows)).all()
+            if len(rows) > limit:
+                break
+        items, has_more = rows[:limit], len(rows) > limit
+        total = known_total if known_total is not None else cursor.get("t")
+        if total is None:
+            total = query.order_by(None).count()
+    else:
+        offset = cursor_offset(cursor, skip)
+        items = ordered.offset(offset).limit(limit).all()
+        total = known_total
+        if total is None:
+            # A short page ends the listing. Otherwise count separately: a
+            # COUNT(*) OVER() window would read and sort every matching row
+            # instead of stopping after the page's index range
+            if 0 < len(items) < limit or not (items or offset):
+                total = offset + len(items)
+            else:
+                total = query.order_by(None).count()
+        has_more = offset + len(items) < total
+
+    next_cursor = None
+    if has_more and items:
+        next_cursor = {"k": [getattr(items[-1], col.key) for col in columns]}
+        if known_total is None:
+            next_cursor["t"] = total
+    return items, total, next_cursor
+
+def _keyset_segments(session, columns, descending: bool, key: list):
+    """
+    Filters selecting the rows after ``key``, in list order, each an index
+    range. NULL sort values form their own run of rows ordered by id, sorted
+    last ascending on PostgreSQL and first ascending on SQLite, so rows past
+    a cursor on either side of that run are fetched in two steps.
+    """
+    if len(columns) == 1:
+        return [columns[0] < key[0] if descending else columns[0] > key[0]]
+    column, id_column = columns
+    after = (lambda left, right: left < right) if descending else (lambda left, right: left > right)
+    nulls_after = (session.get_bind().dialect.name == "postgresql") != descending
+    if key[0] is None:
+        segments = [column.is_(None) & after(id_column, key[1])]
+        if not nulls_after:
+            segments.append(column.isnot(None))
+        return segments
+    bound = tuple_(*[literal(value, type_=col.type) for col, value in zip(columns, key)])
+    segments = [after(tuple_(*columns), bound)]
+    if nulls_after and column.nullable:
+        segments.append(column.is_(None))
+    return segments
+
+def ranked_page(query, skip: int = 0, limit: int = 100, cursor: Optional[dict] = None):
+    """
+    Like list_page for relevance-ordered (search) queries, which have no
+    indexable sort key; the cursor carries the offset instead.
+    """
+    offset = cursor_offset(cursor, skip)
+    items, total = paginate(query, offset, limit)
+    return items, total, offset_cursor(offset, len(items), total)
+
+def offset_cursor(offset: int, returned: int, total: int) -> Optional[dict]:
+    """Offset-style next cursor, or None on the last page"""
+    return {"o": offset + returned} if returned and offset + returned < total else None
+
 def delete_item(db: Session, db_item):
+    model, item_id = type(db_item), db_item.id
     db.delete(db_item)
     db.commit()
+    _notify_write(model, item_id, None)
 
 # User CRUD
 def get_user_by_username(db: Session, username: str):
@@ -67,59 +306,108 @@ def update_user_points(db: Session, user_id: str, points: int):
         db.refresh(user)
     return user
 
+def reset_daily_points(db: Session) -> int:
+    """Zero every user's today_points; returns how many users had points"""
+    reset = db.query(models.User).filter(models.User.today_points != 0).update(
+        {models.User.today_points: 0}, synchronize_session=False
+    )
+    db.commit()
+    return reset
+
 # Search functions
+def search_query(db: Session, model, query: str):
+    """Relevance-ordered query over the full-text index of ``model``"""
+    return apply_search(db.query(model), model, query)
+
+def search_page(db: Session, model, query: str, skip: int = 0, limit: int = 100):
+    """
+    One page of relevance-ordered search results as serialized dicts, plus
+    the total match count. Served from the search cache when possible.
+    """
+    table = model.__tablename__
+    # Keyed on the raw query: the loader matches it as typed, so queries
+    # that only normalize alike can have different results
+    key = (table, query, skip, limit)
+    warmup.record_search(model, key[1], skip, limit)
+    load = partial(_load_search_page, model=model, query=query, skip=skip, limit=limit)
+    items, total = cache.search_cache.get_or_load(key, load, db, tag=table)
+    return [dict(item) for item in items], total
+
+def _load_search_page(session: Session, model, query: str, skip: int, limit: int):
+    rows, total = paginate(search_query(session, model, query), skip, limit)
+    return [serialize_item(row) for row in rows], total
+
+def get_cached_by(db: Session, model, field: str, value):
+    """
+    Read-through lookup of the first ``model`` row whose ``field`` equals
+    ``value``. Returns a fresh dict copy of a cached, read-only snapshot of
+    the row (no ORM state), or None when no row matches; misses are cached
+    briefly too. Entries are dropped by the crud write listeners.
+    """
+    table = model.__tablename__
+    key = (table, field, value)
+    warmup.record_detail(model, field, value)
+    load = partial(_load_snapshot, model=model, field=field, value=value)
+    snapshot = cache.detail_cache.get_or_load(
+        key, load, db, tag=table, negative_ttl=settings.DETAIL_CACHE_NEGATIVE_TTL
+    )
+    return None if snapshot is cache.NOT_FOUND else dict(snapshot)
+
+def _load_snapshot(session: Session, model, field: str, value):
+    row = session.query(model).filter(getattr(model, field) == value).first()
+    return cache.NOT_FOUND if row is None else MappingProxyType(serialize_item(row))
+
 def search_books(db: Session, query: str, skip: int = 0, limit: int = 100):
-    return db.query(models.Book).filter(
-        or_(
-            models.Book.title.ilike(f"%{query}%"),
-            models.Book.description.ilike(f"%{query}%"),
-            models.Book.category.ilike(f"%{query}%")
-        )
-    ).offset(skip).limit(limit).all()
+    return search_page(db, models.Book, query, skip, limit)[0]
 
 def search_diseases(db: Session, query: str, skip: int = 0, limit: int = 100):
-    return db.query(models.Disease).filter(
-        or_(
-            models.Disease.name.ilike(f"%{query}%"),
-            models.Disease.kurdish.ilike(f"%{query}%"),
-            models.Disease.symptoms.ilike(f"%{query}%"),
-            models.Disease.cause.ilike(f"%{query}%"),
-            models.Disease.control.ilike(f"%{query}%")
-        )
-    ).offset(skip).limit(limit).all()
+    return search_page(db, models.Disease, query, skip, limit)[0]
 
 def search_drugs(db: Session, query: str, skip: int = 0, limit: int = 100):
-    return db.query(models.Drug).filter(
-        or_(
-            models.Drug.name.ilike(f"%{query}%"),
-            models.Drug.usage.ilike(f"%{query}%"),
-            models.Drug.drug_class.ilike(f"%{query}%"),
-            models.Drug.trade_names.ilike(f"%{query}%"),
-            models.Drug.species_dosages.ilike(f"%{query}%"),
-            models.Drug.contraindications.ilike(f"%{query}%"),
-            models.Drug.drug_interactions.ilike(f"%{query}%"),
-            models.Drug.withdrawal_times.ilike(f"%{query}%")
-        )
-    ).offset(skip).limit(limit).all()
+    return search_page(db, models.Drug, query, skip, limit)[0]
 
 def search_dictionary(db: Session, query: str, skip: int = 0, limit: int = 100):
-    return db.query(models.DictionaryWord).filter(
-        or_(
-            models.DictionaryWord.name.ilike(f"%{query}%"),
-            models.DictionaryWord.kurdish.ilike(f"%{query}%"),
-            models.DictionaryWord.arabic.ilike(f"%{query}%"),
-            models.DictionaryWord.description.ilike(f"%{query}%")
-        )
-    ).offset(skip).limit(limit).all()
+    return search_page(db, models.DictionaryWord, query, skip, limit)[0]
 
 def search_instruments(db: Session, query: str, skip: int = 0, limit: int = 100):
-    return db.query(models.Instrument).filter(
-        or_(
-            models.Instrument.name.ilike(f"%{query}%"),
-            models.Instrument.category.ilike(f"%{query}%"),
-            models.Instrument.description.ilike(f"%{query}%")
-        )
-    ).offset(skip).limit(limit).all()
+    return search_page(db, models.Instrument, query, skip, limit)[0]
+
+def fuzzy_lookup(db: Session, model, name: str):
+    """Best trigram match for ``name``; returns (item, similarity score)"""
+    return find_best_match(db, model, name)
+
+# Async variants, for detail endpoints using database.get_async_db. Plain
+# lookups are native async queries; the cached ones share the caches of
+# their sync counterparts, so a hit never touches the database. List, search
+# and fuzzy endpoints are threadpool ``def`` handlers on the sync session:
+# wrapping their ORM work in AsyncSession.run_sync kept it on the event loop
+# and measured slower (benchmarks/bench_async.py).
+async def afirst(db: AsyncSession, model, *criteria):
+    """First ``model`` row matching ``criteria``, or None"""
+    result = await db.execute(select(model).where(*criteria).limit(1))
+    return result.scalars().first()
+
+async def aget_by(db: AsyncSession, model, field: str, value):
+    return await afirst(db, model, getattr(model, field) == value)
+
+async def asearch_page(db: AsyncSession, model, query: str, skip: int = 0, limit: int = 100):
+    table = model.__tablename__
+    # Same key as search_page
+    key = (table, query, skip, limit)
+    warmup.record_search(model, key[1], skip, limit)
+    load = partial(_load_search_page, model=model, query=query, skip=skip, limit=limit)
+    items, total = await cache.search_cache.aget_or_load(key, load, db, tag=table)
+    return [dict(item) for item in items], total
+
+async def aget_cached_by(db: AsyncSession, model, field: str, value):
+    table = model.__tablename__
+    key = (table, field, value)
+    warmup.record_detail(model, field, value)
+    load = partial(_load_snapshot, model=model, field=field, value=value)
+    snapshot = await cache.detail_cache.aget_or_load(
+        key, load, db, tag=table, negative_ttl=settings.DETAIL_CACHE_NEGATIVE_TTL
+    )
+    return None if snapshot is cache.NOT_FOUND else dict(snapshot)
 
 # Filter functions
 def filter_books_by_category(db: Session, category: str, skip: int = 0, limit: int = 100):
@@ -150,6 +438,7 @@ def create_ceo(db: Session, ceo: schemas.CEOCreate):
     db.add(db_ceo)
     db.commit()
     db.refresh(db_ceo)
+    _notify_write(models.CEO, db_ceo.id, _row_values(db_ceo))
     return db_ceo
 
 def update_ceo(db: Session, db_ceo: models.CEO, ceo_update: schemas.CEOUpdate):
@@ -159,11 +448,14 @@ def update_ceo(db: Session, db_ceo: models.CEO, ceo_update: schemas.CEOUpdate):
     db_ceo.updated_at = datetime.utcnow()
     db.commit()
     db.refresh(db_ceo)
+    _notify_write(models.CEO, db_ceo.id, _row_values(db_ceo))
     return db_ceo
 
 def delete_ceo(db: Session, db_ceo: models.CEO):
+    item_id = db_ceo.id
     db.delete(db_ceo)
     db.commit()
+    _notify_write(models.CEO, item_id, None)
 
 # Supporter CRUD operations
 def get_supporters(db: Session, skip: int = 0, limit: int = 100):
@@ -178,6 +470,7 @@ def create_supporter(db: Session, supporter: schemas.SupporterCreate):
     db.add(db_supporter)
     db.commit()
     db.refresh(db_supporter)
+    _notify_write(models.Supporter, db_supporter.id, _row_values(db_supporter))
     return db_supporter
 
 def update_supporter(db: Session, db_supporter: models.Supporter, supporter_update: schemas.SupporterUpdate):
@@ -187,63 +480,22 @@ def update_supporter(db: Session, db_supporter: models.Supporter, supporter_upda
     db_supporter.updated_at = datetime.utcnow()
     db.commit()
     db.refresh(db_supporter)
+    _notify_write(models.Supporter, db_supporter.id, _row_values(db_supporter))
     return db_supporter
 
 def delete_supporter(db: Session, db_supporter: models.Supporter):
+    item_id = db_supporter.id
     db.delete(db_supporter)
     db.commit()
+    _notify_write(models.Supporter, item_id, None)
 
 # Count functions
 def count_items(db: Session, model):
+    if counters.is_counted(model):
+        return counters.get_count(db, model)
     return db.query(model).count()
 
 def count_search_results(db: Session, model, query: str):
-    if model == models.Book:
-        return db.query(model).filter(
-            or_(
-                models.Book.title.ilike(f"%{query}%"),
-                models.Book.description.ilike(f"%{query}%"),
-                models.Book.category.ilike(f"%{query}%")
-            )
-        ).count()
-    elif model == models.Disease:
-        return db.query(model).filter(
-            or_(
-                models.Disease.name.ilike(f"%{query}%"),
-                models.Disease.kurdish.ilike(f"%{query}%"),
-                models.Disease.symptoms.ilike(f"%{query}%"),
-                models.Disease.cause.ilike(f"%{query}%"),
-                models.Disease.control.ilike(f"%{query}%")
-            )
-        ).count()
-    elif model == models.Drug:
-        return db.query(model).filter(
-            or_(
-                models.Drug.name.ilike(f"%{query}%"),
-                models.Drug.usage.ilike(f"%{query}%"),
-                models.Drug.drug_class.ilike(f"%{query}%"),
-                models.Drug.trade_names.ilike(f"%{query}%"),
-                models.Drug.species_dosages.ilike(f"%{query}%"),
-                models.Drug.contraindications.ilike(f"%{query}%"),
-                models.Drug.drug_interactions.ilike(f"%{query}%"),
-                models.Drug.withdrawal_times.ilike(f"%{query}%")
-            )
-        ).count()
-    elif model == models.DictionaryWord:
-        return db.query(model).filter(
-            or_(
-                models.DictionaryWord.name.ilike(f"%{query}%"),
-                models.DictionaryWord.kurdish.ilike(f"%{query}%"),
-                models.DictionaryWord.arabic.ilike(f"%{query}%"),
-                models.DictionaryWord.description.ilike(f"%{query}%")
-            )
-        ).count()
-    elif model == models.Instrument:
-        return db.query(model).filter(
-            or_(
-                models.Instrument.name.ilike(f"%{query}%"),
-                models.Instrument.category.ilike(f"%{query}%"),
-                models.Instrument.description.ilike(f"%{query}%")
-            )
-        ).count()
-    return 0
\ No newline at end of file
+    if not is_searchable(model):
+        return 0
+    return search_query(db, model, query).count()
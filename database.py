@@ -1,5 +1,7 @@
 import os
 from sqlalchemy import create_engine, event, exc, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 from sqlalchemy.pool import Pool
 from dotenv import load_dotenv
@@ -54,6 +56,37 @@ def receive_checkin(dbapi_conn, connection_record):
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def _async_engine_args(url: str):
+    """Async driver URL and connect args for DATABASE_URL (asyncpg / aiosqlite)"""
+    url = make_url(url)
+    connect_args = {}
+    if url.drivername.startswith("sqlite"):
+        url = url.set(drivername="sqlite+aiosqlite")
+    elif url.drivername.startswith(("postgresql", "postgres")):
+        # asyncpg takes ssl instead of libpq's sslmode
+        query = dict(url.query)
+        sslmode = query.pop("sslmode", None)
+        if sslmode and sslmode != "disable":
+            connect_args["ssl"] = sslmode
+        url = url.set(drivername="postgresql+asyncpg", query=query)
+    return url, connect_args
+
+# Async engine for the read endpoints: queries await the driver instead of
+# blocking the event loop. Same database and pool settings as ``engine``.
+try:
+    async_url, async_connect_args = _async_engine_args(DATABASE_URL)
+    async_engine_kwargs = {key: value for key, value in engine_kwargs.items() if key != "connect_args"}
+    if async_connect_args:
+        async_engine_kwargs["connect_args"] = async_connect_args
+    async_engine = create_async_engine(async_url, **async_engine_kwargs)
+except ImportError as e:
+    async_engine = None
+    db_logger.error(f"Async database driver not installed ({e}); async endpoints are unavailable")
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+) if async_engine is not None else None
+
 Base = declarative_base()
 
 def get_db():
@@ -71,6 +104,18 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    """AsyncSession dependency, the async counterpart of ``get_db``"""
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Async database driver (asyncpg/aiosqlite) is not installed")
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except exc.DBAPIError as e:
+            db_logger.error(f"Database error: {str(e)}")
+            await db.rollback()
+            raise
+
 def check_db_connection(max_retries: int = 3, retry_delay: int = 2) -> bool:
     """
     Check database connection health with retry logic
@@ -0,0 +1,159 @@
+"""
+Shared outbound HTTP clients.
+
+One ``httpx.AsyncClient`` (OneSignal pushes) and one ``httpx.Client``
+(Google certificate fetches, which google-auth makes synchronously) per
+worker, opened in the app lifespan and closed at shutdown, so calls reuse
+kept-alive connections instead of paying DNS, TCP and TLS setup each time.
+HTTP/2 is negotiated when the optional ``h2`` package is installed.
+
+Both clients time every request per host into a latency histogram and
+count responses by status class and failures by exception type
+(``outbound_stats``, shown on /metrics).
+"""
+import importlib.util
+import threading
+import time
+from typing import Optional
+
+import httpx
+
+from config import settings
+from logger import app_logger
+
+HTTP2 = importlib.util.find_spec("h2") is not None
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_lock = threading.Lock()
+_stats = {}   # host -> per-host counters and histogram
+_clients = {"async": None, "sync": None}
+
+
+def _record(host: str, elapsed: float, status: Optional[int] = None, error: Optional[str] = None):
+    ms = elapsed * 1000
+    with _lock:
+        entry = _stats.setdefault(host, {
+            "requests": 0, "total_ms": 0.0, "max_ms": 0.0,
+            "histogram": [0] * (len(LATENCY_BUCKETS_MS) + 1), "statuses": {}, "errors": {},
+        })
+        entry["requests"] += 1
+        entry["total_ms"] += ms
+        entry["max_ms"] = max(entry["max_ms"], ms)
+        bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS_MS) if ms <= bound), len(LATENCY_BUCKETS_MS))
+        entry["histogram"][bucket] += 1
+        if error is not None:
+            entry["errors"][error] = entry["errors"].get(error, 0) + 1
+        else:
+            status_class = f"{status // 100}xx"
+            entry["statuses"][status_class] = entry["statuses"].get(status_class, 0) + 1
+
+
+class _InstrumentedAsyncTransport(httpx.AsyncBaseTransport):
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except Exception as e:
+            _record(request.url.host, time.perf_counter() - start, error=type(e).__name__)
+            raise
+        _record(request.url.host, time.perf_counter() - start, status=response.status_code)
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+class _InstrumentedTransport(httpx.BaseTransport):
+    def __init__(self, transport: httpx.BaseTransport):
+        self._transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        try:
+            response = self._transport.handle_request(request)
+        except Exception as e:
+            _record(request.url.host, time.perf_counter() - start, error=type(e).__name__)
+            raise
+        _record(request.url.host, time.perf_counter() - start, status=response.status_code)
+        return response
+
+    def close(self):
+        self._transport.close()
+
+
+def _client_options() -> dict:
+    limits = httpx.Limits(
+        max_connections=settings.HTTP_CLIENT_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_CLIENT_MAX_KEEPALIVE,
+        keepalive_expiry=settings.HTTP_CLIENT_KEEPALIVE_EXPIRY,
+    )
+    return {"http2": HTTP2, "limits": limits}
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """The worker's shared AsyncClient (created on first use outside the lifespan)"""
+    client = _clients["async"]
+    if client is None or client.is_closed:
+        client = _clients["async"] = httpx.AsyncClient(
+            transport=_InstrumentedAsyncTransport(httpx.AsyncHTTPTransport(**_client_options())),
+            timeout=settings.HTTP_CLIENT_TIMEOUT,
+        )
+    return client
+
+
+def get_sync_client() -> httpx.Client:
+    """The worker's shared sync Client, for libraries that call out synchronously"""
+    with _lock:
+        client = _clients["sync"]
+        if client is None or client.is_closed:
+            client = _clients["sync"] = httpx.Client(
+                transport=_InstrumentedTransport(httpx.HTTPTransport(**_client_options())),
+                timeout=settings.HTTP_CLIENT_TIMEOUT,
+            )
+        return client
+
+
+def open_clients():
+    """Create both clients (app startup)"""
+    get_async_client()
+    get_sync_client()
+    app_logger.info(f"Outbound HTTP clients ready (HTTP/2 {'enabled' if HTTP2 else 'unavailable: h2 not installed'})")
+
+
+async def close_clients():
+    """Close both clients and their connections (app shutdown)"""
+    async_client, _clients["async"] = _clients["async"], None
+    with _lock:
+        sync_client, _clients["sync"] = _clients["sync"], None
+    try:
+        if sync_client is not None:
+            sync_client.close()
+        if async_client is not None:
+            await async_client.aclose()
+    except Exception as e:
+        app_logger.warning(f"Closing outbound HTTP clients failed: {e}")
+
+
+def outbound_stats() -> dict:
+    """Per-host request counts, latency histogram, status classes and errors"""
+    labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+    with _lock:
+        return {
+            "http2": HTTP2,
+            "hosts": {
+                host: {
+                    "requests": entry["requests"],
+                    "avg_ms": round(entry["total_ms"] / entry["requests"], 2),
+                    "max_ms": round(entry["max_ms"], 2),
+                    "histogram": dict(zip(labels, entry["histogram"])),
+                    "statuses": dict(entry["statuses"]),
+                    "errors": dict(entry["errors"]),
+                }
+                for host, entry in _stats.items()
+            },
+        }
@@ -0,0 +1,187 @@
+"""
+Event-loop lag monitor and blocking-call detector.
+
+``run_loop_monitor`` wakes every LOOP_MONITOR_INTERVAL seconds and records
+how late it woke up: that lag is time the loop spent running something else
+without yielding. A watchdog thread watches its heartbeat; once the loop has
+been stuck for LOOP_BLOCK_THRESHOLD seconds it captures the loop thread's
+stack, and the route being handled is read from the ASGI ``scope`` of the
+stack's request frames. When the loop resumes, the whole stall is charged to
+that route and to the innermost project frame (the blocking call site).
+``snapshot`` is served on /api/admin/event-loop.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Optional
+
+from config import settings
+from logger import app_logger
+
+# Lag samples kept for the percentiles
+MAX_SAMPLES = 1200
+# Distinct routes / call sites kept; new ones beyond this are counted under "other"
+MAX_KEYS = 200
+STACK_DEPTH = 12
+
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+_lock = threading.Lock()
+_samples = deque(maxlen=MAX_SAMPLES)   # lag per tick, seconds
+_routes = {}      # route -> {"count", "total", "max", "last_at", "last_stack"}
+_sites = {}       # "file:line in function" -> {"count", "total", "max", "routes"}
+_state = {"ticks": 0, "max_lag": 0.0, "blocked": 0, "blocked_seconds": 0.0, "started_at": None}
+_beat = {"at": None, "thread_id": None, "stall": None}
+_watchdog_started = threading.Event()
+
+
+def _is_project_frame(filename: str) -> bool:
+    return filename.startswith(_ROOT) and "site-packages" not in filename and filename != __file__
+
+
+def _route_of(frames) -> Optional[str]:
+    """Route template (or path) from the innermost request frame's ASGI scope"""
+    for frame in reversed(frames):
+        scope = frame.f_locals.get("scope")
+        if isinstance(scope, dict) and scope.get("type") == "http":
+            route = scope.get("route")
+            path = getattr(route, "path", None) or scope.get("path", "?")
+            return f"{scope.get('method', '')} {path}".strip()
+    return None
+
+
+def _capture(thread_id: int) -> Optional[dict]:
+    """Stack, blocking call site and route of the loop thread, right now"""
+    frame = sys._current_frames().get(thread_id)
+    if frame is None:
+        return None
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()   # outermost first
+    site = None
+    for f in reversed(frames):
+        if _is_project_frame(f.f_code.co_filename):
+            site = f"{os.path.relpath(f.f_code.co_filename, _ROOT)}:{f.f_lineno} in {f.f_code.co_name}"
+            break
+    stack = traceback.format_list(traceback.extract_stack(frames[-1], limit=STACK_DEPTH))
+    return {"route": _route_of(frames) or "(background task)", "site": site or "(outside the project)",
+            "stack": "".join(stack)}
+
+
+def _bump(table: dict, key: str, duration: float) -> dict:
+    if key not in table and len(table) >= MAX_KEYS:
+        key = "other"
+    entry = table.setdefault(key, {"count": 0, "total": 0.0, "max": 0.0})
+    entry["count"] += 1
+    entry["total"] += duration
+    entry["max"] = max(entry["max"], duration)
+    return entry
+
+
+def _record_stall(stall: dict, duration: float):
+    with _lock:
+        _state["blocked"] += 1
+        _state["blocked_seconds"] += duration
+        route = _bump(_routes, stall["route"], duration)
+        route["last_at"] = time.time()
+        route["last_stack"] = stall["stack"]
+        site = _bump(_sites, stall["site"], duration)
+        site.setdefault("routes", set()).add(stall["route"])
+    app_logger.warning(
+        f"Event loop blocked for {duration * 1000:.0f} ms by {stall['route']} at {stall['site']}"
+    )
+
+
+def _watchdog(interval: float, threshold: float):
+    """Thread: capture the loop's stack once per stall longer than ``threshold``"""
+    while True:
+        time.sleep(min(interval, threshold) / 2)
+        beat, thread_id = _beat["at"], _beat["thread_id"]
+        if beat is None or _beat["stall"] is not None:
+            continue
+        if time.monotonic() - beat - interval >= threshold:
+            try:
+                stall = _capture(thread_id)
+            except Exception as e:
+                app_logger.debug(f"Capturing the event loop stack failed: {e}")
+                continue
+            # Only if the loop is still on the same beat
+            if stall is not None and _beat["at"] == beat:
+                _beat["stall"] = stall
+
+
+async def run_loop_monitor(interval: float, threshold: float):
+    """Lifespan task: measure loop lag every ``interval`` seconds"""
+    _beat["thread_id"] = threading.get_ident()
+    _state["started_at"] = time.time()
+    _beat["at"] = time.monotonic()
+    if not _watchdog_started.is_set():
+        _watchdog_started.set()
+        threading.Thread(target=_watchdog, args=(interval, threshold), name="loop-watchdog", daemon=True).start()
+    while True:
+        await asyncio.sleep(interval)
+        now = time.monotonic()
+        lag = max(0.0, now - _beat["at"] - interval)
+        stall, _beat["stall"] = _beat["stall"], None
+        _beat["at"] = now
+        with _lock:
+            _samples.append(lag)
+            _state["ticks"] += 1
+            _state["max_lag"] = max(_state["max_lag"], lag)
+        if stall is not None:
+            _record_stall(stall, lag)
+
+
+def _percentile(ordered: list, q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def snapshot(top: int = 20) -> dict:
+    """Lag percentiles plus the routes and call sites that blocked the loop longest"""
+    with _lock:
+        ordered = sorted(_samples)
+        routes = sorted(_routes.items(), key=lambda item: item[1]["total"], reverse=True)[:top]
+        sites = sorted(_sites.items(), key=lambda item: item[1]["total"], reverse=True)[:top]
+        ms = lambda seconds: round(seconds * 1000, 2)
+        return {
+            "enabled": _state["started_at"] is not None,
+            "interval_ms": ms(settings.LOOP_MONITOR_INTERVAL),
+            "threshold_ms": ms(settings.LOOP_BLOCK_THRESHOLD),
+            "lag_ms": {
+                "p50": ms(_percentile(ordered, 0.5)),
+                "p95": ms(_percentile(ordered, 0.95)),
+                "p99": ms(_percentile(ordered, 0.99)),
+                "max": ms(_state["max_lag"]),
+                "samples": len(ordered),
+            },
+            "blocked": _state["blocked"],
+            "blocked_ms": ms(_state["blocked_seconds"]),
+            "routes": [
+                {
+                    "route": route, "count": entry["count"], "total_ms": ms(entry["total"]),
+                    "max_ms": ms(entry["max"]), "last_at": entry.get("last_at"),
+                    "last_stack": entry.get("last_stack"),
+                }
+                for route, entry in routes
+            ],
+            "call_sites": [
+                {
+                    "site": site, "count": entry["count"], "total_ms": ms(entry["total"]),
+                    "max_ms": ms(entry["max"]), "routes": sorted(entry.get("routes", ())),
+                }
+                for site, entry in sites
+            ],
+        }
+
+
+def reset():
+    with _lock:
+        _samples.clear()
+        _routes.clear()
+        _sites.clear()
+        _state.update(ticks=0, max_lag=0.0, blocked=0, blocked_seconds=0.0)
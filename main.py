@@ -2,30 +2,48 @@ from fastapi import FastAPI, Depends, HTTPException, status, File, UploadFile, Q
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import text, inspect
 from typing import List, Optional
 from datetime import datetime
 import uvicorn
 import os
+import asyncio
 from contextlib import asynccontextmanager
 
-from database import engine, get_db, check_db_connection, get_db_info
+from database import engine, async_engine, get_db, check_db_connection, get_db_info, SessionLocal
 from models import Base
+from search import setup_search_indexes, setup_trigram_indexes
+from autocomplete import build_dictionary_index
+from normalization import backfill_normalized_columns
+from cache import cache_stats
+from materialized import view_stats, warm_views
+from warmup import flush_stats, run_stats_flusher, warm_caches, status as warmup_status
+from counters import reconcile_counters, run_reconciler
+from cache_bus import run_cache_bus
+from bundle import run_bundle_builder
+from loop_monitor import run_loop_monitor
+from outbox import run_outbox_worker
+from scheduler import run_scheduler
+from http_client import open_clients, close_clients, outbound_stats
+from changes import setup_change_tracking
+import crud
 from api import (
     auth as auth_api, users, books, diseases, drugs, dictionary, 
     notifications, normal_ranges, 
     app_links, about, instruments, notes, urine_slides, stool_slides, other_slides, leaderboard,
     haematology_tests, serology_tests, biochemistry_tests, bacteriology_tests, other_tests,
-    privacy_policy
+    privacy_policy, search as search_api, sync, admin
 )
-from auth import verify_token, get_current_admin_user
+from auth import verify_token, get_current_admin_user, migrate_refresh_tokens
 from config import settings
 from logger import app_logger
 from middleware import (
     LoggingMiddleware, 
     RateLimitMiddleware, 
     SecurityHeadersMiddleware,
-    ErrorHandlingMiddleware
+    ErrorHandlingMiddleware,
+    ConditionalGetMiddleware,
+    CompressionMiddleware
 )
 
 security = HTTPBearer()
@@ -45,6 +63,32 @@ def _run_column_migrations():
                 app_logger.warning(f"⚠️  Migration skipped ({stmt}): {e}")
         conn.commit()
 
+def _sync_schema():
+    """
+    Add columns and indexes declared on the models but missing from tables
+    created by an older release. Only adds, never drops or alters.
+    """
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            stmt = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=engine.dialect)}"
+            try:
+                with engine.begin() as conn:
+                    conn.execute(text(stmt))
+                app_logger.info(f"✅ Migration applied: {stmt}")
+            except Exception as e:
+                app_logger.warning(f"⚠️  Migration skipped ({stmt}): {e}")
+        for index in table.indexes:
+            try:
+                index.create(bind=engine, checkfirst=True)
+            except Exception as e:
+                app_logger.warning(f"⚠️  Index {index.name} skipped: {e}")
+
 def get_admin_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db),
@@ -66,14 +110,78 @@ async def lifespan(app: FastAPI):
         app_logger.info("✅ Database tables created/verified")
         # Column migrations (safe: only adds if not exists)
         _run_column_migrations()
+        _sync_schema()
+        # Refresh tokens are stored as SHA-256 digests since this release
+        try:
+            migrate_refresh_tokens(engine)
+        except Exception as e:
+            app_logger.warning(f"⚠️  Refresh token migration skipped: {e}")
+        backfill_normalized_columns(engine)
+        setup_change_tracking(engine)
+        # Full-text search indexes (tsvector on PostgreSQL, FTS5 on SQLite)
+        setup_search_indexes(engine)
+        setup_trigram_indexes(engine)
+        app_logger.info("✅ Search indexes created/verified")
+        # Seed/correct the maintained row counters
+        reconcile_counters(engine)
+        # In-memory autocomplete index for the dictionary
+        db = SessionLocal()
+        try:
+            build_dictionary_index(db)
+        finally:
+            db.close()
+        # Serialized responses of the low-churn endpoints (materialized.py)
+        warm_views()
+        # Replay the most requested searches/lookups so the first requests hit warm caches
+        if settings.WARMUP_TOP_N > 0:
+            warm_caches(engine, settings.WARMUP_BUDGET_SECONDS, settings.WARMUP_TOP_N)
     else:
         app_logger.error("❌ Failed to connect to database")
     
+    # Keep-alive clients for OneSignal and Google certificate fetches
+    open_clients()
+    
+    reconciler = asyncio.create_task(run_reconciler(engine, settings.COUNTER_RECONCILE_INTERVAL))
+    # Keeps this worker's caches coherent with writes made by other workers
+    cache_bus_task = asyncio.create_task(run_cache_bus(engine))
+    # Offline content bundle, rebuilt in the background after content writes
+    bundle_task = asyncio.create_task(run_bundle_builder(engine, settings.BUNDLE_DEBOUNCE_SECONDS))
+    # Persists lookup counts for the next startup's cache warmup
+    stats_task = asyncio.create_task(run_stats_flusher(engine, settings.WARMUP_STATS_FLUSH_INTERVAL))
+    # Delivers queued push notifications (outbox.py)
+    outbox_task = asyncio.create_task(run_outbox_worker(engine, settings.OUTBOX_POLL_INTERVAL))
+    # Event-loop lag and blocking-call detection (/api/admin/event-loop)
+    loop_monitor_task = None
+    if settings.LOOP_MONITOR_INTERVAL > 0:
+        loop_monitor_task = asyncio.create_task(
+            run_loop_monitor(settings.LOOP_MONITOR_INTERVAL, settings.LOOP_BLOCK_THRESHOLD)
+        )
+    # Cron jobs such as the daily points reset, one worker per run (/api/admin/jobs)
+    scheduler_task = None
+    if settings.SCHEDULER_ENABLED:
+        scheduler_task = asyncio.create_task(run_scheduler(engine))
+    
     yield
     
     # Shutdown
     app_logger.info("🛑 Shutting down Veterinary Educational Platform API...")
+    reconciler.cancel()
+    cache_bus_task.cancel()
+    bundle_task.cancel()
+    stats_task.cancel()
+    outbox_task.cancel()
+    if loop_monitor_task is not None:
+        loop_monitor_task.cancel()
+    if scheduler_task is not None:
+        scheduler_task.cancel()
+    await close_clients()
+    try:
+        flush_stats(engine)
+    except Exception as e:
+        app_logger.warning(f"Flushing query stats failed: {e}")
     engine.dispose()
+    if async_engine is not None:
+        await async_engine.dispose()
     app_logger.info("✅ Database connections closed")
 
 app = FastAPI(
@@ -86,6 +194,8 @@ app = FastAPI(
 )
 
 # Add custom middleware (order matters!)
+app.add_middleware(ConditionalGetMiddleware)
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_SIZE)
 app.add_middleware(ErrorHandlingMiddleware)
 app.add_middleware(SecurityHeadersMiddleware)
 app.add_middleware(LoggingMiddleware)
@@ -125,6 +235,9 @@ app.include_router(biochemistry_tests.router, prefix="/api/biochemistry-tests",
 app.include_router(bacteriology_tests.router, prefix="/api/bacteriology-tests", tags=["bacteriology-tests"])
 app.include_router(other_tests.router, prefix="/api/other-tests", tags=["other-tests"])
 app.include_router(privacy_policy.router, prefix="/api/privacy-policy", tags=["Privacy Policy"])
+app.include_router(search_api.router, prefix="/api/search", tags=["Search"])
+app.include_router(sync.router, prefix="/api/sync", tags=["Sync"])
+app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
 
 @app.get("/")
 async def root():
@@ -138,7 +251,7 @@ async def root():
     }
 
 @app.get("/health")
-async def health_check(db: Session = Depends(get_db)):
+def health_check(db: Session = Depends(get_db)):
     """Public health check endpoint"""
     health_status = {
         "status": "healthy",
@@ -158,7 +271,7 @@ async def health_check(db: Session = Depends(get_db)):
     return health_status
 
 @app.get("/metrics")
-async def metrics(
+def metrics(
     db: Session = Depends(get_db),
     current_admin = Depends(get_admin_user),
 ):
@@ -167,12 +280,16 @@ async def metrics(
         from models import User, DictionaryWord, Disease, Drug, Book
         
         result = {
-            "users": db.query(User).count(),
-            "dictionary_words": db.query(DictionaryWord).count(),
-            "diseases": db.query(Disease).count(),
-            "drugs": db.query(Drug).count(),
-            "books": db.query(Book).count(),
-            "database_info": get_db_info()
+            "users": crud.count_items(db, User),
+            "dictionary_words": crud.count_items(db, DictionaryWord),
+            "diseases": crud.count_items(db, Disease),
+            "drugs": crud.count_items(db, Drug),
+            "books": crud.count_items(db, Book),
+            "database_info": get_db_info(),
+            "caches": cache_stats(),
+            "materialized_views": view_stats(),
+            "warmup": warmup_status,
+            "outbound_http": outbound_stats(),
         }
         return result
     except Exception as e:
@@ -0,0 +1,157 @@
+"""
+In-memory materialized responses for singleton and low-churn endpoints.
+
+A ``MaterializedView`` keeps the serialized JSON body of an endpoint's
+response. Writes to the tables it reads (crud write/reset listeners, which
+the cache bus also fires for other workers' writes) mark it stale, and the
+next read rebuilds it; every other read is served from memory without a DB
+session. Each body carries an ETag derived from its bytes, so unchanged
+content is answered with 304 without touching the database either, and its
+gzip/brotli encodings are kept next to it once a client asked for them.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional, Tuple
+
+from fastapi import HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter
+
+from compression import compress, negotiate, weak_etag
+from config import settings
+from logger import app_logger
+
+# Parameter combinations (e.g. skip/limit) kept per view
+MAX_VARIANTS = 16
+
+_views = []
+
+
+class MaterializedView:
+    """Serialized response of ``build(db, *params)``, rebuilt after writes"""
+
+    def __init__(self, name: str, models, build: Callable, response_model=None,
+                 not_found: str = "Not found", default_params: Tuple[Hashable, ...] = ()):
+        self.name = name
+        self.tables = {model.__tablename__ for model in models}
+        self.not_found = not_found
+        self.default_params = default_params
+        self._build = build
+        self._adapter = TypeAdapter(response_model) if response_model is not None else None
+        self._variants = OrderedDict()   # params -> (body or None, etag, {encoding: bytes})
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.rebuilds = 0
+        self.invalidations = 0
+        _views.append(self)
+
+    def _encode(self, value) -> bytes:
+        if self._adapter is not None:
+            value = self._adapter.dump_python(
+                self._adapter.validate_python(value, from_attributes=True), mode="json"
+            )
+        # Same rendering as JSONResponse
+        return json.dumps(
+            value, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+        ).encode("utf-8")
+
+    def peek(self, params: Tuple[Hashable, ...] = ()) -> Optional[tuple]:
+        """The materialized (body, etag, encodings) for ``params``, or None if stale"""
+        with self._lock:
+            entry = self._variants.get(params)
+            if entry is not None:
+                self._variants.move_to_end(params)
+                self.hits += 1
+            return entry
+
+    def render(self, params: Tuple[Hashable, ...] = ()) -> tuple:
+        """Rebuild the body for ``params`` from the database (blocking)"""
+        from database import SessionLocal
+
+        with self._lock:
+            generation = self._generation
+        db = SessionLocal()
+        try:
+            value = self._build(db, *params)
+        finally:
+            db.close()
+        body = None if value is None else self._encode(value)
+        etag = f'"{hashlib.sha1(body).hexdigest()[:24]}"' if body is not None else None
+        entry = (body, etag, {})
+        with self._lock:
+            # A write during the rebuild makes this result stale already
+            if generation == self._generation:
+                self._variants[params] = entry
+                while len(self._variants) > MAX_VARIANTS:
+                    self._variants.popitem(last=False)
+                self.rebuilds += 1
+        return entry
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._variants.clear()
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "variants": len(self._variants),
+                "bytes": sum(
+                    len(body) + sum(len(encoded) for encoded in encodings.values())
+                    for body, _, encodings in self._variants.values() if body is not None
+                ),
+                "hits": self.hits,
+                "rebuilds": self.rebuilds,
+                "invalidations": self.invalidations,
+            }
+
+
+async def serve(view: MaterializedView, request: Request, params: Tuple[Hashable, ...] = ()) -> Response:
+    """Response for ``view``: from memory, 304 on a matching ETag, 404 if empty"""
+    entry = view.peek(params)
+    if entry is None:
+        entry = await run_in_threadpool(view.render, params)
+    body, etag, encodings = entry
+    if body is None:
+        raise HTTPException(status_code=404, detail=view.not_found)
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in [tag.strip().replace("W/", "", 1) for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    encoding = negotiate(request.headers.get("accept-encoding"))
+    if encoding is not None and len(body) >= settings.COMPRESSION_MIN_SIZE:
+        encoded = encodings.get(encoding)
+        if encoded is None:
+            encoded = encodings[encoding] = compress(body, encoding)
+        headers["ETag"] = weak_etag(etag)
+        headers["Content-Encoding"] = encoding
+        body = encoded
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def view_stats() -> dict:
+    return {view.name: view.stats() for view in _views}
+
+
+def warm_views():
+    """Build every view for its default parameters (called at startup)"""
+    for view in _views:
+        try:
+            view.render(view.default_params)
+        except Exception as e:
+            app_logger.warning(f"Materializing {view.name} failed: {e}")
+
+
+def on_item_written(model, item_id: str, values: Optional[dict]):
+    reset_table(model)
+
+
+def reset_table(model):
+    for view in _views:
+        if model.__tablename__ in view.tables:
+            view.invalidate()
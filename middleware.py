@@ -6,8 +6,12 @@ from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 from time import time
 from collections import defaultdict
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
 import asyncio
+import hashlib
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
 from logger import log_request, log_error, log_security_event
 
 class LoggingMiddleware(BaseHTTPMiddleware):
@@ -215,3 +219,171 @@ class ErrorHandlingMiddleware(BaseHTTPMiddleware):
                     "type": "internal_server_error",
                 }
             )
+
+
+class ConditionalGetMiddleware(BaseHTTPMiddleware):
+    """
+    ETag / Last-Modified support for content reads.
+
+    Responses under the prefixes below depend only on the listed tables, so
+    their validators are derived from the table versions this worker has
+    applied to its caches (``cache_bus.applied_versions``) plus the request
+    URL. A matching If-None-Match or If-Modified-Since is answered with 304
+    before the endpoint runs, i.e. without loading or serializing any rows
+    and without a database round trip.
+    """
+
+    TEST_TABLES = ("haematology_tests", "serology_tests", "biochemistry_tests", "bacteriology_tests", "other_tests")
+    TABLES_BY_PREFIX = {
+        "/api/books": ("books",),
+        "/api/diseases": ("diseases",),
+        "/api/drugs": ("drugs",),
+        "/api/dictionary": ("dictionary_words",),
+        "/api/notifications": ("notifications",),
+        "/api/normal-ranges": ("normal_ranges",),
+        "/api/app-links": ("app_links",),
+        "/api/instruments": ("instruments",),
+        "/api/notes": ("notes",),
+        "/api/urine-slides": ("urine_slides",),
+        "/api/stool-slides": ("stool_slides",),
+        "/api/other-slides": ("other_slides",),
+        "/api/haematology-tests": ("haematology_tests",),
+        "/api/serology-tests": ("serology_tests",),
+        "/api/biochemistry-tests": ("biochemistry_tests",),
+        "/api/bacteriology-tests": ("bacteriology_tests",),
+        "/api/other-tests": ("other_tests",),
+        "/api/search": ("books", "drugs", "diseases", "dictionary_words", "instruments") + TEST_TABLES,
+        "/api/sync/changes": (
+            "dictionary_words", "drugs", "diseases", "normal_ranges", "instruments", "notes", "books",
+            "urine_slides", "stool_slides", "other_slides", "app_links",
+        ) + TEST_TABLES,
+    }
+    # Reads under a mapped prefix that depend on something else, or that
+    # set their own ETag (materialized views, see materialized.py)
+    EXCLUDED_PATHS = {
+        "/api/notifications/system/health",
+        "/api/app-links/",
+        "/api/books/categories/list",
+        "/api/drugs/classes/list",
+        "/api/normal-ranges/species/list",
+        "/api/normal-ranges/categories/list",
+    }
+
+    def _tables_for(self, path: str):
+        if path in self.EXCLUDED_PATHS:
+            return None
+        for prefix, tables in self.TABLES_BY_PREFIX.items():
+            if path == prefix or path.startswith(prefix + "/"):
+                return tables
+        return None
+
+    @staticmethod
+    def _etag_matches(header: str, etag: str) -> bool:
+        candidates = [tag.strip() for tag in header.split(",")]
+        # Weak comparison, as RFC 9110 requires for If-None-Match
+        return "*" in candidates or any((tag[2:] if tag.startswith("W/") else tag) == etag for tag in candidates)
+
+    async def dispatch(self, request: Request, call_next):
+        tables = self._tables_for(request.url.path) if request.method == "GET" else None
+        if not tables:
+            return await call_next(request)
+
+        from cache_bus import applied_versions
+        stamps = applied_versions(tables)
+        if stamps is None:
+            # Versions not loaded yet (startup)
+            return await call_next(request)
+
+        versions = ",".join(f"{table}:{version}" for table, (version, _) in zip(tables, stamps))
+        digest = hashlib.sha1(f"{versions}|{request.url.path}?{request.url.query}".encode()).hexdigest()
+        etag = f'"{digest[:24]}"'
+        updated = [updated_at for _, updated_at in stamps if updated_at is not None]
+        last_write = max(updated).replace(tzinfo=timezone.utc) if updated else None
+
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        # HTTP dates have 1-second resolution: advertise the end of the last
+        # write's second, and only once it has passed, so no later write can
+        # share the stamp
+        if last_write is not None:
+            last_modified = last_write.replace(microsecond=0) + timedelta(seconds=1)
+            if last_modified <= datetime.now(timezone.utc):
+                headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            not_modified = self._etag_matches(if_none_match, etag)
+        else:
+            not_modified = False
+            if_modified_since = request.headers.get("if-modified-since")
+            if if_modified_since and last_write is not None:
+                try:
+                    # Compared with the exact write time: a write within the
+                    # client's second is never answered with 304
+                    not_modified = last_write < parsedate_to_datetime(if_modified_since)
+                except (TypeError, ValueError):
+                    pass
+        if not_modified:
+            return Response(status_code=304, headers=headers)
+
+        response = await call_next(request)
+        if response.status_code == 200:
+            for name, value in headers.items():
+                response.headers.setdefault(name, value)
+        return response
+
+
+class CompressionMiddleware(BaseHTTPMiddleware):
+    """
+    gzip/brotli compression of text and JSON responses of at least
+    ``minimum_size`` bytes, negotiated from Accept-Encoding. Compressed
+    bodies are cached by content (compression.compress_cached), so responses
+    served repeatedly from the caches are only compressed once. Responses
+    that are already encoded (e.g. materialized views) pass through.
+    """
+
+    SKIP_STATUS = {204, 206, 304}
+
+    def __init__(self, app, minimum_size: int = 1024):
+        super().__init__(app)
+        self.minimum_size = minimum_size
+
+    async def dispatch(self, request: Request, call_next):
+        from compression import compress_cached, is_compressible, negotiate, weak_etag
+
+        response = await call_next(request)
+        headers = response.headers
+        if (response.status_code in self.SKIP_STATUS or "content-encoding" in headers
+                or "content-range" in headers or not is_compressible(headers.get("content-type"))):
+            return response
+        vary = headers.get("vary")
+        if not vary:
+            headers["Vary"] = "Accept-Encoding"
+        elif "accept-encoding" not in vary.lower():
+            headers["Vary"] = f"{vary}, Accept-Encoding"
+
+        encoding = negotiate(request.headers.get("accept-encoding"))
+        if encoding is None or request.method == "HEAD":
+            return response
+        length = headers.get("content-length")
+        if length is not None and int(length) < self.minimum_size:
+            return response
+
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        if len(body) < self.minimum_size:
+            compressed, encoding = body, None
+        elif len(body) > 64 * 1024:
+            compressed = await run_in_threadpool(compress_cached, body, encoding)
+        else:
+            compressed = compress_cached(body, encoding)
+
+        new_response = Response(content=compressed, status_code=response.status_code, background=response.background)
+        # Keep every original header (incl. repeated Set-Cookie) except the length
+        new_response.raw_headers = [
+            (name, value) for name, value in response.raw_headers if name.lower() != b"content-length"
+        ]
+        new_response.headers["Content-Length"] = str(len(compressed))
+        if encoding is not None:
+            new_response.headers["Content-Encoding"] = encoding
+            if "etag" in headers:
+                new_response.headers["ETag"] = weak_etag(headers["etag"])
+        return new_response
@@ -1,8 +1,16 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Float, JSON
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Float, JSON, Index, UniqueConstraint, Sequence
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
 
+class ChangeTracked:
+    """
+    Content synced to the mobile app: every ORM write stamps ``updated_at``
+    and the next value of the global change sequence (see changes.py)
+    """
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    change_seq = Column(Integer, index=True, info={"internal": True})
+
 class User(Base):
     __tablename__ = "users"
 
@@ -19,7 +27,10 @@ class User(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     last_updated = Column(DateTime, default=datetime.utcnow)
 
-class Book(Base):
+    # Keyset pagination order (crud.LIST_ORDER)
+    __table_args__ = (Index("ix_users_created_at_id", "created_at", "id"),)
+
+class Book(ChangeTracked, Base):
     __tablename__ = "books"
 
     id = Column(String, primary_key=True, index=True)
@@ -30,7 +41,10 @@ class Book(Base):
     download_url = Column(String(1000))
     added_at = Column(DateTime, default=datetime.utcnow)
 
-class Disease(Base):
+    # Keyset pagination order (crud.LIST_ORDER)
+    __table_args__ = (Index("ix_books_added_at_id", "added_at", "id"),)
+
+class Disease(ChangeTracked, Base):
     __tablename__ = "diseases"
 
     id = Column(String, primary_key=True, index=True)
@@ -40,8 +54,18 @@ class Disease(Base):
     cause = Column(Text)
     control = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
-
-class Drug(Base):
+    # Normalized shadow columns (see normalization.py), not part of the API
+    name_norm = Column(String(500), info={"internal": True})
+    kurdish_norm = Column(String(500), info={"internal": True})
+
+    __table_args__ = (
+        Index("ix_diseases_name_norm", "name_norm", postgresql_ops={"name_norm": "text_pattern_ops"}),
+        Index("ix_diseases_kurdish_norm", "kurdish_norm", postgresql_ops={"kurdish_norm": "text_pattern_ops"}),
+        # Keyset pagination order (crud.LIST_ORDER)
+        Index("ix_diseases_created_at_id", "created_at", "id"),
+    )
+
+class Drug(ChangeTracked, Base):
     __tablename__ = "drugs"
 
     id = Column(String, primary_key=True, index=True)
@@ -57,7 +81,10 @@ class Drug(Base):
     withdrawal_times = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
 
-class DictionaryWord(Base):
+    # Keyset pagination order (crud.LIST_ORDER)
+    __table_args__ = (Index("ix_drugs_created_at_id", "created_at", "id"),)
+
+class DictionaryWord(ChangeTracked, Base):
     __tablename__ = "dictionary_words"
 
     id = Column(String, primary_key=True, index=True)
@@ -68,6 +95,18 @@ class DictionaryWord(Base):
     barcode = Column(String(255))
     is_saved = Column(Boolean, default=False)
     is_favorite = Column(Boolean, default=False)
+    # Normalized shadow columns (see normalization.py), not part of the API
+    name_norm = Column(String(500), info={"internal": True})
+    kurdish_norm = Column(String(500), info={"internal": True})
+    arabic_norm = Column(String(500), info={"internal": True})
+
+    __table_args__ = (
+        Index("ix_dictionary_words_name_norm", "name_norm", postgresql_ops={"name_norm": "text_pattern_ops"}),
+        Index("ix_dictionary_words_kurdish_norm", "kurdish_norm", postgresql_ops={"kurdish_norm": "text_pattern_ops"}),
+        Index("ix_dictionary_words_arabic_norm", "arabic_norm", postgresql_ops={"arabic_norm": "text_pattern_ops"}),
+        # Keyset pagination order (crud.LIST_ORDER)
+        Index("ix_dictionary_words_name_id", "name", "id"),
+    )
 
 class Question(Base):
     __tablename__ = "questions"
@@ -94,6 +133,9 @@ class Notification(Base):
     is_read = Column(Boolean, default=False)
     timestamp = Column(DateTime, default=datetime.utcnow)
 
+    # Keyset pagination order (crud.LIST_ORDER)
+    __table_args__ = (Index("ix_notifications_timestamp_id", "timestamp", "id"),)
+
 class Staff(Base):
     __tablename__ = "staff"
 
@@ -107,7 +149,7 @@ class Staff(Base):
     twitter = Column(String(1000))
     snapchat = Column(String(1000))
 
-class Instrument(Base):
+class Instrument(ChangeTracked, Base):
     __tablename__ = "instruments"
 
     id = Column(String, primary_key=True, index=True)
@@ -117,7 +159,10 @@ class Instrument(Base):
     image_url = Column(String(1000))
     created_at = Column(DateTime, default=datetime.utcnow)
 
-class Note(Base):
+    # Keyset pagination order (crud.LIST_ORDER)
+    __table_args__ = (Index("ix_instruments_created_at_id", "created_at", "id"),)
+
+class Note(ChangeTracked, Base):
     __tablename__ = "notes"
 
     id = Column(String, primary_key=True, index=True)
@@ -126,7 +171,10 @@ class Note(Base):
     image_url = Column(String(1000))
     created_at = Column(DateTime, default=datetime.utcnow)
 
-class UrineSlide(Base):
+    # Keyset pagination order (crud.LIST_ORDER)
+    __table_args__ = (Index("ix_notes_created_at_id", "created_at", "id"),)
+
+class UrineSlide(ChangeTracked, Base):
     __tablename__ = "urine_slides"
 
     id = Column(String, primary_key=True, index=True)
@@ -135,7 +183,10 @@ class UrineSlide(Base):
     image_url = Column(String(1000))
     created_at = Column(DateTime, default=datetime.utcnow)
 
-class StoolSlide(Base):
+    # Keyset pagination order (crud.LIST_ORDER)
+    __table_args__ = (Index("ix_urine_slides_created_at_id", "created_at", "id"),)
+
+class StoolSlide(ChangeTracked, Base):
     __tablename__ = "stool_slides"
 
     id = Column(String, primary_key=True, index=True)
@@ -144,7 +195,10 @@ class StoolSlide(Base):
     image_url = Column(String(1000))
     created_at = Column(DateTime, default=datetime.utcnow)
 
-class OtherSlide(Base):
+    # Keyset pagination order (crud.LIST_ORDER)
+    __table_args__ = (Index("ix_stool_slides_created_at_id", "created_at", "id"),)
+
+class OtherSlide(ChangeTracked, Base):
     __tablename__ = "other_slides"
 
     id = Column(String, primary_key=True, index=True)
@@ -153,7 +207,10 @@ class OtherSlide(Base):
     image_url = Column(String(1000))
     created_at = Column(DateTime, default=datetime.utcnow)
 
-class NormalRange(Base):
+    # Keyset pagination order (crud.LIST_ORDER)
+    __table_args__ = (Index("ix_other_slides_created_at_id", "created_at", "id"),)
+
+class NormalRange(ChangeTracked, Base):
     __tablename__ = "normal_ranges"
 
     id = Column(String, primary_key=True, index=True)
@@ -170,7 +227,10 @@ class NormalRange(Base):
     reference = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
 
-class AppLink(Base):
+    # Keyset pagination order (crud.LIST_ORDER)
+    __table_args__ = (Index("ix_normal_ranges_created_at_id", "created_at", "id"),)
+
+class AppLink(ChangeTracked, Base):
     __tablename__ = "app_links"
 
     id = Column(String, primary_key=True, index=True)
@@ -213,7 +273,7 @@ class Supporter(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-class HaematologyTest(Base):
+class HaematologyTest(ChangeTracked, Base):
     __tablename__ = "haematology_tests"
 
     id = Column(String, primary_key=True, index=True)
@@ -222,7 +282,10 @@ class HaematologyTest(Base):
     image_url = Column(String(1000))
     created_at = Column(DateTime, default=datetime.utcnow)
 
-class SerologyTest(Base):
+    # Keyset pagination order (crud.LIST_ORDER)
+    __table_args__ = (Index("ix_haematology_tests_created_at_id", "created_at", "id"),)
+
+class SerologyTest(ChangeTracked, Base):
     __tablename__ = "serology_tests"
 
     id = Column(String, primary_key=True, index=True)
@@ -231,7 +294,10 @@ class SerologyTest(Base):
     image_url = Column(String(1000))
     created_at = Column(DateTime, default=datetime.utcnow)
 
-class BiochemistryTest(Base):
+    # Keyset pagination order (crud.LIST_ORDER)
+    __table_args__ = (Index("ix_serology_tests_created_at_id", "created_at", "id"),)
+
+class BiochemistryTest(ChangeTracked, Base):
     __tablename__ = "biochemistry_tests"
 
     id = Column(String, primary_key=True, index=True)
@@ -240,7 +306,10 @@ class BiochemistryTest(Base):
     image_url = Column(String(1000))
     created_at = Column(DateTime, default=datetime.utcnow)
 
-class BacteriologyTest(Base):
+    # Keyset pagination order (crud.LIST_ORDER)
+    __table_args__ = (Index("ix_biochemistry_tests_created_at_id", "created_at", "id"),)
+
+class BacteriologyTest(ChangeTracked, Base):
     __tablename__ = "bacteriology_tests"
 
     id = Column(String, primary_key=True, index=True)
@@ -249,7 +318,10 @@ class BacteriologyTest(Base):
     image_url = Column(String(1000))
     created_at = Column(DateTime, default=datetime.utcnow)
 
-class OtherTest(Base):
+    # Keyset pagination order (crud.LIST_ORDER)
+    __table_args__ = (Index("ix_bacteriology_tests_created_at_id", "created_at", "id"),)
+
+class OtherTest(ChangeTracked, Base):
     __tablename__ = "other_tests"
 
     id = Column(String, primary_key=True, index=True)
@@ -258,14 +330,126 @@ class OtherTest(Base):
     image_url = Column(String(1000))
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    # Keyset pagination order (crud.LIST_ORDER)
+    __table_args__ = (Index("ix_other_tests_created_at_id", "created_at", "id"),)
+
 class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
 
     id = Column(String, primary_key=True, index=True)
     user_id = Column(String, ForeignKey("users.id"), index=True)
-    token = Column(String(500), unique=True, index=True)
+    token_hash = Column(String(64), unique=True, index=True)  # SHA-256 hex of the token; the token itself is never stored
     expires_at = Column(DateTime)
     created_at = Column(DateTime, default=datetime.utcnow)
     revoked = Column(Boolean, default=False)
     
-    user = relationship("User", backref="refresh_tokens")
\ No newline at end of file
+    user = relationship("User", backref="refresh_tokens")
+
+    __table_args__ = (
+        # Live tokens by expiry, for purge_refresh_tokens; rotation revokes rows out of it
+        Index("ix_refresh_tokens_live", "expires_at", postgresql_where=revoked == False, sqlite_where=revoked == False),
+        # Revoked rows waiting for purge_refresh_tokens
+        Index("ix_refresh_tokens_revoked", "id", postgresql_where=revoked == True, sqlite_where=revoked == True),
+    )
+
+class TableCounter(Base):
+    """Maintained row count per table (see counters.py)"""
+    __tablename__ = "table_counters"
+
+    table_name = Column(String(100), primary_key=True)
+    row_count = Column(Integer, nullable=False, default=0)
+    reconciled_at = Column(DateTime, default=datetime.utcnow)
+
+class TableVersion(Base):
+    """Per-table change counter bumped by every ORM write (see cache_bus.py)"""
+    __tablename__ = "table_versions"
+
+    table_name = Column(String(100), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class ChangeSequence(Base):
+    """Single-row global change sequence for delta sync (see changes.py)"""
+    __tablename__ = "change_sequence"
+
+    id = Column(Integer, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)  # SQLite only, PostgreSQL uses the sequence below
+    pruned_through = Column(Integer, default=0)  # tombstones up to this value were deleted
+
+# PostgreSQL draws change sequence values from a real sequence (no row lock
+# shared by all writers); create_all skips it on SQLite
+change_sequence_seq = Sequence("change_sequence_seq", metadata=Base.metadata)
+
+class SyncTombstone(Base):
+    """Deleted synced rows, so delta sync can tell clients to drop them"""
+    __tablename__ = "sync_tombstones"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    table_name = Column(String(100), nullable=False)
+    item_id = Column(String, nullable=False)
+    change_seq = Column(Integer, nullable=False, index=True)
+    deleted_at = Column(DateTime, default=datetime.utcnow)
+
+class QueryStat(Base):
+    """Aggregated search/detail lookups used to warm caches at startup (see warmup.py)"""
+    __tablename__ = "query_stats"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    kind = Column(String(20), nullable=False)  # "search" or "detail"
+    table_name = Column(String(100), nullable=False)
+    key = Column(String(500), nullable=False)  # JSON-encoded lookup arguments
+    hits = Column(Integer, nullable=False, default=0)
+    last_seen = Column(DateTime, default=datetime.utcnow, index=True)
+
+    __table_args__ = (
+        UniqueConstraint("kind", "table_name", "key", name="uq_query_stats_lookup"),
+        Index("ix_query_stats_hits", "hits"),
+    )
+
+class NotificationOutbox(Base):
+    """
+    Push notifications waiting for delivery, written in the same commit as
+    the content they announce and sent by the outbox worker (see outbox.py)
+    """
+    __tablename__ = "notification_outbox"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    title = Column(String(500), nullable=False)
+    content = Column(Text, nullable=False)
+    data = Column(Text)  # JSON custom data for the push payload
+    group_key = Column(String(100))  # coalescing group, e.g. "new_word"
+    digest = Column(String(500))  # content of the group's digest push, "{count}" placeholder
+    status = Column(String(20), nullable=False, default="pending")  # pending, sending, delivered, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    delivered_at = Column(DateTime)
+
+    # The worker's due-row scan and coalescing group lookup
+    __table_args__ = (
+        Index("ix_notification_outbox_due", "status", "next_attempt_at"),
+        Index("ix_notification_outbox_group", "group_key", "status"),
+    )
+
+
+class JobRun(Base):
+    """One run of a scheduled maintenance job (see scheduler.py)"""
+    __tablename__ = "job_runs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    job_name = Column(String(100), nullable=False)
+    scheduled_for = Column(DateTime, nullable=False)  # the cron slot, or the trigger time of a manual run
+    trigger = Column(String(20), nullable=False, default="schedule")  # schedule or manual
+    status = Column(String(20), nullable=False, default="running")  # running, success, failed
+    worker = Column(String(255))  # host:pid that ran it
+    started_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime)
+    result = Column(Text)
+    error = Column(Text)
+
+    __table_args__ = (
+        # One run per cron slot across all workers
+        UniqueConstraint("job_name", "scheduled_for", name="uq_job_runs_slot"),
+        Index("ix_job_runs_started", "job_name", "started_at"),
+    )
\ No newline at end of file
@@ -0,0 +1,118 @@
+"""
+Kurdish/Arabic text normalization and the normalized shadow columns.
+
+Users type the same word with different letter forms (Arabic vs Persian yeh
+and kaf, heh variants, tatweel, diacritics, ZWNJ). ``normalize_text`` folds all
+of these to one form so the ``*_norm`` columns can be matched with plain
+B-tree/prefix index lookups.
+"""
+import unicodedata
+from typing import Optional
+
+from sqlalchemy import and_, bindparam, or_, select, update
+
+import models
+from logger import db_logger
+
+_FOLD = {
+    # yeh
+    "ي": "ی",  # ARABIC LETTER YEH
+    "ى": "ی",  # ALEF MAKSURA
+    # kaf
+    "ك": "ک",  # ARABIC LETTER KAF
+    # heh and ae/teh marbuta
+    "ە": "ه",  # AE (Kurdish e)
+    "ھ": "ه",  # HEH DOACHASHMEE
+    "ہ": "ه",  # HEH GOAL
+    "ۀ": "ه",  # HEH WITH YEH ABOVE
+    "ة": "ه",  # TEH MARBUTA
+    # alef and waw with hamza
+    "أ": "ا",
+    "إ": "ا",
+    "آ": "ا",
+    "ٱ": "ا",
+    "ؤ": "و",
+    # tatweel and zero-width/direction marks
+    "\u0640": None,  # TATWEEL
+    "\u200c": None,  # ZWNJ
+    "\u200d": None,  # ZWJ
+    "\u200e": None,  # LRM
+    "\u200f": None,  # RLM
+}
+# Harakat and superscript alef
+_FOLD.update({chr(cp): None for cp in range(0x064B, 0x0660)})
+_FOLD["\u0670"] = None
+# Arabic-Indic and extended Arabic-Indic digits
+_FOLD.update({chr(0x0660 + d): str(d) for d in range(10)})
+_FOLD.update({chr(0x06F0 + d): str(d) for d in range(10)})
+
+_TRANSLATION = str.maketrans(_FOLD)
+
+# Shadow column -> source column, per model
+NORMALIZED_COLUMNS = {
+    models.DictionaryWord: {"name_norm": "name", "kurdish_norm": "kurdish", "arabic_norm": "arabic"},
+    models.Disease: {"name_norm": "name", "kurdish_norm": "kurdish"},
+}
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def normalize_text(value: Optional[str]) -> Optional[str]:
+    """Fold letter variants, strip marks, casefold and collapse whitespace"""
+    if value is None:
+        return None
+    value = unicodedata.normalize("NFKC", value).translate(_TRANSLATION)
+    return " ".join(value.casefold().split())
+
+
+def fill_normalized(model, item_data: dict) -> dict:
+    """Set the shadow columns of ``item_data`` for every source column it contains"""
+    for norm_col, source in NORMALIZED_COLUMNS.get(model, {}).items():
+        if source in item_data:
+            item_data[norm_col] = normalize_text(item_data[source])
+    return item_data
+
+
+def prefix_filter(column, prefix: str, dialect: str):
+    """Index-friendly ``column LIKE 'prefix%'`` on a normalized column"""
+    if dialect == "postgresql":
+        # Served by the text_pattern_ops index
+        return column.startswith(prefix, autoescape=True)
+    # Range scan on the plain (binary collation) index
+    return and_(column >= prefix, column < prefix + "\U0010ffff")
+
+
+def backfill_normalized_columns(engine):
+    """Populate shadow columns for rows written before they existed"""
+    for model, columns in NORMALIZED_COLUMNS.items():
+        table = model.__table__
+        pending = or_(*[
+            and_(table.c[norm_col].is_(None), table.c[source].isnot(None))
+            for norm_col, source in columns.items()
+        ])
+        sources = [table.c[source] for source in columns.values()]
+        stmt = update(table).where(table.c.id == bindparam("_id")).values(
+            {norm_col: bindparam(f"v_{norm_col}") for norm_col in columns}
+        )
+        total = 0
+        try:
+            while True:
+                with engine.begin() as conn:
+                    rows = conn.execute(
+                        select(table.c.id, *sources).where(pending).limit(BACKFILL_BATCH_SIZE)
+                    ).all()
+                    if not rows:
+                        break
+                    conn.execute(stmt, [
+                        {"_id": row[0], **{
+                            f"v_{norm_col}": normalize_text(value)
+                            for norm_col, value in zip(columns, row[1:])
+                        }}
+                        for row in rows
+                    ])
+                total += len(rows)
+        except Exception as e:
+            db_logger.warning(f"Normalized column backfill failed for {table.name}: {e}")
+            continue
+        if total:
+            db_logger.info(f"Backfilled normalized columns for {total} rows in {table.name}")
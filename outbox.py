@@ -0,0 +1,267 @@
+"""
+Transactional outbox for push notifications.
+
+``crud.create_item(..., notifications=[...])`` adds ``notification_outbox``
+rows to the same commit as the content row, so an announcement exists iff
+its content does and the admin request never waits on OneSignal. The
+``run_outbox_worker`` lifespan task delivers due rows: each is claimed with
+a conditional UPDATE (a lease, so several workers never send the same row
+and a crashed worker's rows are picked up again), sent, and marked
+delivered, or rescheduled with exponential backoff until
+OUTBOX_MAX_ATTEMPTS is reached and it is marked failed. While the OneSignal
+credentials are missing the worker is paused and rows stay pending.
+
+Messages with a coalescing ``group`` (e.g. one per new dictionary word) are
+held for OUTBOX_COALESCE_WINDOW seconds, and everything queued for the group
+by then goes out as a single digest push ("N new words") listing the item
+ids, so a bulk import sends one notification instead of hundreds.
+"""
+import asyncio
+import json
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import func, select, update
+
+import models
+from config import settings
+from logger import app_logger
+
+# Rows merged into one digest push, and item ids listed in its data
+MAX_DIGEST_ROWS = 1000
+MAX_DIGEST_IDS = 100
+
+_outbox = models.NotificationOutbox.__table__
+# Lets a commit wake the worker instead of it waiting for the next poll
+_wakeup = {"loop": None, "event": None}
+
+
+def message(title: str, content: str, custom_data: Optional[dict] = None,
+            group: Optional[str] = None, digest: Optional[str] = None) -> dict:
+    """
+    A notification for ``crud.create_item(..., notifications=[...])``.
+    Messages with the same ``group`` queued within OUTBOX_COALESCE_WINDOW
+    seconds are sent as one push whose content is ``digest`` formatted
+    with ``count`` (and ``title``).
+    """
+    return {"title": title, "content": content, "data": custom_data, "group": group, "digest": digest}
+
+
+def enqueue(db, notifications):
+    """Add outbox rows for ``notifications`` to the session (committed by the caller)"""
+    now = datetime.utcnow()
+    for notification in notifications:
+        data = notification.get("data")
+        group = notification.get("group")
+        # Grouped messages wait out the window so the rest of a burst can join them
+        delay = settings.OUTBOX_COALESCE_WINDOW if group else 0
+        db.add(models.NotificationOutbox(
+            title=notification["title"],
+            content=notification["content"],
+            data=json.dumps(data, ensure_ascii=False) if data else None,
+            group_key=group,
+            digest=notification.get("digest"),
+            status="pending",
+            attempts=0,
+            next_attempt_at=now + timedelta(seconds=delay),
+        ))
+
+
+def wake():
+    """Ask the worker to look for due rows now (safe from any thread)"""
+    loop, event = _wakeup["loop"], _wakeup["event"]
+    if loop is None:
+        return
+    try:
+        loop.call_soon_threadsafe(event.set)
+    except RuntimeError:
+        # Loop already closed
+        pass
+
+
+def backoff(attempts: int) -> float:
+    """Seconds before retry number ``attempts``"""
+    return min(settings.OUTBOX_RETRY_MAX_DELAY, settings.OUTBOX_RETRY_BASE_DELAY * 2 ** (attempts - 1))
+
+
+def _claim(conn, row_id: int, condition, lease_until) -> bool:
+    # False when another worker claimed the row in between
+    return bool(conn.execute(
+        update(_outbox).where((_outbox.c.id == row_id) & condition)
+        .values(status="sending", next_attempt_at=lease_until, attempts=_outbox.c.attempts + 1)
+    ).rowcount)
+
+
+def _delivery(rows: list) -> dict:
+    """One push for ``rows``: the row itself, or a digest of a coalesced group"""
+    first = rows[0]
+    data = json.loads(first["data"]) if first["data"] else None
+    delivery = {
+        "ids": [row["id"] for row in rows],
+        "title": first["title"],
+        "content": first["content"],
+        "data": data,
+        "attempts": max(row["attempts"] for row in rows) + 1,
+    }
+    if len(rows) == 1:
+        return delivery
+    count = len(rows)
+    delivery["content"] = (first["digest"] or "{count} × {title}").format(count=count, title=first["title"])
+    row_data = [json.loads(row["data"]) if row["data"] else {} for row in rows]
+    # Fields shared by every item (e.g. "type") carry over
+    digest_data = {
+        key: value for key, value in (data or {}).items()
+        if not key.endswith("_id") and all(other.get(key) == value for other in row_data)
+    }
+    digest_data["count"] = count
+    # Item ids under the plural key ("word_id" -> "word_ids"), capped to keep the payload small
+    for values in row_data:
+        for key, value in values.items():
+            if key.endswith("_id"):
+                ids = digest_data.setdefault(f"{key}s", [])
+                if len(ids) < MAX_DIGEST_IDS:
+                    ids.append(value)
+    delivery["data"] = digest_data
+    return delivery
+
+
+def claim_due(engine, limit: int) -> list:
+    """
+    Lease up to ``limit`` due rows to this worker, each together with the
+    other pending rows of its coalescing group; returns one delivery per
+    row or group
+    """
+    now = datetime.utcnow()
+    lease_until = now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+    due = (_outbox.c.status.in_(("pending", "sending"))) & (_outbox.c.next_attempt_at <= now)
+    deliveries, taken = [], set()
+    with engine.begin() as conn:
+        rows = conn.execute(
+            select(_outbox).where(due).order_by(_outbox.c.next_attempt_at, _outbox.c.id).limit(limit)
+        ).mappings().all()
+        for row in rows:
+            if row["id"] in taken or not _claim(conn, row["id"], due, lease_until):
+                continue
+            batch = [row]
+            if row["group_key"]:
+                # The rest of the burst joins the digest, due or not
+                siblings = conn.execute(
+                    select(_outbox)
+                    .where((_outbox.c.group_key == row["group_key"]) & (_outbox.c.status == "pending")
+                           & (_outbox.c.id != row["id"]))
+                    .order_by(_outbox.c.id).limit(MAX_DIGEST_ROWS - 1)
+                ).mappings().all()
+                batch += [
+                    sibling for sibling in siblings
+                    if _claim(conn, sibling["id"], _outbox.c.status == "pending", lease_until)
+                ]
+            taken.update(item["id"] for item in batch)
+            deliveries.append(_delivery(batch))
+    return deliveries
+
+
+def mark_delivered(engine, ids: list):
+    with engine.begin() as conn:
+        conn.execute(update(_outbox).where(_outbox.c.id.in_(ids)).values(
+            status="delivered", delivered_at=datetime.utcnow(), last_error=None
+        ))
+
+
+def mark_failed(engine, delivery: dict, error: str):
+    """Reschedule the delivery's rows with backoff, or give up after OUTBOX_MAX_ATTEMPTS"""
+    attempts = delivery["attempts"]
+    values = {"last_error": error[:2000]}
+    label = f"Notification {delivery['ids'][0]} ({delivery['title']}, {len(delivery['ids'])} rows)"
+    if attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        values["status"] = "failed"
+        app_logger.error(f"{label} failed after {attempts} attempts: {error}")
+    else:
+        values["status"] = "pending"
+        values["next_attempt_at"] = datetime.utcnow() + timedelta(seconds=backoff(attempts))
+        app_logger.warning(f"{label} attempt {attempts} failed, retrying: {error}")
+    with engine.begin() as conn:
+        conn.execute(update(_outbox).where(_outbox.c.id.in_(delivery["ids"])).values(**values))
+
+
+async def deliver(engine, delivery: dict):
+    from api.notifications import post_onesignal_notification
+
+    try:
+        await post_onesignal_notification(delivery["title"], delivery["content"], delivery["data"])
+    except Exception as e:
+        await asyncio.to_thread(mark_failed, engine, delivery, str(e) or type(e).__name__)
+    else:
+        await asyncio.to_thread(mark_delivered, engine, delivery["ids"])
+
+
+async def drain(engine) -> int:
+    """Deliver everything that is due now; returns how many pushes were attempted"""
+    attempted = 0
+    while True:
+        deliveries = await asyncio.to_thread(claim_due, engine, settings.OUTBOX_BATCH_SIZE)
+        if not deliveries:
+            return attempted
+        await asyncio.gather(*[deliver(engine, delivery) for delivery in deliveries])
+        attempted += len(deliveries)
+
+
+def next_due_in(engine) -> Optional[float]:
+    """Seconds until the earliest pending/leased row is due, or None if there is none"""
+    with engine.connect() as conn:
+        due_at = conn.execute(
+            select(func.min(_outbox.c.next_attempt_at)).where(_outbox.c.status.in_(("pending", "sending")))
+        ).scalar()
+    return None if due_at is None else max(0.0, (due_at - datetime.utcnow()).total_seconds())
+
+
+async def run_outbox_worker(engine, interval: float):
+    """
+    Lifespan task: deliver due notifications on wake-ups and every
+    ``interval`` seconds; paused while OneSignal is not configured
+    """
+    from api.notifications import onesignal_configured
+
+    event = asyncio.Event()
+    _wakeup.update(loop=asyncio.get_running_loop(), event=event)
+    try:
+        paused = False
+        while True:
+            timeout = interval
+            try:
+                if not onesignal_configured():
+                    # Rows stay pending instead of burning their attempts
+                    if not paused:
+                        app_logger.warning("OneSignal credentials not configured, notification outbox paused")
+                    paused = True
+                else:
+                    if paused:
+                        app_logger.info("OneSignal credentials found, notification outbox resumed")
+                    paused = False
+                    await drain(engine)
+                    # Sleep until the next retry is due, if that is sooner
+                    due_in = await asyncio.to_thread(next_due_in, engine)
+                    if due_in is not None:
+                        timeout = min(interval, due_in)
+            except Exception as e:
+                app_logger.error(f"Notification outbox run failed: {e}")
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            event.clear()
+    finally:
+        _wakeup.update(loop=None, event=None)
+
+
+def status_counts(engine) -> dict:
+    """Rows per delivery status, plus the most recent failures"""
+    with engine.connect() as conn:
+        counts = dict(conn.execute(
+            select(_outbox.c.status, func.count()).group_by(_outbox.c.status)
+        ).all())
+        failures = conn.execute(
+            select(_outbox.c.id, _outbox.c.title, _outbox.c.attempts, _outbox.c.last_error, _outbox.c.created_at)
+            .where(_outbox.c.status == "failed")
+            .order_by(_outbox.c.id.desc()).limit(20)
+        ).mappings().all()
+    return {"counts": counts, "recent_failures": [dict(row) for row in failures]}
@@ -0,0 +1,344 @@
+"""
+In-process scheduler for periodic maintenance jobs.
+
+Every worker runs ``run_scheduler`` in its lifespan and wakes up for each
+job's cron slots (UTC), plus a random jitter of up to the job's ``jitter``
+seconds. A job runs in exactly one worker per slot. The worker must first
+take the job's lock: a PostgreSQL advisory lock, or on SQLite an exclusive
+file lock. It must then insert the slot's ``job_runs`` row, which is unique
+per (job, slot), so a worker that gets the lock after the run finished sees
+the row and skips. ``job_runs`` doubles as the run history behind
+/api/admin/jobs; rows a dead worker left "running" are marked failed at
+startup and before the job's next run.
+"""
+import asyncio
+import hashlib
+import os
+import random
+import socket
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy import delete, insert, select, text, update
+from sqlalchemy.exc import IntegrityError
+
+import models
+from config import settings
+from logger import app_logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development only
+    fcntl = None
+
+_runs = models.JobRun.__table__
+WORKER = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class CronSchedule:
+    """
+    Standard 5-field cron expression (minute hour day-of-month month
+    day-of-week) with ``*``, ``*/n``, ``a-b``, ``a-b/n`` and lists. When both
+    day fields are restricted a day matching either one matches, as in cron.
+    """
+
+    FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+
+    def __init__(self, expression: str):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            self._parse(part, low, high) for part, (low, high) in zip(parts, self.FIELDS)
+        )
+        self.any_day = parts[2] == "*"
+        self.any_weekday = parts[4] == "*"
+        # Day 7 is Sunday too
+        if 7 in self.weekdays:
+            self.weekdays = (self.weekdays - {7}) | {0}
+
+    @staticmethod
+    def _parse(field: str, low: int, high: int) -> set:
+        values = set()
+        for item in field.split(","):
+            spec, _, step = item.partition("/")
+            step = int(step) if step else 1
+            if spec == "*":
+                start, end = low, high
+            elif "-" in spec:
+                start, end = (int(value) for value in spec.split("-", 1))
+            else:
+                start = end = int(spec)
+                if step != 1:
+                    end = high
+            # Day of week accepts 7 for Sunday
+            if start < low or end > (7 if (low, high) == (0, 6) else high) or start > end or step < 1:
+                raise ValueError(f"Invalid cron field {field!r}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day = moment.day in self.days
+        # cron counts Sunday as 0, Python's weekday() counts Monday as 0
+        weekday = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day:
+            return weekday
+        if self.any_weekday:
+            return day
+        return day or weekday
+
+    def next_after(self, moment: datetime) -> datetime:
+        """First matching minute strictly after ``moment``"""
+        current = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = current + timedelta(days=366 * 5)
+        while current < limit:
+            if current.month not in self.months:
+                current = (current.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(current):
+                current = current.replace(hour=0, minute=0) + timedelta(days=1)
+            elif current.hour not in self.hours:
+                current = current.replace(minute=0) + timedelta(hours=1)
+            elif current.minute not in self.minutes:
+                current += timedelta(minutes=1)
+            else:
+                return current
+        raise ValueError(f"Cron expression never matches: {self.expression!r}")
+
+
+@dataclass
+class Job:
+    name: str
+    schedule: CronSchedule
+    func: Callable       # func(db) -> optional result, run in a worker thread
+    jitter: float = 0.0  # seconds
+    next_run: Optional[datetime] = None
+
+
+_jobs = {}
+
+
+def register(name: str, cron: str, func: Callable, jitter: float = 0.0) -> Job:
+    """Schedule ``func(db)`` at every ``cron`` slot; an empty ``cron`` disables it"""
+    job = Job(name=name, schedule=CronSchedule(cron), func=func, jitter=jitter) if cron else None
+    if job is not None:
+        _jobs[name] = job
+    return job
+
+
+def _lock_key(name: str) -> int:
+    # Signed 64-bit key for pg_advisory_lock
+    return int.from_bytes(hashlib.sha1(f"scheduler:{name}".encode()).digest()[:8], "big", signed=True)
+
+
+def _lock_path(engine, name: str) -> str:
+    # Shared by the workers of one deployment (same database URL)
+    scope = hashlib.sha1(str(engine.url).encode()).hexdigest()[:12]
+    return os.path.join(settings.SCHEDULER_LOCK_DIR or tempfile.gettempdir(), f"vet-scheduler-{scope}-{name}.lock")
+
+
+class _JobLock:
+    """Non-blocking cross-process lock for one job"""
+
+    def __init__(self, engine, name: str):
+        self.engine = engine
+        self.name = name
+        self._conn = None
+        self._file = None
+
+    def acquire(self) -> bool:
+        if self.engine.dialect.name == "postgresql":
+            self._conn = self.engine.connect()
+            if self._conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": _lock_key(self.name)}).scalar():
+                return True
+            self._conn.close()
+            self._conn = None
+            return False
+        self._file = open(_lock_path(self.engine, self.name), "w")
+        if fcntl is None:
+            return True
+        try:
+            fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            self._file.close()
+            self._file = None
+            return False
+
+    def release(self):
+        if self._conn is not None:
+            try:
+                self._conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _lock_key(self.name)})
+                self._conn.commit()
+            finally:
+                self._conn.close()
+                self._conn = None
+        if self._file is not None:
+            self._file.close()   # releases the flock
+            self._file = None
+
+
+def run_job(engine, job: Job, slot: datetime, trigger: str = "schedule") -> Optional[str]:
+    """
+    Run ``job`` for ``slot`` unless another worker holds its lock or already
+    ran that slot. Returns the run's status, or None when it was skipped.
+    """
+    from database import SessionLocal
+
+    lock = _JobLock(engine, job.name)
+    if not lock.acquire():
+        return None
+    try:
+        _fail_orphaned_runs(engine, job)
+        try:
+            with engine.begin() as conn:
+                run_id = conn.execute(insert(_runs).values(
+                    job_name=job.name, scheduled_for=slot, trigger=trigger, status="running",
+                    worker=WORKER, started_at=datetime.utcnow(),
+                )).inserted_primary_key[0]
+        except IntegrityError:
+            # Slot already ran (or is running) elsewhere
+            return None
+
+        started = time.monotonic()
+        db = SessionLocal()
+        try:
+            result = job.func(db)
+            status, values = "success", {"result": None if result is None else str(result)[:2000]}
+        except Exception as e:
+            db.rollback()
+            status, values = "failed", {"error": f"{type(e).__name__}: {e}"[:2000]}
+            app_logger.error(f"Scheduled job {job.name} failed: {e}")
+        finally:
+            db.close()
+        with engine.begin() as conn:
+            conn.execute(update(_runs).where(_runs.c.id == run_id).values(
+                status=status, finished_at=datetime.utcnow(), **values
+            ))
+        app_logger.info(f"Scheduled job {job.name} {status} in {time.monotonic() - started:.2f}s")
+        return status
+    finally:
+        lock.release()
+
+
+def _fail_orphaned_runs(engine, job: Job) -> int:
+    """
+    Mark ``job``'s "running" rows failed. Only called with the job's lock
+    held: every runner holds it until it records its result, so such rows
+    belong to a worker that died mid-run.
+    """
+    with engine.begin() as conn:
+        orphaned = conn.execute(
+            update(_runs)
+            .where((_runs.c.job_name == job.name) & (_runs.c.status == "running"))
+            .values(status="failed", finished_at=datetime.utcnow(), error="Worker exited before the run finished")
+        ).rowcount
+    if orphaned:
+        app_logger.warning(f"Scheduled job {job.name}: marked {orphaned} orphaned run(s) failed")
+    return orphaned
+
+
+def recover_runs(engine):
+    """Fail the runs left "running" by dead workers, for every job not running now (startup)"""
+    for job in _jobs.values():
+        lock = _JobLock(engine, job.name)
+        if not lock.acquire():
+            continue
+        try:
+            _fail_orphaned_runs(engine, job)
+        finally:
+            lock.release()
+
+
+async def _job_loop(engine, job: Job):
+    while True:
+        slot = job.schedule.next_after(datetime.utcnow())
+        job.next_run = slot
+        delay = (slot - datetime.utcnow()).total_seconds() + random.uniform(0, job.jitter)
+        await asyncio.sleep(max(0.0, delay))
+        try:
+            await asyncio.to_thread(run_job, engine, job, slot)
+        except Exception as e:
+            app_logger.error(f"Scheduling {job.name} failed: {e}")
+
+
+async def run_scheduler(engine):
+    """Lifespan task: run every registered job on its schedule"""
+    if not _jobs:
+        return
+    try:
+        await asyncio.to_thread(recover_runs, engine)
+    except Exception as e:
+        app_logger.error(f"Recovering scheduled job runs failed: {e}")
+    app_logger.info(f"Scheduler started: {', '.join(f'{job.name} ({job.schedule.expression})' for job in _jobs.values())}")
+    await asyncio.gather(*[_job_loop(engine, job) for job in _jobs.values()])
+
+
+async def trigger(engine, name: str) -> Optional[str]:
+    """Run job ``name`` now (admin); None if it is already running elsewhere"""
+    job = _jobs[name]
+    return await asyncio.to_thread(run_job, engine, job, datetime.utcnow(), "manual")
+
+
+def job_status(engine, history: int = 10) -> list:
+    """Each job's schedule, next run and most recent runs"""
+    jobs = []
+    with engine.connect() as conn:
+        for job in _jobs.values():
+            runs = conn.execute(
+                select(_runs.c.scheduled_for, _runs.c.trigger, _runs.c.status, _runs.c.worker,
+                       _runs.c.started_at, _runs.c.finished_at, _runs.c.result, _runs.c.error)
+                .where(_runs.c.job_name == job.name)
+                .order_by(_runs.c.started_at.desc()).limit(history)
+            ).mappings().all()
+            jobs.append({
+                "name": job.name,
+                "schedule": job.schedule.expression,
+                "jitter_seconds": job.jitter,
+                "next_run": job.next_run or job.schedule.next_after(datetime.utcnow()),
+                "runs": [dict(run) for run in runs],
+            })
+    return jobs
+
+
+# Jobs
+
+def reset_daily_points(db) -> str:
+    import crud
+
+    return f"{crud.reset_daily_points(db)} users reset"
+
+
+def prune_history(db) -> str:
+    """Drop old job runs, finished outbox rows and delta sync tombstones"""
+    from changes import prune_tombstones
+
+    now = datetime.utcnow()
+    runs = db.execute(delete(_runs).where(
+        _runs.c.started_at < now - timedelta(days=settings.SCHEDULER_HISTORY_DAYS)
+    )).rowcount
+    outbox = models.NotificationOutbox.__table__
+    notifications = db.execute(delete(outbox).where(
+        outbox.c.status.in_(("delivered", "failed"))
+        & (outbox.c.created_at < now - timedelta(days=settings.OUTBOX_RETENTION_DAYS))
+    )).rowcount
+    tombstones = prune_tombstones(db, now - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS))
+    db.commit()
+    return f"{runs} job runs, {notifications} outbox rows, {tombstones} sync tombstones deleted"
+
+
+def purge_refresh_tokens(db) -> str:
+    from auth import purge_refresh_tokens
+
+    return f"{purge_refresh_tokens(db, settings.REFRESH_TOKEN_PURGE_BATCH)} refresh tokens deleted"
+
+
+register("reset_daily_points", settings.DAILY_POINTS_RESET_CRON, reset_daily_points,
+         jitter=settings.SCHEDULER_JITTER_SECONDS)
+register("prune_history", settings.PRUNE_HISTORY_CRON, prune_history,
+         jitter=settings.SCHEDULER_JITTER_SECONDS)
+register("purge_refresh_tokens", settings.REFRESH_TOKEN_PURGE_CRON, purge_refresh_tokens,
+         jitter=settings.SCHEDULER_JITTER_SECONDS)
@@ -428,9 +428,10 @@ class OtherTestModel(Test):
 class PaginatedResponse(BaseModel):
     items: List[dict]
     total: int
-    page: int
+    page: Optional[int] = None  # None when the page was fetched by cursor
     size: int
     pages: int
+    next_cursor: Optional[str] = None
 
 class Token(BaseModel):
     access_token: str
@@ -0,0 +1,467 @@
+"""
+Full-text search backend for the content tables.
+
+PostgreSQL: each searchable table gets a generated, weighted ``search_vector``
+tsvector column with a GIN index.
+SQLite: each searchable table gets an external-content FTS5 virtual table kept
+in sync with triggers, ranked with bm25().
+
+Tables whose index could not be set up fall back to the old ``ilike`` scan.
+"""
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from sqlalchemy import column, func, literal, literal_column, or_, text
+from sqlalchemy.orm import Query
+
+import models
+from config import settings
+from logger import db_logger
+from normalization import normalize_text, prefix_filter
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development only
+    fcntl = None
+
+# Column weights: A = title/name, B = translations and short labels,
+# C = long descriptive text. Kurdish/Arabic translations are indexed through
+# their normalized shadow columns (see normalization.py).
+SEARCH_FIELDS: Dict[type, Dict[str, List[str]]] = {
+    models.Book: {"A": ["title"], "B": ["category"], "C": ["description"]},
+    models.Disease: {"A": ["name"], "B": ["kurdish_norm"], "C": ["symptoms", "cause", "control"]},
+    models.Drug: {
+        "A": ["name"],
+        "B": ["trade_names", "drug_class"],
+        "C": ["usage", "species_dosages", "contraindications", "drug_interactions", "withdrawal_times"],
+    },
+    models.DictionaryWord: {"A": ["name"], "B": ["kurdish_norm", "arabic_norm"], "C": ["description"]},
+    models.Instrument: {"A": ["name"], "B": ["category"], "C": ["description"]},
+    models.HaematologyTest: {"A": ["name"], "B": [], "C": ["description"]},
+    models.SerologyTest: {"A": ["name"], "B": [], "C": ["description"]},
+    models.BiochemistryTest: {"A": ["name"], "B": [], "C": ["description"]},
+    models.BacteriologyTest: {"A": ["name"], "B": [], "C": ["description"]},
+    models.OtherTest: {"A": ["name"], "B": [], "C": ["description"]},
+}
+
+# bm25() column weights used on SQLite, mirroring the tsvector weights
+BM25_WEIGHTS = {"A": 10.0, "B": 5.0, "C": 1.0}
+
+# 'simple' config: no stemming, which is what we want for Kurdish/Arabic
+TS_CONFIG = "simple"
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Tables whose full-text index is ready in this process
+_ready_tables = set()
+
+
+def _columns(model) -> List[tuple]:
+    """Return [(column_name, weight), ...] in index order"""
+    return [
+        (col, weight)
+        for weight in ("A", "B", "C")
+        for col in SEARCH_FIELDS[model][weight]
+    ]
+
+
+def _fts_table(model) -> str:
+    return f"{model.__tablename__}_fts"
+
+
+def _tokenize(query: str) -> List[str]:
+    return _TOKEN_RE.findall(query.lower())
+
+
+def _signature(model) -> str:
+    """Stable fingerprint of the indexed columns, used to detect config changes"""
+    spec = ",".join(f"{col}:{weight}" for col, weight in _columns(model))
+    return hashlib.sha1(spec.encode("utf-8")).hexdigest()[:16]
+
+
+# ---------------------------------------------------------------------------
+# Index setup
+# ---------------------------------------------------------------------------
+
+@contextmanager
+def _setup_lock(engine):
+    """
+    Cross-process lock held while indexes are rebuilt, so workers starting
+    together do not drop and recreate the same index at once: a PostgreSQL
+    advisory lock, or an exclusive file lock on SQLite (as in scheduler.py)
+    """
+    if engine.dialect.name == "postgresql":
+        key = int.from_bytes(hashlib.sha1(b"search:setup").digest()[:8], "big", signed=True)
+        with engine.connect() as conn:
+            conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": key})
+            try:
+                yield
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+                conn.commit()
+        return
+    scope = hashlib.sha1(str(engine.url).encode()).hexdigest()[:12]
+    path = os.path.join(settings.SCHEDULER_LOCK_DIR or tempfile.gettempdir(), f"vet-search-setup-{scope}.lock")
+    with open(path, "w") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield   # closing the file releases the flock
+
+
+def _postgres_current(conn, model) -> bool:
+    current = conn.execute(
+        text(
+            "SELECT col_description(a.attrelid, a.attnum) FROM pg_attribute a "
+            "WHERE a.attrelid = CAST(:table AS regclass) AND a.attname = 'search_vector' "
+            "AND NOT a.attisdropped"
+        ),
+        {"table": model.__tablename__},
+    ).scalar()
+    return current == _signature(model)
+
+
+def _setup_postgres(conn, model):
+    table = model.__tablename__
+    signature = _signature(model)
+    if _postgres_current(conn, model):
+        return
+
+    vector = " || ".join(
+        f"setweight(to_tsvector('{TS_CONFIG}', coalesce({col}, '')), '{weight}')"
+        for col, weight in _columns(model)
+    )
+    conn.execute(text(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector"))
+    conn.execute(text(
+        f"ALTER TABLE {table} ADD COLUMN search_vector tsvector "
+        f"GENERATED ALWAYS AS ({vector}) STORED"
+    ))
+    conn.execute(text(
+        f"CREATE INDEX IF NOT EXISTS ix_{table}_search_vector ON {table} USING GIN (search_vector)"
+    ))
+    conn.execute(text(f"COMMENT ON COLUMN {table}.search_vector IS '{signature}'"))
+    db_logger.info(f"Built tsvector search index on {table}")
+
+
+def _sqlite_current(conn, model) -> bool:
+    existing = [row[1] for row in conn.execute(text(f"PRAGMA table_info({_fts_table(model)})"))]
+    return existing == [col for col, _ in _columns(model)]
+
+
+def _setup_sqlite(conn, model):
+    table = model.__tablename__
+    fts = _fts_table(model)
+    cols = [col for col, _ in _columns(model)]
+
+    if _sqlite_current(conn, model):
+        return
+
+    for suffix in ("ai", "ad", "au"):
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {fts}_{suffix}"))
+    conn.execute(text(f"DROP TABLE IF EXISTS {fts}"))
+
+    col_list = ", ".join(cols)
+    new_values = ", ".join(f"new.{c}" for c in cols)
+    old_values = ", ".join(f"old.{c}" for c in cols)
+    conn.execute(text(
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({col_list}, "
+        f"content='{table}', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2')"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {col_list}) VALUES (new.rowid, {new_values}); END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {col_list}) VALUES ('delete', old.rowid, {old_values}); END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {col_list}) VALUES ('delete', old.rowid, {old_values}); "
+        f"INSERT INTO {fts}(rowid, {col_list}) VALUES (new.rowid, {new_values}); END"
+    ))
+    # Backfill from the existing rows
+    conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+    db_logger.info(f"Built FTS5 search index on {table}")
+
+
+def setup_search_indexes(engine):
+    """Create or refresh the full-text indexes for every searchable table"""
+    dialect = engine.dialect.name
+    if dialect == "postgresql":
+        current, setup = _postgres_current, _setup_postgres
+    elif dialect == "sqlite":
+        current, setup = _sqlite_current, _setup_sqlite
+    else:
+        db_logger.warning(f"Full-text search not supported on {dialect}, using ilike search")
+        return
+
+    stale = []
+    for model in SEARCH_FIELDS:
+        try:
+            with engine.connect() as conn:
+                up_to_date = current(conn, model)
+        except Exception:
+            up_to_date = False
+        if up_to_date:
+            _ready_tables.add(model.__tablename__)
+        else:
+            stale.append(model)
+    if not stale:
+        return
+
+    # setup() checks again under the lock: another worker may have just
+    # rebuilt the index while this one waited
+    with _setup_lock(engine):
+        for model in stale:
+            try:
+                with engine.begin() as conn:
+                    setup(conn, model)
+                _ready_tables.add(model.__tablename__)
+            except Exception as e:
+                db_logger.warning(f"Full-text index unavailable for {model.__tablename__}, using ilike search: {e}")
+
+
+# ---------------------------------------------------------------------------
+# Querying
+# ---------------------------------------------------------------------------
+
+def _fallback_filter(query: Query, model, search: str, dialect: str) -> Query:
+    """Unindexed search: prefix match on normalized columns, ilike on the rest"""
+    normalized = normalize_text(search)
+    return query.filter(or_(*[
+        prefix_filter(getattr(model, col), normalized, dialect)
+        if col.endswith("_norm") else getattr(model, col).ilike(f"%{search}%")
+        for col, _ in _columns(model)
+    ]))
+
+
+def apply_search(query: Query, model, search: str) -> Query:
+    """
+    Restrict ``query`` to rows of ``model`` matching ``search`` and order them
+    by relevance (best first). Every word is matched as a prefix.
+    """
+    table = model.__tablename__
+    dialect = query.session.get_bind().dialect.name
+    # Match the words as typed, or in normalized form for the shadow columns
+    variants = []
+    for text_variant in (search, normalize_text(search)):
+        tokens = _tokenize(text_variant)
+        if tokens and tokens not in variants:
+            variants.append(tokens)
+    if not variants or table not in _ready_tables:
+        return _fallback_filter(query, model, search, dialect)
+
+    if dialect == "postgresql":
+        ts_query = func.to_tsquery(TS_CONFIG, " | ".join(
+            "(" + " & ".join(f"{token}:*" for token in tokens) + ")" for tokens in variants
+        ))
+        vector = literal_column(f"{table}.search_vector")
+        return query.filter(vector.op("@@")(ts_query)).order_by(func.ts_rank(vector, ts_query).desc())
+
+    fts = _fts_table(model)
+    match = " OR ".join(
+        "(" + " ".join('"' + token.replace('"', '""') + '"*' for token in tokens) + ")"
+        for tokens in variants
+    )
+    weights = ", ".join(str(BM25_WEIGHTS[weight]) for _, weight in _columns(model))
+    ranked = text(
+        f"SELECT rowid AS rid, bm25({fts}, {weights}) AS rank FROM {fts} WHERE {fts} MATCH :fts_match"
+    ).bindparams(fts_match=match).columns(column("rid"), column("rank")).subquery()
+    return query.join(ranked, ranked.c.rid == literal_column(f"{table}.rowid")).order_by(ranked.c.rank)
+
+
+def is_searchable(model) -> bool:
+    return model in SEARCH_FIELDS
+
+
+# ---------------------------------------------------------------------------
+# Trigram fuzzy matching for the by-name lookups
+# ---------------------------------------------------------------------------
+
+# Column used for fuzzy lookups, per model
+FUZZY_FIELDS = {
+    models.DictionaryWord: "name",
+    models.Drug: "name",
+    models.Disease: "name",
+    models.NormalRange: "name",
+}
+
+# Minimum word similarity for a fuzzy match (pg_trgm's default for <%)
+FUZZY_THRESHOLD = 0.6
+
+# Tables with a pg_trgm GIN index in this process
+_trgm_ready_tables = set()
+
+# In-process trigram indexes (SQLite), built lazily per model
+_trigram_indexes = {}
+# Held while one is built, so concurrent first lookups scan the table once
+_trigram_build_lock = threading.Lock()
+
+
+def trigrams(value: str) -> set:
+    """Trigram set of ``value`` using pg_trgm's padding rules"""
+    grams = set()
+    for word in _tokenize(normalize_text(value) or ""):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def trigram_similarity(a: str, b: str) -> float:
+    """Equivalent of pg_trgm similarity(): shared trigrams over all trigrams"""
+    ta, tb = trigrams(a), trigrams(b)
+    if not ta or not tb:
+        return 0.0
+    return len(ta & tb) / len(ta | tb)
+
+
+class TrigramIndex:
+    """
+    Inverted trigram index over one text column, keyed by row id. Writes
+    replayed from other workers (cache_bus) run in worker threads while
+    lookups run on request threads, so every access holds the lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.postings = {}
+        self.values = {}
+
+    def add(self, item_id: str, value: Optional[str]):
+        with self._lock:
+            self._remove_locked(item_id)
+            if not value:
+                return
+            self.values[item_id] = value
+            for gram in trigrams(value):
+                self.postings.setdefault(gram, set()).add(item_id)
+
+    def remove(self, item_id: str):
+        with self._lock:
+            self._remove_locked(item_id)
+
+    def _remove_locked(self, item_id: str):
+        value = self.values.pop(item_id, None)
+        if value is None:
+            return
+        for gram in trigrams(value):
+            ids = self.postings.get(gram)
+            if ids is not None:
+                ids.discard(item_id)
+                if not ids:
+                    del self.postings[gram]
+
+    def best_match(self, term: str, threshold: float = FUZZY_THRESHOLD):
+        """
+        Return (item_id, score) of the best match, or (None, 0.0).
+        Score is the share of the term's trigrams found in the value (like
+        pg_trgm word_similarity); ties are broken by full similarity.
+        """
+        query_grams = trigrams(term)
+        if not query_grams:
+            return None, 0.0
+
+        with self._lock:
+            hits = {}
+            for gram in query_grams:
+                for item_id in self.postings.get(gram, ()):
+                    hits[item_id] = hits.get(item_id, 0) + 1
+
+            best_id, best_key = None, (0.0, 0.0)
+            for item_id, count in hits.items():
+                score = count / len(query_grams)
+                if score < threshold or score < best_key[0]:
+                    continue
+                key = (score, trigram_similarity(term, self.values[item_id]))
+                if key > best_key:
+                    best_id, best_key = item_id, key
+        return best_id, best_key[0]
+
+
+def setup_trigram_indexes(engine):
+    """Create pg_trgm GIN indexes for the fuzzy lookup columns (PostgreSQL only)"""
+    if engine.dialect.name != "postgresql":
+        return
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    except Exception as e:
+        db_logger.warning(f"pg_trgm unavailable, using in-process trigram matching: {e}")
+        return
+
+    for model, col in FUZZY_FIELDS.items():
+        table = model.__tablename__
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS ix_{table}_{col}_trgm "
+                    f"ON {table} USING GIN ({col} gin_trgm_ops)"
+                ))
+            _trgm_ready_tables.add(table)
+        except Exception as e:
+            db_logger.warning(f"Trigram index unavailable for {table}: {e}")
+
+
+def _get_trigram_index(db, model) -> TrigramIndex:
+    index = _trigram_indexes.get(model)
+    if index is not None:
+        return index
+    with _trigram_build_lock:
+        index = _trigram_indexes.get(model)
+        if index is None:
+            col = getattr(model, FUZZY_FIELDS[model])
+            index = TrigramIndex()
+            for item_id, value in db.query(model.id, col):
+                index.add(item_id, value)
+            _trigram_indexes[model] = index
+    return index
+
+
+def find_best_match(db, model, term: str):
+    """
+    Fuzzy lookup of ``term`` against the model's name column.
+
+    Returns (item, score) for the best-scoring row, or (None, 0.0).
+    """
+    col = getattr(model, FUZZY_FIELDS[model])
+
+    if model.__tablename__ in _trgm_ready_tables:
+        score = func.word_similarity(term, col)
+        row = db.query(model, score.label("score")).filter(
+            literal(term).op("<%")(col)
+        ).order_by(score.desc(), func.similarity(col, term).desc()).first()
+        if row is None:
+            return None, 0.0
+        return row[0], float(row[1])
+
+    item_id, score = _get_trigram_index(db, model).best_match(term)
+    if item_id is None:
+        return None, 0.0
+    return db.query(model).filter(model.id == item_id).first(), score
+
+
+def on_item_written(model, item_id: str, values: Optional[dict]):
+    """Keep the in-process trigram indexes in step with crud writes"""
+    index = _trigram_indexes.get(model)
+    if index is None:
+        # A build in progress may have scanned the table before this write
+        with _trigram_build_lock:
+            index = _trigram_indexes.get(model)
+        if index is None:
+            return
+    if values is None:
+        index.remove(item_id)
+    else:
+        index.add(item_id, values.get(FUZZY_FIELDS[model]))
+
+
+def reset_trigram_index(model):
+    """Drop the in-process trigram index of ``model``; it is rebuilt on next use"""
+    # Waits out a build in progress, which may predate the reset
+    with _trigram_build_lock:
+        _trigram_indexes.pop(model, None)
@@ -1,5 +1,9 @@
-from fastapi import HTTPException, UploadFile
-from typing import List, Any
+from fastapi import Depends, HTTPException, UploadFile, Query
+from typing import List, Any, Optional
+from datetime import datetime
+import base64
+import binascii
+import json
 import os
 import uuid
 import shutil
@@ -23,27 +27,89 @@ def safe_http_error(status_code: int, public_msg: str, internal_error: Exception
     )
     return HTTPException(status_code=status_code, detail=detail)
 
-def create_paginated_response(items, total, page, size):
+def serialize_item(item):
+    """Convert a SQLAlchemy object to a plain dict for JSON responses"""
+    if not hasattr(item, '__dict__'):
+        return item
+    # Exclude private attributes and internal columns such as the
+    # normalized search shadows
+    internal = {column.key for column in item.__table__.columns
+                if column.info.get('internal')} if hasattr(item, '__table__') else set()
+    return {key: value for key, value in item.__dict__.items()
+            if not key.startswith('_') and key not in internal}
+
+def create_paginated_response(items, total, page, size, next_cursor: Optional[dict] = None):
     """Create a paginated response"""
-    # Convert SQLAlchemy objects to dictionaries for proper serialization
-    serialized_items = []
-    for item in items:
-        if hasattr(item, '__dict__'):
-            # Convert SQLAlchemy object to dict, excluding private attributes
-            item_dict = {key: value for key, value in item.__dict__.items() 
-                        if not key.startswith('_')}
-            serialized_items.append(item_dict)
-        else:
-            serialized_items.append(item)
+    serialized_items = [serialize_item(item) for item in items]
 
     return {
         "items": serialized_items,
         "total": total,
         "page": page,
         "size": size,
-        "pages": (total + size - 1) // size
+        "pages": (total + size - 1) // size,
+        "next_cursor": encode_cursor(next_cursor) if next_cursor else None,
     }
 
+def page_number(skip: int, limit: int, cursor: Optional[dict] = None) -> Optional[int]:
+    """1-based page number, or None for keyset-cursor pages"""
+    if cursor and "k" in cursor:
+        return None
+    offset = cursor["o"] if cursor and "o" in cursor else skip
+    return offset // limit + 1
+
+def _cursor_default(value):
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
+
+def _cursor_hook(obj):
+    if "$dt" in obj:
+        return datetime.fromisoformat(obj["$dt"])
+    return obj
+
+def encode_cursor(position: dict) -> str:
+    """Opaque, URL-safe token for a pagination position"""
+    raw = json.dumps(position, default=_cursor_default, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(token: str) -> dict:
+    """Inverse of encode_cursor; raises ValueError on a malformed token"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        position = json.loads(raw, object_hook=_cursor_hook)
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError("Malformed cursor") from e
+    if not isinstance(position, dict):
+        raise ValueError("Malformed cursor")
+    offset, key, total = position.get("o"), position.get("k"), position.get("t", 0)
+    if not ((isinstance(offset, int) and offset >= 0) or (isinstance(key, list) and 1 <= len(key) <= 2)):
+        raise ValueError("Malformed cursor")
+    if not isinstance(total, int) or isinstance(total, bool) or total < 0:
+        raise ValueError("Malformed cursor")
+    return position
+
+def get_cursor(cursor: Optional[str] = Query(None, description="Opaque next_cursor from a previous page")) -> Optional[dict]:
+    """Dependency decoding the ``cursor`` query parameter of list endpoints"""
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def list_cursor(model):
+    """``get_cursor`` for a listing of ``model``, also checking keyset values against its sort columns"""
+    def dependency(cursor: Optional[dict] = Depends(get_cursor)) -> Optional[dict]:
+        if cursor is None:
+            return None
+        import crud
+        try:
+            return crud.check_cursor(model, cursor)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    return dependency
+
 async def save_file(file: UploadFile, folder: str) -> str:
     """Save uploaded file and return file URL"""
     # Validate file extension
@@ -97,25 +163,16 @@ def format_search_query(query: str) -> str:
     return query.strip().lower()
 
 def calculate_similarity(str1: str, str2: str) -> float:
-    """Calculate similarity between two strings (basic implementation)"""
-    if not str1 or not str2:
-        return 0.0
-
-    # Convert to lowercase for comparison
-    str1, str2 = str1.lower(), str2.lower()
-
-    # Simple similarity based on common characters
-    common_chars = set(str1) & set(str2)
-    total_chars = set(str1) | set(str2)
+    """Trigram similarity between two strings (same measure as pg_trgm similarity())"""
+    from search import trigram_similarity
+    return trigram_similarity(str1, str2)
 
-    if not total_chars:
-        return 0.0
-
-    return len(common_chars) / len(total_chars)
-
-async def send_content_notification(content_type: str, title: str, item_id: str):
-    """Send notification for new content"""
-    from api.notifications import send_onesignal_notification
+def content_notification(content_type: str, title: str, item_id: str) -> dict:
+    """
+    Outbox notification announcing new content (see ``crud.create_item``).
+    Bursts of the same content type are merged into one digest push.
+    """
+    from outbox import message
     
     notification_titles = {
         "book": "کتێبی نوێ",
@@ -135,11 +192,13 @@ async def send_content_notification(content_type: str, title: str, item_id: str)
     
     notification_title = notification_titles.get(content_type, "ناوەڕۆکی نوێ")
     
-    await send_onesignal_notification(
+    return message(
         title=notification_title,
         content=f"{notification_title} زیادکراوە: {title}",
         custom_data={
             f"{content_type}_id": item_id,
             "type": f"new_{content_type}"
-        }
-    )
\ No newline at end of file
+        },
+        group=f"new_{content_type}",
+        digest=f"{{count}} {notification_title} زیادکراون"
+    )
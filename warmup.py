@@ -0,0 +1,173 @@
+"""
+Startup cache warming from recorded lookups.
+
+``crud.search_page`` and ``crud.get_cached_by`` count their lookups in memory
+and a background task adds the counts to ``query_stats`` every
+WARMUP_STATS_FLUSH_INTERVAL seconds. At startup, before the worker starts
+serving, ``warm_caches`` replays the most requested lookups of the last
+WARMUP_WINDOW_DAYS days into the search and detail caches, most requested
+first, until WARMUP_TOP_N lookups are loaded or WARMUP_BUDGET_SECONDS is spent.
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+import models
+from config import settings
+from database import Base
+from logger import app_logger
+
+# Distinct lookups buffered between flushes; new ones beyond this are dropped
+MAX_PENDING = 10000
+MAX_KEY_LENGTH = 500
+
+_stats = models.QueryStat.__table__
+_lock = threading.Lock()
+_pending = Counter()   # (kind, table, key) -> lookups since the last flush
+_local = threading.local()
+
+# Progress of the startup warmup, shown on /metrics
+status = {"state": "not started", "planned": 0, "loaded": 0, "failed": 0, "elapsed_seconds": 0.0}
+
+
+def _record(kind: str, table: str, args: list):
+    if getattr(_local, "replaying", False):
+        return
+    try:
+        key = json.dumps(args, ensure_ascii=False, separators=(",", ":"))
+    except (TypeError, ValueError):
+        return
+    if len(key) > MAX_KEY_LENGTH:
+        return
+    entry = (kind, table, key)
+    with _lock:
+        if entry in _pending or len(_pending) < MAX_PENDING:
+            _pending[entry] += 1
+
+
+def record_search(model, query: str, skip: int, limit: int):
+    _record("search", model.__tablename__, [query, skip, limit])
+
+
+def record_detail(model, field: str, value):
+    _record("detail", model.__tablename__, [field, value])
+
+
+def flush_stats(engine) -> int:
+    """Add the buffered lookup counts to query_stats; returns how many rows were touched"""
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+    if not pending:
+        return 0
+    now = datetime.utcnow()
+    try:
+        with engine.begin() as conn:
+            for (kind, table, key), hits in pending.items():
+                match = (_stats.c.kind == kind) & (_stats.c.table_name == table) & (_stats.c.key == key)
+                bump = update(_stats).where(match).values(hits=_stats.c.hits + hits, last_seen=now)
+                if conn.execute(bump).rowcount:
+                    continue
+                try:
+                    with conn.begin_nested():
+                        conn.execute(insert(_stats).values(
+                            kind=kind, table_name=table, key=key, hits=hits, last_seen=now
+                        ))
+                except IntegrityError:
+                    # Inserted concurrently by another worker
+                    conn.execute(bump)
+            # Forget lookups nobody made within the window
+            conn.execute(delete(_stats).where(
+                _stats.c.last_seen < now - timedelta(days=settings.WARMUP_WINDOW_DAYS)
+            ))
+    except Exception:
+        # Keep the counts for the next attempt
+        with _lock:
+            _pending.update(pending)
+        raise
+    return len(pending)
+
+
+def top_lookups(engine, limit: int) -> list:
+    """The ``limit`` most requested (kind, table, key) lookups within the window"""
+    since = datetime.utcnow() - timedelta(days=settings.WARMUP_WINDOW_DAYS)
+    with engine.connect() as conn:
+        return conn.execute(
+            select(_stats.c.kind, _stats.c.table_name, _stats.c.key)
+            .where(_stats.c.last_seen >= since)
+            .order_by(_stats.c.hits.desc(), _stats.c.last_seen.desc())
+            .limit(limit)
+        ).all()
+
+
+def warm_caches(engine, budget: float, top_n: int):
+    """Replay the hottest recorded lookups into the caches within ``budget`` seconds"""
+    import crud
+    from database import SessionLocal
+
+    started = time.monotonic()
+    status.update(state="running", planned=0, loaded=0, failed=0, elapsed_seconds=0.0)
+    try:
+        lookups = top_lookups(engine, top_n)
+    except Exception as e:
+        app_logger.warning(f"Cache warmup skipped: {e}")
+        status["state"] = "skipped"
+        return
+    status["planned"] = len(lookups)
+    if not lookups:
+        status["state"] = "done"
+        return
+
+    models_by_table = {mapper.class_.__tablename__: mapper.class_ for mapper in Base.registry.mappers}
+    lookup = {"search": crud.search_page, "detail": crud.get_cached_by}
+    step = max(1, len(lookups) // 10)
+    app_logger.info(f"Cache warmup: {len(lookups)} lookups, budget {budget:.0f}s")
+
+    _local.replaying = True
+    db = SessionLocal()
+    try:
+        for i, (kind, table, key) in enumerate(lookups, 1):
+            if time.monotonic() - started >= budget:
+                status["state"] = "budget exhausted"
+                app_logger.warning(
+                    f"Cache warmup: budget of {budget:.0f}s exhausted after {status['loaded']}/{len(lookups)} lookups"
+                )
+                break
+            try:
+                lookup[kind](db, models_by_table[table], *json.loads(key))
+                status["loaded"] += 1
+            except Exception as e:
+                status["failed"] += 1
+                db.rollback()
+                app_logger.debug(f"Cache warmup: {kind} {table} {key} failed: {e}")
+            status["elapsed_seconds"] = round(time.monotonic() - started, 2)
+            if i % step == 0:
+                app_logger.info(
+                    f"Cache warmup: {i}/{len(lookups)} ({100 * i // len(lookups)}%) in {status['elapsed_seconds']}s"
+                )
+        else:
+            status["state"] = "done"
+    finally:
+        db.close()
+        _local.replaying = False
+        status["elapsed_seconds"] = round(time.monotonic() - started, 2)
+    app_logger.info(
+        f"Cache warmup {status['state']}: {status['loaded']} loaded, {status['failed']} failed "
+        f"in {status['elapsed_seconds']}s"
+    )
+
+
+async def run_stats_flusher(engine, interval: float):
+    """Lifespan task: persist the lookup counts every ``interval`` seconds"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(flush_stats, engine)
+        except Exception as e:
+            app_logger.warning(f"Flushing query stats failed: {e}")